@@ -1,63 +1,277 @@
-from flask import Flask, jsonify, request
-from models.lever import Lever
-from states import LeverEvent
+from flask import Flask, Response, g, has_request_context, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from fleet import LeverFleet, DEFAULT_LEVER_ID
+from archive import HistoryArchive, HistoryArchiver
+from audit import close_history_writer, get_history_writer
+from cluster import Cluster, FORWARDED_HEADER, NoOwnerError, advertise_url
+from commands import (
+    describe_results, describe_simulation, parse_advance, parse_commands, parse_config, parse_simulation
+)
+from db import get_pool_stats
+from encoders import HISTORY_OFFERS, JSON, NDJSON, ResponseEncoders
+from eventlog import create_event_log
+from history import HistoryQuery, encode_cursor, paginate
+from reloader import ConfigReloader
+from rollups import RollupQuery, describe_rollups, get_rollup_aggregator
+from snapshots import SnapshotCache
+from storage import close_storage, get_storage
+from stream import StateBroadcaster
+import config
+import metrics
+import atexit
+import logging
 import threading
 import time
-import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
+response_encoders = ResponseEncoders()
 
-lever = Lever()
 
-tick_thread = None
-tick_running = False
+class NegotiatedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        return response_encoders.json.dumps(obj).decode()
 
-def tick_loop():
-    global tick_running
-    logger.info("Tick loop started")
-    
-    while tick_running:
-        try:
-            lever.tick_update()
-            time.sleep(lever.tick)
-        except Exception as e:
-            logger.error(f"Tick error: {e}")
-            time.sleep(1)
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if not has_request_context():
+            return self._app.response_class(response_encoders.json.dumps(obj), mimetype=JSON)
+
+        encoder = response_encoders.negotiate(request.headers.get('Accept'))
+        response = self._app.response_class(encoder.dumps(obj), mimetype=encoder.media_type)
+        response.vary.add('Accept')
+        return response
+
+
+app = Flask(__name__)
+app.url_map.redirect_defaults = False
+app.json = NegotiatedJSONProvider(app)
+
+fleet = LeverFleet()
+cluster = None
+reloader = None
+archiver = None
+history_archive = HistoryArchive()
+
+broadcaster = StateBroadcaster(buffer_size=config.STREAM_BUFFER_SIZE)
+fleet.add_listener(broadcaster.publish)
+metrics.REGISTRY.add_collector(fleet.collect_metrics)
 
 def start_tick_thread():
-    global tick_thread, tick_running
-    if tick_thread is None or not tick_thread.is_alive():
-        tick_running = True
-        tick_thread = threading.Thread(target=tick_loop, daemon=True)
-        tick_thread.start()
-        logger.info("Tick thread started")
+    fleet.start()
 
 def stop_tick_thread():
-    global tick_running
-    tick_running = False
-    logger.info("Tick thread stopped")
+    fleet.stop()
+
+def shutdown():
+    if archiver is not None:
+        archiver.stop()
+    if reloader is not None:
+        reloader.stop()
+    if cluster is not None:
+        cluster.stop()
+    fleet.close()
+    close_history_writer()
+    close_storage()
+
+atexit.register(shutdown)
+
+_startup_lock = threading.Lock()
+_started = False
+
+def _start_internal_listener():
+    from werkzeug.serving import make_server
+
+    server = make_server(config.CLUSTER_BIND_HOST, 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="cluster-listener", daemon=True).start()
+    return advertise_url(server.server_port)
 
-start_tick_thread()
+def start_cluster():
+    global cluster
+
+    cluster = Cluster(fleet, _start_internal_listener())
+    cluster.start()
+
+def ensure_started():
+    global _started, reloader, archiver
+
+    if _started:
+        return
+    with _startup_lock:
+        if not _started:
+            fleet.event_log = create_event_log()
+            fleet.load()
+            if config.CLUSTER:
+                start_cluster()
+            start_tick_thread()
+            reloader = ConfigReloader(fleet)
+            reloader.start()
+            archiver = HistoryArchiver(history_archive, leader=cluster.is_archiver if cluster else None)
+            archiver.start()
+            _started = True
+
+def create_app(preload=True):
+    if preload:
+        threading.Thread(target=ensure_started, name="lever-startup", daemon=True).start()
+    return app
+
+def _render_status(lever, encoder):
+    return encoder.render_status(lever.get_state(), lever.get_status_message())
+
+status_cache = SnapshotCache(_render_status)
+fleet.add_discard_listener(status_cache.discard)
+
+def _lever_not_found(lever_id):
+    return jsonify({"success": False, "error": f"Lever {lever_id} not found"}), 404
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+    ensure_started()
+
+@app.before_request
+def _forward_to_owner():
+    if cluster is None or request.method != 'POST' or not request.view_args:
+        return None
+    lever_id = request.view_args.get('lever_id')
+    if fleet.get(lever_id) is None or cluster.is_owner(lever_id):
+        return None
+    if request.headers.get(FORWARDED_HEADER):
+        return jsonify({"success": False, "error": f"Lever {lever_id} is not owned by this node"}), 503
 
-@app.route('/api/lever/status', methods=['GET'])
-def get_status():
     try:
-        state = lever.get_state()
-        message = lever.get_status_message()
-        
+        status, body, content_type = cluster.forward(
+            lever_id, request.method, request.full_path.rstrip('?'), request.get_data(), request.content_type,
+            request.headers.get('Accept')
+        )
+        return Response(body, status=status, content_type=content_type)
+    except NoOwnerError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+
+def _forward_archive_read():
+    if request.headers.get(FORWARDED_HEADER):
+        return jsonify({"success": False, "error": "History archive is not held by this node"}), 503
+
+    try:
+        status, body, content_type = cluster.forward_archive(
+            request.full_path.rstrip('?'), request.headers.get('Accept')
+        )
+        return Response(body, status=status, content_type=content_type)
+    except NoOwnerError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+
+@app.after_request
+def _record_request(response):
+    if metrics.ENABLED:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.HTTP_REQUEST_SECONDS.labels(request.method, route, response.status_code).observe(
+            time.perf_counter() - g.request_started
+        )
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), status=200, content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/levers', methods=['GET'])
+def list_levers():
+    try:
+        levers = [{"id": lever.id, **lever.get_state()} for lever in fleet]
         return jsonify({
             "success": True,
-            "data": state,
-            "message": message
+            "data": levers,
+            "count": len(levers)
         }), 200
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/lever/pull-up', methods=['POST'])
-def pull_up():
+@app.route('/api/lever/status', methods=['GET'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/status', methods=['GET'])
+def get_status(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+    
+    try:
+        encoder = response_encoders.negotiate(request.headers.get('Accept'))
+        _, body, etag = status_cache.get(lever, encoder)
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, status=200, mimetype=encoder.media_type)
+
+        response.set_etag(etag)
+        response.vary.add('Accept')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/lever/stream', methods=['GET'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/stream', methods=['GET'])
+def stream(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+    
+    try:
+        if request.args.get('mode') == 'poll':
+            return _long_poll(lever)
+
+        subscription, generation, snapshot = broadcaster.subscribe(lever)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    def events():
+        try:
+            yield f"retry: 2000\nid: {generation}\nevent: snapshot\ndata: {app.json.dumps(snapshot)}\n\n"
+            while True:
+                messages = subscription.get(timeout=config.STREAM_HEARTBEAT)
+                if not messages:
+                    yield ": heartbeat\n\n"
+                    continue
+                for message_generation, delta in messages:
+                    yield f"id: {message_generation}\nevent: delta\ndata: {app.json.dumps(delta)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def _long_poll(lever):
+    since = request.args.get('since', -1, type=int)
+    timeout = min(request.args.get('timeout', 25, type=float), 60)
+
+    if lever.generation <= since:
+        deadline = time.monotonic() + timeout
+        subscription, _, _ = broadcaster.subscribe(lever)
+        try:
+            while lever.generation <= since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                subscription.get(timeout=remaining)
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return jsonify({
+        "success": True,
+        "generation": lever.generation,
+        "changed": lever.generation > since,
+        "data": lever.get_state()
+    }), 200
+
+@app.route('/api/lever/pull-up', methods=['POST'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/pull-up', methods=['POST'])
+def pull_up(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+    
     try:
         result = lever.pull_up()
         return jsonify({
@@ -68,8 +282,13 @@ def pull_up():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/lever/pull-down', methods=['POST'])
-def pull_down():
+@app.route('/api/lever/pull-down', methods=['POST'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/pull-down', methods=['POST'])
+def pull_down(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+    
     try:
         result = lever.pull_down()
         return jsonify({
@@ -80,8 +299,13 @@ def pull_down():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/lever/pause', methods=['POST'])
-def pause():
+@app.route('/api/lever/pause', methods=['POST'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/pause', methods=['POST'])
+def pause(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+    
     try:
         result = lever.pause()
         return jsonify({
@@ -92,8 +316,13 @@ def pause():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/lever/resume', methods=['POST'])
-def resume():
+@app.route('/api/lever/resume', methods=['POST'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/resume', methods=['POST'])
+def resume(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+    
     try:
         result = lever.resume()
         return jsonify({
@@ -104,8 +333,13 @@ def resume():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/lever/stop', methods=['POST'])
-def stop():
+@app.route('/api/lever/stop', methods=['POST'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/stop', methods=['POST'])
+def stop(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+    
     try:
         result = lever.stop()
         return jsonify({
@@ -116,8 +350,13 @@ def stop():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/lever/set-heat', methods=['POST'])
-def set_heat():
+@app.route('/api/lever/set-heat', methods=['POST'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/set-heat', methods=['POST'])
+def set_heat(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+    
     try:
         data = request.get_json()
         heat = data.get('heat')
@@ -125,8 +364,7 @@ def set_heat():
         if heat is None:
             return jsonify({"success": False, "error": "Heat required"}), 400
         
-        lever.heat = float(heat)
-        lever.save_state()
+        lever.set_heat(float(heat))
         
         return jsonify({
             "success": True,
@@ -136,17 +374,92 @@ def set_heat():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/lever/reset', methods=['POST'])
-def reset():
+@app.route('/api/lever/commands', methods=['POST'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/commands', methods=['POST'])
+def apply_commands(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+
     try:
-        from states import LeverState
-        
-        lever.position = 50
-        lever.heat = 0
-        lever.sealing_progress = 0
-        lever.fsm.current_state = LeverState.STOPPED
-        lever.save_state()
-        lever.log("RESET")
+        commands, atomic = parse_commands(request.get_json(silent=True), max_commands=config.COMMAND_BATCH_MAX)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        results, committed = lever.apply_commands(commands, atomic=atomic)
+        return jsonify({
+            "success": committed,
+            "committed": committed,
+            "results": describe_results(commands, results),
+            "data": lever.get_state()
+        }), 200 if committed else 409
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/lever/simulate', methods=['POST'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/simulate', methods=['POST'])
+def simulate(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+
+    try:
+        options = parse_simulation(
+            request.get_json(silent=True),
+            max_ticks=config.SIMULATE_MAX_TICKS,
+            max_commands=config.COMMAND_BATCH_MAX
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        ran, points, final = lever.simulate(**options)
+        return jsonify(describe_simulation(options, ran, points, final)), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/lever/config', methods=['GET'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/config', methods=['GET'])
+def get_config(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+
+    return jsonify({"success": True, "data": lever.config._asdict()}), 200
+
+@app.route('/api/lever/config', methods=['POST'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/config', methods=['POST'])
+def update_config(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+
+    try:
+        values = parse_config(request.get_json(silent=True), lever.config)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        row = get_storage().save_config(lever_id, values)
+        previous = fleet.reconfigure(lever_id, row)
+        return jsonify({
+            "success": True,
+            "data": lever.config._asdict(),
+            "previous": previous._asdict()
+        }), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/lever/reset', methods=['POST'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/reset', methods=['POST'])
+def reset(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+    
+    try:
+        lever.reset()
         
         return jsonify({
             "success": True,
@@ -156,40 +469,145 @@ def reset():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/lever/history', methods=['GET'])
-def get_history():
+@app.route('/api/lever/history', methods=['GET'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/history', methods=['GET'])
+def get_history(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+    
+    encoder = response_encoders.negotiate(request.headers.get('Accept'), HISTORY_OFFERS)
+    max_limit = config.HISTORY_EXPORT_MAX_LIMIT if encoder.media_type == NDJSON else config.HISTORY_MAX_LIMIT
     try:
-        from db import get_connection
-        
-        conn = get_connection()
-        cur = conn.cursor(dictionary=True)
-        
-        limit = request.args.get('limit', 50, type=int)
-        cur.execute("SELECT * FROM lever_history ORDER BY timestamp DESC LIMIT %s", (limit,))
-        history = cur.fetchall()
-        
-        cur.close()
-        conn.close()
-        
+        query = HistoryQuery.from_args(lever.id, request.args, max_limit=max_limit)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        get_history_writer().request_flush()
+
+        results = get_storage().query_history(query)
+
+        if encoder.media_type == NDJSON:
+            response = Response(encoder.stream_history(query, results), status=200, mimetype=NDJSON)
+            response.vary.add('Accept')
+            return response
+        if encoder.media_type != JSON:
+            rows, next_cursor = paginate(query, results)
+            return jsonify({
+                "success": True,
+                "data": rows,
+                "count": len(rows),
+                "next_cursor": next_cursor
+            }), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    def rows():
+        count = 0
+        last_row = next_cursor = None
+        try:
+            yield b'{"success":true,"data":['
+            for row in results:
+                if count == query.limit:
+                    next_cursor = encode_cursor(last_row)
+                    continue
+                yield (b"," if count else b"") + encoder.dumps(query.project(row))
+                last_row = row
+                count += 1
+            yield b'],"count":%d,"next_cursor":%s}' % (count, encoder.dumps(next_cursor))
+        finally:
+            results.close()
+
+    response = Response(rows(), status=200, mimetype=JSON)
+    response.vary.add('Accept')
+    return response
+
+@app.route('/api/lever/history/archive', methods=['GET'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/history/archive', methods=['GET'])
+def get_history_archive(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+    if cluster is not None and not cluster.is_archiver():
+        return _forward_archive_read()
+
+    try:
+        query = HistoryQuery.from_args(lever.id, request.args, max_limit=config.HISTORY_MAX_LIMIT)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        rows, next_cursor = paginate(query, history_archive.query(query))
         return jsonify({
             "success": True,
-            "data": history,
-            "count": len(history)
+            "data": rows,
+            "count": len(rows),
+            "next_cursor": next_cursor
         }), 200
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/lever/history/rollup', methods=['GET'], defaults={'lever_id': DEFAULT_LEVER_ID})
+@app.route('/api/levers/<int:lever_id>/history/rollup', methods=['GET'])
+def get_history_rollup(lever_id):
+    lever = fleet.get(lever_id)
+    if lever is None:
+        return _lever_not_found(lever_id)
+
+    try:
+        query = RollupQuery.from_args(lever.id, request.args, max_buckets=config.ROLLUP_MAX_BUCKETS)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        get_history_writer().request_flush()
+        return jsonify(describe_rollups(query, query.run())), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/system/advance', methods=['POST'])
+def advance_clock():
+    if not fleet.simulated:
+        return jsonify({"success": False, "error": "Clock is not simulated, set LEVER_CLOCK=simulated"}), 409
+
+    try:
+        seconds = parse_advance(request.get_json(silent=True), max_seconds=config.SIMULATE_MAX_ADVANCE)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        ticks = fleet.scheduler.advance(seconds)
+        return jsonify({"success": True, "ticks": ticks, "clock": fleet.scheduler.clock()}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/api/system/health', methods=['GET'])
 def health():
+    lever = fleet.get(DEFAULT_LEVER_ID)
     return jsonify({
         "success": True,
         "message": "FSM API running",
-        "tick_running": tick_running,
-        "current_state": lever.fsm.get_state().value
+        "tick_running": fleet.scheduler.running,
+        "levers": len(fleet),
+        "current_state": lever.fsm.get_state().value if lever else None,
+        "scheduler": fleet.scheduler.get_stats(),
+        "db_pool": get_pool_stats(),
+        "storage": get_storage().get_stats(),
+        "state_writer": lever.writer.get_stats() if lever else None,
+        "history_writer": get_history_writer().get_stats(),
+        "archiver": archiver.get_stats() if archiver else None,
+        "rollups": get_rollup_aggregator().get_stats() if config.ROLLUPS_ENABLED else None,
+        "event_log": fleet.event_log.get_stats() if fleet.event_log else None,
+        "cluster": cluster.get_stats() if cluster else None,
+        "config_reloader": reloader.get_stats() if reloader else None,
+        "status_cache": status_cache.get_stats(),
+        "encoders": response_encoders.get_stats(),
+        "stream": broadcaster.get_stats()
     }), 200
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
+    create_app().run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
 
 
 
@@ -0,0 +1,193 @@
+from datetime import datetime, timedelta
+from storage import get_storage
+import config
+import gzip
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.jsonl"
+
+
+def _encode_row(row):
+    return json.dumps(dict(row, timestamp=row["timestamp"].isoformat()), separators=(",", ":"))
+
+
+def _decode_row(line):
+    row = json.loads(line)
+    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+class HistoryArchive:
+    def __init__(self, directory=None):
+        self.directory = directory or config.HISTORY_ARCHIVE_DIR
+        self._lock = threading.Lock()
+        self._entries = []
+        self._manifest_size = 0
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, MANIFEST)
+
+    def entries(self):
+        with self._lock:
+            try:
+                size = os.path.getsize(self.manifest_path)
+            except OSError:
+                return []
+
+            if size != self._manifest_size:
+                with open(self.manifest_path) as f:
+                    f.seek(self._manifest_size)
+                    for line in f:
+                        if line.strip():
+                            self._entries.append(json.loads(line))
+                    self._manifest_size = f.tell()
+            return list(self._entries)
+
+    def write_chunk(self, rows):
+        os.makedirs(self.directory, exist_ok=True)
+        first, last = rows[0], rows[-1]
+        name = f"lever_history-{first['timestamp']:%Y%m%dT%H%M%S}-{first['id']}.jsonl.gz"
+        path = os.path.join(self.directory, name)
+
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+            for row in rows:
+                f.write(_encode_row(row) + "\n")
+        os.replace(path + ".tmp", path)
+
+        entry = {
+            "file": name,
+            "rows": len(rows),
+            "since": first["timestamp"].isoformat(),
+            "until": last["timestamp"].isoformat(),
+            "levers": sorted({row["lever_id"] for row in rows}),
+        }
+        with self._lock:
+            with open(self.manifest_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        return entry
+
+    def read_chunk(self, entry):
+        with gzip.open(os.path.join(self.directory, entry["file"]), "rt", encoding="utf-8") as f:
+            return [_decode_row(line) for line in f if line.strip()]
+
+    def query(self, query):
+        for entry in reversed(self.entries()):
+            if query.lever_id not in entry["levers"]:
+                continue
+            since = datetime.fromisoformat(entry["since"])
+            until = datetime.fromisoformat(entry["until"])
+            if query.since and until < query.since:
+                break
+            if query.until and since >= query.until:
+                continue
+            if query.after and since > query.after[0]:
+                continue
+
+            for row in reversed(self.read_chunk(entry)):
+                if query.matches(row):
+                    yield row
+
+    def get_stats(self):
+        entries = self.entries()
+        return {
+            "directory": self.directory,
+            "files": len(entries),
+            "rows": sum(entry["rows"] for entry in entries),
+            "oldest": entries[0]["since"] if entries else None,
+            "newest": entries[-1]["until"] if entries else None,
+        }
+
+
+class HistoryArchiver:
+    def __init__(self, archive=None, storage=None, retention_days=None, chunk_rows=None, interval=None, leader=None):
+        self.archive = archive or HistoryArchive()
+        self.leader = leader
+        self.storage = storage or get_storage()
+        self.retention_days = config.HISTORY_RETENTION_DAYS if retention_days is None else retention_days
+        self.chunk_rows = chunk_rows or config.HISTORY_ARCHIVE_CHUNK_ROWS
+        self.interval = config.HISTORY_ARCHIVE_INTERVAL if interval is None else interval
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._recovered = False
+
+        self.stats = {
+            "runs": 0, "skipped": 0, "archived": 0, "files": 0, "errors": 0, "last_run": None, "last_error": None
+        }
+
+    def start(self):
+        if self.retention_days <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="history-archiver", daemon=True)
+        self._thread.start()
+        logger.info(f"Archiving lever_history older than {self.retention_days} days to {self.archive.directory}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def run_once(self, now=None):
+        with self._lock:
+            self._recover()
+            cutoff = (now or datetime.now()) - timedelta(days=self.retention_days)
+            archived = 0
+            while not self._stop.is_set():
+                rows = self.storage.expired_history(cutoff, self.chunk_rows)
+                if not rows:
+                    break
+                self.archive.write_chunk(rows)
+                self.storage.delete_history([row["id"] for row in rows])
+                archived += len(rows)
+                self.stats["files"] += 1
+                if len(rows) < self.chunk_rows:
+                    break
+
+            self.stats["runs"] += 1
+            self.stats["archived"] += archived
+            self.stats["last_run"] = datetime.now().isoformat(timespec="seconds")
+            if archived:
+                logger.info(f"Archived {archived} lever_history rows older than {cutoff.isoformat()}")
+            return archived
+
+    def get_stats(self):
+        return {
+            "retention_days": self.retention_days,
+            "chunk_rows": self.chunk_rows,
+            "interval": self.interval,
+            "running": self._thread is not None,
+            **self.stats
+        }
+
+    def _recover(self):
+        if self._recovered:
+            return
+        entries = self.archive.entries()
+        if entries:
+            self.storage.delete_history([row["id"] for row in self.archive.read_chunk(entries[-1])])
+        self._recovered = True
+
+    def _run(self):
+        while True:
+            try:
+                if self.leader is None or self.leader():
+                    self.run_once()
+                else:
+                    self.stats["skipped"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+                logger.error(f"Error archiving lever_history: {e}")
+            if self._stop.wait(self.interval):
+                return
@@ -0,0 +1,576 @@
+from archive import HistoryArchive, HistoryArchiver
+from audit import close_history_writer, get_history_writer
+from cluster import Cluster, FORWARDED_HEADER, NoOwnerError, advertise_url
+from commands import (
+    describe_results, describe_simulation, parse_advance, parse_commands, parse_config, parse_simulation
+)
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from db import get_pool_stats
+from encoders import HISTORY_OFFERS, NDJSON, ResponseEncoders
+from eventlog import create_event_log
+from fleet import LeverFleet, DEFAULT_LEVER_ID
+from history import HistoryQuery, paginate
+from itertools import islice
+from reloader import ConfigReloader
+from rollups import RollupQuery, describe_rollups, get_rollup_aggregator
+from snapshots import SnapshotCache
+from storage import close_storage, get_storage
+from stream import StateBroadcaster
+from urllib.parse import parse_qsl
+import asyncio
+import config
+import json
+import logging
+import metrics
+import re
+import socket
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROUTE = re.compile(r"^/api/(?:lever|levers/(?P<lever_id>\d+))/(?P<action>[a-z-]+|history/rollup|history/archive)$")
+
+COMMANDS = {
+    "pull-up": "pull_up",
+    "pull-down": "pull_down",
+    "pause": "pause",
+    "resume": "resume",
+    "stop": "stop",
+}
+
+ACTIONS = frozenset(COMMANDS) | {
+    "status", "stream", "history", "history/archive", "history/rollup", "config", "set-heat", "commands", "simulate",
+    "reset"
+}
+
+EXPORT_CHUNK_LINES = 500
+
+response_encoder = ContextVar("response_encoder", default=None)
+
+
+class QueryArgs(dict):
+    def get(self, key, default=None, type=None):
+        if key not in self:
+            return default
+        if type is None:
+            return self[key]
+        try:
+            return type(self[key])
+        except ValueError:
+            return default
+
+
+def _route_label(path):
+    match = ROUTE.match(path)
+    if match is None:
+        return path if path in ("/api/levers", "/api/system/health", "/api/system/advance", "/metrics") else "unmatched"
+    if match["action"] not in ACTIONS:
+        return "unmatched"
+    if match["lever_id"]:
+        return f"/api/levers/<int:lever_id>/{match['action']}"
+    return f"/api/lever/{match['action']}"
+
+
+def _render_status(lever, encoder):
+    return encoder.render_status(lever.get_state(), lever.get_status_message())
+
+
+class LeverASGI:
+    def __init__(self, fleet=None, executor_workers=None):
+        self.fleet = fleet
+        self.executor = ThreadPoolExecutor(
+            max_workers=executor_workers or config.ASYNC_EXECUTOR_WORKERS,
+            thread_name_prefix="lever-io"
+        )
+        self.tick_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lever-tick")
+        self.broadcaster = StateBroadcaster(buffer_size=config.STREAM_BUFFER_SIZE)
+        self.encoders = ResponseEncoders()
+        self.status_cache = SnapshotCache(_render_status)
+        self.tick_task = None
+        self.cluster = None
+        self.listener = None
+        self.listener_task = None
+        self.reloader = None
+        self.archive = HistoryArchive()
+        self.archiver = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            if not metrics.ENABLED:
+                return await self._http(scope, receive, send)
+
+            started = time.perf_counter()
+            status = []
+
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    status.append(message["status"])
+                await send(message)
+
+            try:
+                await self._http(scope, receive, send_with_status)
+            finally:
+                metrics.HTTP_REQUEST_SECONDS.labels(
+                    scope["method"], _route_label(scope["path"]), status[0] if status else 500
+                ).observe(time.perf_counter() - started)
+
+    async def run_blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def startup(self):
+        if self.fleet is None:
+            self.fleet = await self.run_blocking(lambda: LeverFleet(event_log=create_event_log()).load())
+        self.fleet.add_listener(self.broadcaster.publish)
+        self.fleet.add_discard_listener(self.status_cache.discard)
+        metrics.REGISTRY.add_collector(self.fleet.collect_metrics)
+        if config.CLUSTER:
+            self.cluster = Cluster(self.fleet, await self._start_internal_listener())
+            await self.run_blocking(self.cluster.start)
+        self.reloader = ConfigReloader(self.fleet)
+        self.reloader.start()
+        self.archiver = HistoryArchiver(self.archive, leader=self.cluster.is_archiver if self.cluster else None)
+        self.archiver.start()
+        if not self.fleet.simulated:
+            self.tick_task = asyncio.create_task(self._tick_loop())
+        logger.info(f"ASGI mode serving {len(self.fleet)} levers")
+
+    async def shutdown(self):
+        if self.tick_task is not None:
+            self.tick_task.cancel()
+            try:
+                await self.tick_task
+            except asyncio.CancelledError:
+                pass
+            self.tick_task = None
+
+        if self.archiver is not None:
+            await self.run_blocking(self.archiver.stop)
+        if self.reloader is not None:
+            await self.run_blocking(self.reloader.stop)
+        if self.cluster is not None:
+            await self.run_blocking(self.cluster.stop)
+        if self.listener is not None:
+            self.listener.should_exit = True
+            await self.listener_task
+            self.listener = self.listener_task = None
+        metrics.REGISTRY.remove_collector(self.fleet.collect_metrics)
+        await self.run_blocking(self._close_fleet)
+        self.tick_executor.shutdown(wait=True)
+        self.executor.shutdown(wait=True)
+
+    async def _start_internal_listener(self):
+        import uvicorn
+
+        # A per-worker port, so workers sharing the public port still advertise distinct URLs.
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((config.CLUSTER_BIND_HOST, 0))
+        self.listener = uvicorn.Server(uvicorn.Config(self, lifespan="off", log_level="warning"))
+        self.listener_task = asyncio.create_task(self.listener.serve(sockets=[sock]))
+        while not self.listener.started:
+            if self.listener_task.done():
+                await self.listener_task
+                raise RuntimeError("Cluster listener failed to start")
+            await asyncio.sleep(0.01)
+        return advertise_url(sock.getsockname()[1])
+
+    def _close_fleet(self):
+        for lever in self.fleet:
+            lever.writer.close()
+        if self.fleet.event_log is not None:
+            self.fleet.event_log.close()
+        close_history_writer()
+        close_storage()
+
+    async def _tick_loop(self):
+        scheduler = self.fleet.scheduler
+        scheduler.running = True
+        try:
+            while True:
+                deadline = scheduler.next_deadline()
+                delay = 0.05 if deadline is None else deadline - scheduler.clock()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await asyncio.get_running_loop().run_in_executor(self.tick_executor, scheduler.run_pending)
+        finally:
+            scheduler.running = False
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.exception("ASGI startup failed")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        path = scope["path"]
+        method = scope["method"]
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        args = QueryArgs(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        response_encoder.set(self.encoders.negotiate(headers.get("accept")))
+
+        try:
+            if path == "/api/system/health" and method == "GET":
+                return await self._send_json(send, 200, self.health())
+            if path == "/metrics" and method == "GET":
+                body = metrics.render().encode()
+                await send({
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", metrics.CONTENT_TYPE.encode())]
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+            if path == "/api/system/advance" and method == "POST":
+                return await self._advance(send, await self._read_body(receive))
+            if path == "/api/levers" and method == "GET":
+                levers = [{"id": lever.id, **lever.get_state()} for lever in self.fleet]
+                return await self._send_json(send, 200, {"success": True, "data": levers, "count": len(levers)})
+
+            match = ROUTE.match(path)
+            if match is None or match["action"] not in ACTIONS:
+                return await self._send_json(send, 404, {"success": False, "error": "Not found"})
+
+            lever_id = int(match["lever_id"]) if match["lever_id"] else DEFAULT_LEVER_ID
+            lever = self.fleet.get(lever_id)
+            if lever is None:
+                return await self._send_json(send, 404, {"success": False, "error": f"Lever {lever_id} not found"})
+
+            action = match["action"]
+            if method == "POST" and self.cluster is not None and not self.cluster.is_owner(lever_id):
+                return await self._forward(scope, receive, send, lever_id, headers)
+            if method == "GET" and action == "status":
+                return await self._status(send, lever, headers)
+            if method == "GET" and action == "stream":
+                return await self._stream(receive, send, lever)
+            if method == "GET" and action == "history":
+                return await self._history(send, lever, args, headers)
+            if method == "GET" and action == "history/archive":
+                if self.cluster is not None and not self.cluster.is_archiver():
+                    return await self._forward_archive(scope, send, headers)
+                return await self._history(send, lever, args, headers, archived=True)
+            if method == "GET" and action == "history/rollup":
+                return await self._rollup(send, lever, args)
+            if method == "GET" and action == "config":
+                return await self._send_json(send, 200, {"success": True, "data": lever.config._asdict()})
+            if method == "POST" and action in COMMANDS:
+                result = await self.run_blocking(getattr(lever, COMMANDS[action]))
+                return await self._send_json(send, 200, {"success": True, "message": result, "data": lever.get_state()})
+            if method == "POST" and action == "set-heat":
+                return await self._set_heat(send, lever, await self._read_body(receive))
+            if method == "POST" and action == "config":
+                return await self._config(send, lever, await self._read_body(receive))
+            if method == "POST" and action == "commands":
+                return await self._commands(send, lever, await self._read_body(receive))
+            if method == "POST" and action == "simulate":
+                return await self._simulate(send, lever, await self._read_body(receive))
+            if method == "POST" and action == "reset":
+                await self.run_blocking(lever.reset)
+                return await self._send_json(send, 200, {"success": True, "message": "Reset complete", "data": lever.get_state()})
+
+            return await self._send_json(send, 405, {"success": False, "error": "Method not allowed"})
+        except Exception as e:
+            logger.exception(f"Error handling {method} {path}")
+            return await self._send_json(send, 500, {"success": False, "error": str(e)})
+
+    def health(self):
+        lever = self.fleet.get(DEFAULT_LEVER_ID)
+        return {
+            "success": True,
+            "message": "FSM API running",
+            "mode": "asgi",
+            "tick_running": self.tick_task is not None and not self.tick_task.done(),
+            "levers": len(self.fleet),
+            "current_state": lever.fsm.get_state().value if lever else None,
+            "scheduler": self.fleet.scheduler.get_stats(),
+            "db_pool": get_pool_stats(),
+            "storage": get_storage().get_stats(),
+            "state_writer": lever.writer.get_stats() if lever else None,
+            "history_writer": get_history_writer().get_stats(),
+            "archiver": self.archiver.get_stats() if self.archiver else None,
+            "rollups": get_rollup_aggregator().get_stats() if config.ROLLUPS_ENABLED else None,
+            "event_log": self.fleet.event_log.get_stats() if self.fleet.event_log else None,
+            "cluster": self.cluster.get_stats() if self.cluster else None,
+            "config_reloader": self.reloader.get_stats() if self.reloader else None,
+            "status_cache": self.status_cache.get_stats(),
+            "encoders": self.encoders.get_stats(),
+            "stream": self.broadcaster.get_stats()
+        }
+
+    async def _status(self, send, lever, headers):
+        encoder = response_encoder.get()
+        _, body, etag = self.status_cache.get(lever, encoder)
+        quoted = f'"{etag}"'
+        response_headers = [(b"etag", quoted.encode()), (b"cache-control", b"no-cache"), (b"vary", b"Accept")]
+
+        if quoted in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+            await send({"type": "http.response.start", "status": 304, "headers": response_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", encoder.media_type.encode())] + response_headers
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _stream(self, receive, send, lever):
+        subscription, generation, snapshot = self.broadcaster.subscribe(lever, loop=asyncio.get_running_loop())
+        dumps = self.encoders.json.dumps
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no")
+                ]
+            })
+            frame = f"retry: 2000\nid: {generation}\nevent: snapshot\ndata: {dumps(snapshot).decode()}\n\n"
+            await send({"type": "http.response.body", "body": frame.encode(), "more_body": True})
+
+            while not disconnected.done():
+                messages = await subscription.get(timeout=config.STREAM_HEARTBEAT)
+                if not messages:
+                    frame = ": heartbeat\n\n"
+                else:
+                    frame = "".join(
+                        f"id: {message_generation}\nevent: delta\ndata: {dumps(delta).decode()}\n\n"
+                        for message_generation, delta in messages
+                    )
+                await send({"type": "http.response.body", "body": frame.encode(), "more_body": True})
+        finally:
+            disconnected.cancel()
+            self.broadcaster.unsubscribe(subscription)
+
+    async def _wait_disconnect(self, receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def _history(self, send, lever, args, headers, archived=False):
+        encoder = self.encoders.negotiate(headers.get("accept"), HISTORY_OFFERS)
+        export = encoder.media_type == NDJSON and not archived
+        max_limit = config.HISTORY_EXPORT_MAX_LIMIT if export else config.HISTORY_MAX_LIMIT
+        try:
+            query = HistoryQuery.from_args(lever.id, args, max_limit=max_limit)
+        except ValueError as e:
+            return await self._send_json(send, 400, {"success": False, "error": str(e)})
+
+        if export:
+            return await self._export_history(send, encoder, query)
+
+        fetch = self._fetch_archive if archived else self._fetch_history
+        rows, next_cursor = await self.run_blocking(fetch, query)
+        return await self._send_json(send, 200, {
+            "success": True,
+            "data": rows,
+            "count": len(rows),
+            "next_cursor": next_cursor
+        })
+
+    async def _rollup(self, send, lever, args):
+        try:
+            query = RollupQuery.from_args(lever.id, args, max_buckets=config.ROLLUP_MAX_BUCKETS)
+        except ValueError as e:
+            return await self._send_json(send, 400, {"success": False, "error": str(e)})
+
+        rows = await self.run_blocking(self._fetch_rollups, query)
+        return await self._send_json(send, 200, describe_rollups(query, rows))
+
+    def _fetch_rollups(self, query):
+        get_history_writer().request_flush()
+        return query.run()
+
+    def _fetch_archive(self, query):
+        return paginate(query, self.archive.query(query))
+
+    def _fetch_history(self, query):
+        return paginate(query, self._open_history(query))
+
+    def _open_history(self, query):
+        get_history_writer().request_flush()
+
+        return get_storage().query_history(query)
+
+    async def _export_history(self, send, encoder, query):
+        lines = encoder.stream_history(query, await self.run_blocking(self._open_history, query))
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", encoder.media_type.encode()), (b"vary", b"Accept")]
+            })
+            while True:
+                chunk = await self.run_blocking(b"".join, islice(lines, EXPORT_CHUNK_LINES))
+                if not chunk:
+                    break
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await self.run_blocking(lines.close)
+
+    async def _set_heat(self, send, lever, body):
+        try:
+            data = json.loads(body or b"null")
+        except ValueError:
+            data = None
+        heat = data.get("heat") if isinstance(data, dict) else None
+
+        if heat is None:
+            return await self._send_json(send, 400, {"success": False, "error": "Heat required"})
+
+        await self.run_blocking(lever.set_heat, float(heat))
+        return await self._send_json(send, 200, {
+            "success": True,
+            "message": f"Heat set to {heat}",
+            "data": lever.get_state()
+        })
+
+    async def _config(self, send, lever, body):
+        try:
+            values = parse_config(json.loads(body or b"null"), lever.config)
+        except ValueError as e:
+            return await self._send_json(send, 400, {"success": False, "error": str(e)})
+
+        def update():
+            row = get_storage().save_config(lever.id, values)
+            return self.fleet.reconfigure(lever.id, row)
+
+        previous = await self.run_blocking(update)
+        return await self._send_json(send, 200, {
+            "success": True,
+            "data": lever.config._asdict(),
+            "previous": previous._asdict()
+        })
+
+    async def _commands(self, send, lever, body):
+        try:
+            payload = json.loads(body or b"null")
+            commands, atomic = parse_commands(payload, max_commands=config.COMMAND_BATCH_MAX)
+        except ValueError as e:
+            return await self._send_json(send, 400, {"success": False, "error": str(e)})
+
+        results, committed = await self.run_blocking(lever.apply_commands, commands, atomic)
+        return await self._send_json(send, 200 if committed else 409, {
+            "success": committed,
+            "committed": committed,
+            "results": describe_results(commands, results),
+            "data": lever.get_state()
+        })
+
+    async def _simulate(self, send, lever, body):
+        try:
+            options = parse_simulation(
+                json.loads(body or b"null"),
+                max_ticks=config.SIMULATE_MAX_TICKS,
+                max_commands=config.COMMAND_BATCH_MAX
+            )
+        except ValueError as e:
+            return await self._send_json(send, 400, {"success": False, "error": str(e)})
+
+        ran, points, final = await self.run_blocking(lambda: lever.simulate(**options))
+        return await self._send_json(send, 200, describe_simulation(options, ran, points, final))
+
+    async def _advance(self, send, body):
+        if not self.fleet.simulated:
+            return await self._send_json(send, 409, {
+                "success": False,
+                "error": "Clock is not simulated, set LEVER_CLOCK=simulated"
+            })
+
+        try:
+            seconds = parse_advance(json.loads(body or b"null"), max_seconds=config.SIMULATE_MAX_ADVANCE)
+        except ValueError as e:
+            return await self._send_json(send, 400, {"success": False, "error": str(e)})
+
+        ticks = await self.run_blocking(self.fleet.scheduler.advance, seconds)
+        return await self._send_json(send, 200, {"success": True, "ticks": ticks, "clock": self.fleet.scheduler.clock()})
+
+    async def _forward(self, scope, receive, send, lever_id, headers):
+        if headers.get(FORWARDED_HEADER.lower()):
+            return await self._send_json(send, 503, {"success": False, "error": f"Lever {lever_id} is not owned by this node"})
+
+        path = scope["path"]
+        if scope.get("query_string"):
+            path += "?" + scope["query_string"].decode("latin-1")
+        body = await self._read_body(receive)
+        try:
+            status, body, content_type = await self.run_blocking(
+                self.cluster.forward, lever_id, scope["method"], path, body, headers.get("content-type"),
+                headers.get("accept")
+            )
+        except NoOwnerError as e:
+            return await self._send_json(send, 503, {"success": False, "error": str(e)})
+        await self._send_forwarded(send, status, body, content_type)
+
+    async def _forward_archive(self, scope, send, headers):
+        if headers.get(FORWARDED_HEADER.lower()):
+            return await self._send_json(send, 503, {"success": False, "error": "History archive is not held by this node"})
+
+        path = scope["path"]
+        if scope.get("query_string"):
+            path += "?" + scope["query_string"].decode("latin-1")
+        try:
+            status, body, content_type = await self.run_blocking(
+                self.cluster.forward_archive, path, headers.get("accept")
+            )
+        except NoOwnerError as e:
+            return await self._send_json(send, 503, {"success": False, "error": str(e)})
+        await self._send_forwarded(send, status, body, content_type)
+
+    async def _send_forwarded(self, send, status, body, content_type):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", (content_type or "application/json").encode("latin-1")),
+                (b"content-length", str(len(body)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _read_body(self, receive):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return body
+
+    async def _send_json(self, send, status, payload):
+        encoder = response_encoder.get() or self.encoders.json
+        body = encoder.dumps(payload)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", encoder.media_type.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b"Accept")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+app = LeverASGI()
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=5000)
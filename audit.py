@@ -0,0 +1,215 @@
+from collections import deque
+from rollups import record_rollups
+from storage import get_storage
+import config
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DROP_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class HistoryWriter:
+    def __init__(
+        self,
+        write,
+        max_queue=10000,
+        batch_size=100,
+        flush_interval=0.5,
+        drop_policy="drop_oldest",
+        block_timeout=1.0
+    ):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {drop_policy!r}, expected one of {DROP_POLICIES}")
+
+        self._write = write
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._thread = None
+
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "dropped_oldest": 0,
+            "dropped_newest": 0,
+            "blocked": 0,
+            "failed": 0,
+            "max_depth": 0,
+        }
+
+    def append(self, row):
+        with self._cond:
+            if self._thread is None and not self._closed:
+                self._start()
+
+            if len(self._queue) >= self.max_queue:
+                if not self._make_room():
+                    return False
+
+            self._queue.append(row)
+            self.stats["enqueued"] += 1
+            depth = len(self._queue)
+            if depth > self.stats["max_depth"]:
+                self.stats["max_depth"] = depth
+            if depth >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._thread is None or self._closed:
+                self._drain_locked()
+                return True
+
+            while self._queue or self._in_flight:
+                self._flush_requested = True
+                self._cond.notify_all()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def request_flush(self):
+        with self._cond:
+            if self._queue and self._thread is not None:
+                self._flush_requested = True
+                self._cond.notify_all()
+
+    def close(self, timeout=5.0):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout=timeout)
+
+        with self._cond:
+            self._drain_locked()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["depth"] = len(self._queue)
+        stats["max_queue"] = self.max_queue
+        stats["batch_size"] = self.batch_size
+        stats["drop_policy"] = self.drop_policy
+        return stats
+
+    def _make_room(self):
+        if self.drop_policy == "drop_oldest":
+            self._queue.popleft()
+            self.stats["dropped_oldest"] += 1
+            return True
+
+        if self.drop_policy == "block" and not self._closed:
+            self.stats["blocked"] += 1
+            deadline = time.monotonic() + self.block_timeout
+            while len(self._queue) >= self.max_queue:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.notify_all()
+                self._cond.wait(remaining)
+            else:
+                return True
+
+        self.stats["dropped_newest"] += 1
+        return False
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(self._batch_ready, self.flush_interval)
+                if self._closed:
+                    return
+                self._flush_requested = False
+                batch = self._take_batch()
+
+            if batch:
+                self._write_batch(batch)
+
+    def _batch_ready(self):
+        return len(self._queue) >= self.batch_size or self._flush_requested or self._closed
+
+    def _take_batch(self):
+        count = min(len(self._queue), self.batch_size)
+        batch = [self._queue.popleft() for _ in range(count)]
+        self._in_flight += count
+        return batch
+
+    def _write_batch(self, batch):
+        try:
+            self._write(batch)
+            written, failed = len(batch), 0
+        except Exception as e:
+            logger.error(f"Error logging: {e}")
+            written, failed = 0, len(batch)
+
+        with self._cond:
+            self._in_flight -= len(batch)
+            self.stats["written"] += written
+            self.stats["failed"] += failed
+            if written:
+                self.stats["batches"] += 1
+            self._cond.notify_all()
+
+    def _drain_locked(self):
+        while self._queue:
+            batch = self._take_batch()
+            self._cond.release()
+            try:
+                self._write_batch(batch)
+            finally:
+                self._cond.acquire()
+
+
+def insert_history_rows(rows):
+    get_storage().insert_history(rows)
+    record_rollups(rows)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_history_writer():
+    global _writer
+
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = HistoryWriter(
+                    insert_history_rows,
+                    max_queue=config.HISTORY_QUEUE_SIZE,
+                    batch_size=config.HISTORY_BATCH_SIZE,
+                    flush_interval=config.HISTORY_FLUSH_INTERVAL,
+                    drop_policy=config.HISTORY_DROP_POLICY
+                )
+    return _writer
+
+
+def close_history_writer():
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
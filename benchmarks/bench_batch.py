@@ -0,0 +1,109 @@
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import numpy as np
+from benchmarks.fakedb import FakeDB
+from models.lever import Lever
+from models.lever_batch import COMMAND_EVENTS, LeverBatch
+from states import LeverEvent
+
+STATES = ("STOPPED", "MOVING_UP", "MOVING_DOWN", "STARTING_UP", "STARTING_DOWN",
+          "SLOWING_UP", "SLOWING_DOWN", "SEALING", "PAUSED", "AT_TOP", "AT_BOTTOM")
+
+
+def random_levers(count, seed):
+    rng = random.Random(seed)
+    levers = []
+    for lever_id in range(count):
+        config_row = {
+            "lower_limit": rng.choice([0, 5]),
+            "upper_limit": rng.choice([100, 60]),
+            "step": rng.choice([1, 2, 0.5]),
+            "tick_ms": 100,
+            "sealing_duration": rng.choice([3, 10]),
+        }
+        state_row = {
+            "position": rng.uniform(5, 60),
+            "heat": rng.choice([0, 40, 45, 50, 55]),
+            "state": rng.choice(STATES),
+            "sealing_progress": 0,
+        }
+        levers.append(Lever(lever_id, config_row=config_row, state_row=state_row))
+    return levers
+
+
+def check_conformance(count, ticks, seed):
+    rng = random.Random(seed)
+    levers = random_levers(count, seed)
+    batch = LeverBatch.from_levers(levers)
+
+    for step in range(ticks):
+        if step % 7 == 0:
+            event = rng.choice(COMMAND_EVENTS)
+            mask = np.array([rng.random() < 0.3 for _ in levers])
+            for lever, selected in zip(levers, mask):
+                if selected:
+                    lever.fsm.trigger(event)
+            batch.apply(event, mask)
+
+        for lever in levers:
+            lever.fsm.trigger(LeverEvent.TICK)
+        batch.tick()
+
+        for index, lever in enumerate(levers):
+            lever.persist()
+            if batch.get_state(index) != lever.get_state():
+                raise AssertionError(
+                    f"tick {step}, lever {index}: batch {batch.get_state(index)} != scalar {lever.get_state()}"
+                )
+    return count * ticks
+
+
+def bench(count, ticks):
+    levers = random_levers(count, seed=1)
+    batch = LeverBatch.from_levers(levers)
+
+    started = time.perf_counter()
+    for _ in range(ticks):
+        for lever in levers:
+            lever.fsm.trigger(LeverEvent.TICK)
+    scalar = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch.tick(ticks)
+    vectorized = time.perf_counter() - started
+
+    return {
+        "levers": count,
+        "ticks": ticks,
+        "scalar_lever_ticks_per_sec": round(count * ticks / scalar),
+        "batch_lever_ticks_per_sec": round(count * ticks / vectorized),
+        "speedup": round(scalar / vectorized, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized LeverBatch against scalar Lever")
+    parser.add_argument("--levers", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--ticks", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    db.configure_pool(FakeDB().connect)
+
+    checked = check_conformance(500, 300, seed=7)
+    print(f"conformance: {checked} lever-ticks identical to scalar Lever")
+
+    for count in args.levers:
+        print(bench(count, args.ticks))
+
+
+if __name__ == "__main__":
+    main()
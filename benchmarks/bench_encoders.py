@@ -0,0 +1,159 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encoders import JSON, MSGPACK, NDJSON, JSONEncoder, NDJSONEncoder, OrjsonEncoder, MsgpackEncoder
+from history import HistoryQuery
+from models.lever import Lever
+from storage import MemoryStorage, configure_storage
+
+CONFIG_ROW = {"lower_limit": 0, "upper_limit": 100, "step": 1, "tick_ms": 100, "sealing_duration": 10}
+STATE_ROW = {"position": 37.25, "heat": 45.5, "state": "MOVING_UP", "sealing_progress": 0}
+
+HISTORY_ACTIONS = ("PULL_UP", "PULL_DOWN", "REACHED_TOP", "REACHED_BOTTOM", "SEALING_COMPLETE", "RESET")
+
+
+def per_call_us(func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return round((time.perf_counter() - started) / iterations * 1e6, 2)
+
+
+def history_rows(count):
+    base = datetime(2024, 1, 1)
+    return [
+        {
+            "id": count - index,
+            "lever_id": 1,
+            "action": HISTORY_ACTIONS[index % len(HISTORY_ACTIONS)],
+            "position": float(index % 100),
+            "heat": 45.0,
+            "state": "MOVING_UP",
+            "details": "",
+            "timestamp": base - timedelta(milliseconds=index),
+        }
+        for index in range(count)
+    ]
+
+
+def baseline_encoders(app):
+    # What every handler did before: the default Flask provider, sorted keys and werkzeug HTTP dates.
+    from flask.json.provider import DefaultJSONProvider
+
+    provider = DefaultJSONProvider(app)
+    return {
+        "flask_default": lambda value: provider.dumps(value, separators=(",", ":")).encode(),
+    }
+
+
+def create_encoders():
+    encoders = {"json": JSONEncoder()}
+    for name, factory in (("orjson", OrjsonEncoder), ("msgpack", MsgpackEncoder)):
+        try:
+            encoders[name] = factory()
+        except ImportError:
+            print(f"{name} is not installed, skipping")
+    return encoders
+
+
+def bench_status(encoders, baselines, iterations):
+    lever = Lever(1, config_row=CONFIG_ROW, state_row=STATE_ROW)
+    state = lever.get_state()
+    message = lever.get_status_message()
+    payload = {"success": True, "data": state, "message": message}
+
+    results = {}
+    for name, dumps in baselines.items():
+        results[name] = {"us": per_call_us(lambda: dumps(payload), iterations), "bytes": len(dumps(payload))}
+    for name, encoder in encoders.items():
+        results[f"{name}_dumps"] = {"us": per_call_us(lambda: encoder.dumps(payload), iterations)}
+        results[f"{name}_render_status"] = {
+            "us": per_call_us(lambda: encoder.render_status(state, message), iterations),
+            "bytes": len(encoder.render_status(state, message)),
+        }
+    lever.writer.close()
+    return results
+
+
+def bench_history(encoders, baselines, rows, iterations):
+    page = {"success": True, "data": rows, "count": len(rows), "next_cursor": "MjAyNC0wMS0wMVQwMDowMDowMHwx"}
+    query = HistoryQuery(1, limit=len(rows), max_limit=len(rows))
+
+    results = {}
+    for name, dumps in baselines.items():
+        results[name] = {"us": per_call_us(lambda: dumps(page), iterations), "bytes": len(dumps(page))}
+    for name, encoder in encoders.items():
+        results[name] = {"us": per_call_us(lambda: encoder.dumps(page), iterations), "bytes": len(encoder.dumps(page))}
+        if encoder.media_type == JSON:
+            ndjson = NDJSONEncoder(encoder)
+            export = lambda: b"".join(ndjson.stream_history(query, iter(rows)))
+            results[f"{name}_ndjson"] = {"us": per_call_us(export, iterations), "bytes": len(export())}
+    return results
+
+
+def bench_http(app, requests):
+    client = app.test_client()
+    results = {}
+    for name, path, accept in (
+        ("status_json", "/api/lever/status", JSON),
+        ("status_msgpack", "/api/lever/status", MSGPACK),
+        ("history_json", "/api/lever/history?limit=500", JSON),
+        ("history_msgpack", "/api/lever/history?limit=500", MSGPACK),
+        ("history_ndjson", "/api/lever/history?limit=500", NDJSON),
+    ):
+        headers = {"Accept": accept}
+
+        def fetch():
+            response = client.get(path, headers=headers)
+            response.get_data()
+            if response.status_code != 200:
+                raise AssertionError(f"{path} returned {response.status_code}")
+
+        results[name] = {"us": per_call_us(fetch, requests)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-response encode cost of each response encoder")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--history-rows", type=int, default=500)
+    parser.add_argument("--history-iterations", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=500, help="end-to-end requests through the Flask test client")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    storage = MemoryStorage()
+    configure_storage(storage)
+
+    import app as lever_app
+
+    application = lever_app.create_app(preload=False)
+    encoders = create_encoders()
+    baselines = baseline_encoders(application)
+    rows = history_rows(args.history_rows)
+
+    results = {
+        "status": bench_status(encoders, baselines, args.iterations),
+        "history_page": bench_history(encoders, baselines, rows, args.history_iterations),
+    }
+    if args.requests:
+        storage.insert_history([
+            (row["lever_id"], row["action"], row["position"], row["heat"], row["state"], row["details"], row["timestamp"])
+            for row in rows
+        ])
+        application.test_client().get("/api/system/health")
+        results["http"] = bench_http(application, args.requests)
+        lever_app.shutdown()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
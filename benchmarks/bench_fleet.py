@@ -0,0 +1,70 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from benchmarks.fakedb import FakeDB
+from fleet import LeverFleet
+from models.lever import Lever
+
+CONFIG_ROW = {"lower_limit": 0, "upper_limit": 100, "step": 1, "tick_ms": 100, "sealing_duration": 10}
+STATE_ROW = {"position": 50, "heat": 45, "state": "STOPPED", "sealing_progress": 0}
+
+
+def run(levers, seconds, tick_ms):
+    fake = FakeDB()
+    db.configure_pool(fake.connect)
+
+    fleet = LeverFleet()
+    config_row = dict(CONFIG_ROW, tick_ms=tick_ms)
+    for lever_id in range(1, levers + 1):
+        lever = fleet.add(Lever(lever_id, config_row=config_row, state_row=STATE_ROW))
+        if lever_id % 2:
+            lever.pull_down()
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    fleet.start()
+    time.sleep(seconds)
+    fleet.stop()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    expected = levers * elapsed / (tick_ms / 1000)
+
+    ticks = fleet.scheduler.ticks
+    stats = fleet.scheduler.get_stats()
+    fleet.close()
+    return {
+        "levers": levers,
+        "tick_ms": tick_ms,
+        "seconds": round(elapsed, 3),
+        "ticks": ticks,
+        "expected_ticks": int(expected),
+        "ticks_per_sec": round(ticks / elapsed),
+        "cpu_per_tick_us": round(cpu / max(ticks, 1) * 1e6, 2),
+        "lateness_p50_ms": stats["lateness_p50_ms"],
+        "lateness_p99_ms": stats["lateness_p99_ms"],
+        "overruns": stats["overruns"],
+        "skipped": stats["skipped"],
+        "db_statements": fake.statements,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive a simulated lever fleet from one scheduler")
+    parser.add_argument("--levers", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--tick-ms", type=int, default=100)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    for levers in args.levers:
+        print(run(levers, args.seconds, args.tick_ms))
+
+
+if __name__ == "__main__":
+    main()
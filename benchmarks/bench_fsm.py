@@ -0,0 +1,78 @@
+from functools import partial
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.lever import Lever
+from states import LeverEvent, LeverState, TransitionResult
+
+CONFIG_ROW = {"lower_limit": 0, "upper_limit": 10 ** 12, "step": 1, "tick_ms": 100, "sealing_duration": 10}
+STATE_ROW = {"position": 50, "heat": 0, "state": "STOPPED", "sealing_progress": 0}
+
+
+def legacy_trigger(fsm, event, context=None):
+    # StateMachine.trigger before the transition table was compiled.
+    context = context or {}
+    key = (fsm.current_state, event)
+
+    if key not in fsm.transitions:
+        return TransitionResult.INVALID
+
+    if key in fsm.guards and not fsm.guards[key](fsm.owner):
+        return TransitionResult.BLOCKED
+
+    new_state, action = fsm.transitions[key]
+
+    if fsm.current_state in fsm.on_exit:
+        for callback in fsm.on_exit[fsm.current_state]:
+            callback(fsm.owner, context)
+
+    if action:
+        action(fsm.owner, context)
+
+    fsm.previous_state = fsm.current_state
+    fsm.current_state = new_state
+
+    if new_state in fsm.on_enter:
+        for callback in fsm.on_enter[new_state]:
+            callback(fsm.owner, context)
+
+    return TransitionResult.SUCCESS
+
+
+def measure(trigger, fsm, state, event, events):
+    fsm.current_state = state
+    started = time.perf_counter()
+    for _ in range(events):
+        trigger(event)
+    elapsed = time.perf_counter() - started
+    return events / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StateMachine.trigger events per second")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    lever = Lever(config_row=CONFIG_ROW, state_row=STATE_ROW)
+    fsm = lever.fsm
+
+    cases = [
+        ("noop self-loop (STOPPED + TICK)", LeverState.STOPPED, LeverEvent.TICK),
+        ("action self-loop (MOVING_UP + TICK)", LeverState.MOVING_UP, LeverEvent.TICK),
+        ("invalid (PAUSED + PULL_UP)", LeverState.PAUSED, LeverEvent.PULL_UP),
+    ]
+
+    for name, state, event in cases:
+        before = measure(partial(legacy_trigger, fsm), fsm, state, event, args.events)
+        after = measure(fsm.trigger, fsm, state, event, args.events)
+        print(f"{name:40s} before {before:>12,.0f} ev/s  after {after:>12,.0f} ev/s  x{after / before:.2f}")
+
+
+if __name__ == "__main__":
+    main()
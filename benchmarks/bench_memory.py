@@ -0,0 +1,82 @@
+import argparse
+import gc
+import logging
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fsm import StateMachine
+from models.lever import Lever, _build_transitions
+from states import LeverEvent
+from storage import MemoryStorage, configure_storage
+
+CONFIG_ROW = {"lower_limit": 0, "upper_limit": 100, "step": 1, "tick_ms": 100, "sealing_duration": 10}
+STATE_ROW = {"position": 50, "heat": 45, "state": "STOPPED", "sealing_progress": 0}
+
+EVENTS = (LeverEvent.PULL_DOWN, LeverEvent.TICK, LeverEvent.TICK, LeverEvent.PULL_UP, LeverEvent.TICK, LeverEvent.PAUSE)
+
+
+class DiscardHistory:
+    def append(self, row):
+        return True
+
+
+def build(count, private_tables, exercise):
+    levers = [Lever(lever_id, config_row=CONFIG_ROW, state_row=STATE_ROW) for lever_id in range(count)]
+    for lever in levers:
+        if private_tables:
+            lever.fsm = StateMachine(lever.fsm.current_state, _build_transitions(), owner=lever)
+        if exercise:
+            lever.history = DiscardHistory()
+            for event in EVENTS:
+                lever.fsm.trigger(event)
+    return levers
+
+
+def measure(count, private_tables=False, exercise=False, top=0):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    levers = build(count, private_tables, exercise)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    diff = after.compare_to(before, "lineno")
+    total = sum(stat.size_diff for stat in diff)
+    result = {
+        "levers": len(levers),
+        "transition_table": "per_lever" if private_tables else "shared",
+        "exercised": exercise,
+        "bytes_per_lever": round(total / count),
+        "total_mib": round(total / 2 ** 20, 2),
+    }
+    if top:
+        result["top"] = [
+            f"{stat.traceback[0].filename.rsplit(os.sep, 1)[-1]}:{stat.traceback[0].lineno} {stat.size_diff / count:.0f} B"
+            for stat in diff[:top]
+        ]
+    for lever in levers:
+        lever.writer.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="tracemalloc bytes per Lever, shared vs per-lever transition tables")
+    parser.add_argument("--levers", type=int, default=10000)
+    parser.add_argument("--top", type=int, default=5, help="show the largest allocation sites per lever")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    configure_storage(MemoryStorage())
+    Lever(0, config_row=CONFIG_ROW, state_row=STATE_ROW).writer.close()
+
+    for private_tables in (True, False):
+        for exercise in (False, True):
+            print(measure(args.levers, private_tables, exercise, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from models.lever import Lever
+from storage import MemoryStorage, configure_storage
+
+CONFIG_ROW = {"lower_limit": 0, "upper_limit": 10 ** 9, "step": 1, "tick_ms": 100, "sealing_duration": 10}
+STATE_ROW = {"position": 0, "heat": 0, "state": "MOVING_UP", "sealing_progress": 0}
+
+
+def per_call_ns(func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e9
+
+
+def run(iterations):
+    histogram = metrics.Histogram("bench_seconds", "benchmark histogram", ("event",))
+    counter = metrics.Counter("bench_total", "benchmark counter")
+    child = histogram.labels("TICK")
+
+    noop = lambda: None
+    timed_noop = histogram.time("TICK")(noop)
+
+    lever = Lever(1, config_row=CONFIG_ROW, state_row=STATE_ROW)
+    results = {
+        "counter_inc_ns": per_call_ns(counter.inc, iterations),
+        "histogram_observe_ns": per_call_ns(lambda: child.observe(0.0001), iterations),
+        "histogram_labels_observe_ns": per_call_ns(lambda: histogram.labels("TICK").observe(0.0001), iterations),
+        "timed_call_overhead_ns": per_call_ns(timed_noop, iterations) - per_call_ns(noop, iterations),
+    }
+
+    metrics.ENABLED = False
+    disabled = per_call_ns(lever.tick_update, iterations)
+    metrics.ENABLED = True
+    enabled = per_call_ns(lever.tick_update, iterations)
+    lever.writer.close()
+
+    results["tick_update_disabled_ns"] = disabled
+    results["tick_update_enabled_ns"] = enabled
+    results["tick_update_overhead_ns"] = enabled - disabled
+    return {name: round(value, 1) for name, value in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-event cost of the metrics hooks")
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    configure_storage(MemoryStorage())
+    print(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from benchmarks.fakedb import FakeDB
+from eventlog import EventLog, MemoryEventStore
+from models.lever import Lever
+
+CONFIG_ROW = {"lower_limit": 0, "upper_limit": 100, "step": 1, "tick_ms": 100, "sealing_duration": 10}
+STATE_ROW = {"position": 50, "heat": 0, "state": "STOPPED", "sealing_progress": 0}
+
+
+def record(events, snapshot_interval, seed):
+    rng = random.Random(seed)
+    log = EventLog(MemoryEventStore(), snapshot_interval=snapshot_interval)
+    lever = Lever(1, config_row=CONFIG_ROW, state_row=STATE_ROW)
+    lever.events = log
+    log.recover(lever)
+
+    commands = [lever.pull_up, lever.pull_down, lever.pause, lever.resume, lever.stop]
+    while lever.event_seq < events:
+        roll = rng.random()
+        if roll < 0.05:
+            rng.choice(commands)()
+        elif roll < 0.07:
+            lever.set_heat(rng.choice([0, 20, 45, 48]))
+        elif roll < 0.071:
+            lever.reset()
+        else:
+            lever.tick_update()
+
+    log.flush()
+    log.close()
+    return log.store, lever.state_row()
+
+
+def recover(store, snapshot_interval):
+    log = EventLog(store, snapshot_interval=snapshot_interval)
+    started = time.perf_counter()
+    lever = Lever(1, config_row=CONFIG_ROW, state_row=STATE_ROW)
+    lever.events = log
+    replayed = log.recover(lever)
+    elapsed = time.perf_counter() - started
+    log.close()
+    return lever.state_row(), replayed, elapsed
+
+
+def run(events, snapshot_interval, seed):
+    store, expected = record(events, snapshot_interval, seed)
+    recovered, replayed, elapsed = recover(store, snapshot_interval)
+    return {
+        "events": events,
+        "snapshot_interval": snapshot_interval,
+        "replayed": replayed,
+        "recovery_ms": round(elapsed * 1000, 3),
+        "consistent": recovered == expected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time event-log crash recovery against log length")
+    parser.add_argument("--events", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--snapshot-intervals", type=int, nargs="+", default=[10 ** 9, 1024])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    db.configure_pool(FakeDB().connect)
+
+    failures = 0
+    for events in args.events:
+        for interval in args.snapshot_intervals:
+            result = run(events, interval, args.seed)
+            failures += not result["consistent"]
+            print(result)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.lever import Lever
+from scheduler import SimulatedClock, TickScheduler
+from states import LeverState
+from storage import MemoryStorage, configure_storage
+
+CONFIG_ROW = {"lower_limit": 0, "upper_limit": 100, "step": 5, "tick_ms": 100, "sealing_duration": 10}
+STATE_ROW = {"position": 50, "heat": 0, "state": "STOPPED", "sealing_progress": 0}
+
+DOWN_AND_SEAL = ([("reset", None), ("set-heat", 45.0), ("pull-down", None)], LeverState.AT_BOTTOM)
+
+CYCLE = (
+    ([("reset", None), ("set-heat", 45.0), ("pull-down", None)], LeverState.SEALING),
+    ([], LeverState.AT_BOTTOM),
+    ([("pull-up", None)], LeverState.AT_TOP),
+)
+
+
+def run_cycles(cycles, dry_run):
+    lever = Lever(1, config_row=CONFIG_ROW, state_row=STATE_ROW)
+    ticks = 0
+    started = time.perf_counter()
+    phases = (DOWN_AND_SEAL,) if dry_run else CYCLE
+    for _ in range(cycles):
+        for commands, until in phases:
+            ran, _, final = lever.simulate(1000, until=until, commands=commands, trajectory="none", dry_run=dry_run)
+            ticks += ran
+            if final["state"] != until.value:
+                raise AssertionError(f"cycle stopped in {final['state']}, expected {until.value}")
+    elapsed = time.perf_counter() - started
+    lever.writer.close()
+    return {
+        "mode": "dry_run" if dry_run else "commit",
+        "cycles": cycles,
+        "ticks": ticks,
+        "cycles_per_sec": round(cycles / elapsed),
+        "ticks_per_sec": round(ticks / elapsed),
+    }
+
+
+def run_fleet(levers, seconds):
+    scheduler = TickScheduler(clock=SimulatedClock())
+    fleet = [Lever(lever_id, config_row=CONFIG_ROW, state_row=STATE_ROW) for lever_id in range(1, levers + 1)]
+    for lever in fleet:
+        lever.pull_down()
+        scheduler.add(lever.id, lever.tick, lever.tick_update)
+
+    started = time.perf_counter()
+    ticks = scheduler.advance(seconds)
+    elapsed = time.perf_counter() - started
+    for lever in fleet:
+        lever.writer.close()
+    return {
+        "mode": "fleet_advance",
+        "levers": levers,
+        "simulated_seconds": seconds,
+        "ticks": ticks,
+        "wall_seconds": round(elapsed, 3),
+        "speedup": round(seconds / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run lever scenarios on a simulated clock")
+    parser.add_argument("--cycles", type=int, default=2000)
+    parser.add_argument("--levers", type=int, default=100)
+    parser.add_argument("--simulated-seconds", type=float, default=60.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    configure_storage(MemoryStorage())
+    print(run_cycles(args.cycles, dry_run=False))
+    print(run_cycles(args.cycles, dry_run=True))
+    print(run_fleet(args.levers, args.simulated_seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import time
+started = time.perf_counter()
+import logging
+logging.disable(logging.WARNING)
+import app
+imported = time.perf_counter()
+client = app.create_app(preload={preload}).test_client()
+response = client.get('/api/system/health')
+answered = time.perf_counter()
+import sys, json
+print(json.dumps({{
+    "status": response.status_code,
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (answered - imported) * 1000,
+    "total_ms": (answered - started) * 1000,
+    "driver_imported": "mysql.connector" in sys.modules,
+}}))
+"""
+
+
+def run_once(preload, env):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(preload=preload)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(runs, preload, backend):
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, LEVER_STORAGE=backend, LEVER_SQLITE_PATH=os.path.join(directory, "startup.db"))
+        samples = [run_once(preload, env) for _ in range(runs)]
+    result = {"backend": backend, "preload": preload, "runs": runs}
+    for key in ("import_ms", "first_request_ms", "total_ms"):
+        result[key] = round(statistics.median(sample[key] for sample in samples), 1)
+    result["driver_imported"] = any(sample["driver_imported"] for sample in samples)
+    result["statuses"] = sorted({sample["status"] for sample in samples})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import-to-first-request latency of app.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite"])
+    args = parser.parse_args()
+
+    for backend in args.backends:
+        for preload in (False, True):
+            print(run(args.runs, preload, backend))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from audit import close_history_writer, get_history_writer
+from models.lever import Lever
+from storage import MemoryStorage, MySQLStorage, SQLiteStorage, configure_storage, close_storage
+
+CONFIG_ROW = {"lower_limit": 0, "upper_limit": 100, "step": 1, "tick_ms": 100, "sealing_duration": 10}
+STATE_ROW = {"position": 50, "heat": 45, "state": "STOPPED", "sealing_progress": 0}
+
+
+def create(backend, directory):
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "sqlite":
+        return SQLiteStorage(os.path.join(directory, "bench.db"))
+    return MySQLStorage()
+
+
+def run(backend, levers, rounds, flush_every, directory):
+    config.STATE_WRITE_MODE = "batched"
+    config.STATE_FLUSH_INTERVAL = float("inf")
+    storage = configure_storage(create(backend, directory))
+
+    fleet = [Lever(lever_id, config_row=CONFIG_ROW, state_row=STATE_ROW) for lever_id in range(1, levers + 1)]
+    for lever in fleet[::2]:
+        lever.pull_down()
+    for lever in fleet[1::2]:
+        lever.pull_up()
+
+    writes = sum(lever.writer.stats["writes"] for lever in fleet)
+    started = time.perf_counter()
+    for index in range(1, rounds + 1):
+        for lever in fleet:
+            lever.tick_update()
+        if index % flush_every == 0:
+            for lever in fleet:
+                lever.writer.flush()
+    get_history_writer().flush()
+    elapsed = time.perf_counter() - started
+
+    writes = sum(lever.writer.stats["writes"] for lever in fleet) - writes
+    ticks = levers * rounds
+    stats = storage.get_stats()
+
+    for lever in fleet:
+        lever.writer.close()
+    close_history_writer()
+    close_storage()
+
+    return {
+        "backend": backend,
+        "flush_every": flush_every,
+        "levers": levers,
+        "ticks": ticks,
+        "state_writes": writes,
+        "us_per_tick": round(elapsed / ticks * 1e6, 2),
+        "us_per_write": round(elapsed / max(writes, 1) * 1e6, 2),
+        "storage": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tick persistence cost across storage backends")
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite"], choices=["memory", "sqlite", "mysql"])
+    parser.add_argument("--levers", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--flush-every", type=int, default=1, help="rounds between state flushes")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    for backend in args.backends:
+        with tempfile.TemporaryDirectory() as directory:
+            print(run(backend, args.levers, args.rounds, args.flush_every, directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, sql, params=()):
+        self.db.statements += 1
+
+    def executemany(self, sql, seq_params):
+        self.db.statements += 1
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+    def fetchmany(self, size=1):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.db.commits += 1
+
+    def rollback(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self):
+        self.connects = 0
+        self.statements = 0
+        self.commits = 0
+
+    def connect(self):
+        self.connects += 1
+        return FakeConnection(self)
@@ -0,0 +1,115 @@
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from benchmarks.fakedb import FakeDB
+from models.lever import Lever
+from states import LeverState
+
+CONFIG_ROW = {"lower_limit": 0, "upper_limit": 100, "step": 5, "tick_ms": 1, "sealing_duration": 5}
+STATE_ROW = {"position": 10, "heat": 45, "state": "STOPPED", "sealing_progress": 0}
+
+
+def check_invariants(lever, snapshot, last_generation):
+    generation, position, heat, state, sealing_progress = snapshot
+
+    assert generation >= last_generation, f"generation went backwards: {last_generation} -> {generation}"
+    assert lever.lower <= position <= lever.upper, f"position {position} outside limits in {state}"
+    assert 0 <= sealing_progress <= lever.sealing_duration, f"sealing_progress {sealing_progress}"
+    if state == LeverState.AT_TOP:
+        assert position == lever.upper, f"AT_TOP at {position}"
+    if state in (LeverState.AT_BOTTOM, LeverState.SEALING):
+        assert position == lever.lower, f"{state.value} at {position}"
+    if state != LeverState.SEALING:
+        assert sealing_progress == 0, f"sealing_progress {sealing_progress} in {state.value}"
+    return generation
+
+
+def api_worker(lever, seconds, seed, counts, failures):
+    rng = random.Random(seed)
+    commands = (lever.pull_up, lever.pull_down, lever.pause, lever.resume, lever.stop)
+    operations = 0
+    last_generation = 0
+    deadline = time.perf_counter() + seconds
+
+    try:
+        while time.perf_counter() < deadline:
+            roll = rng.random()
+            if roll < 0.6:
+                last_generation = check_invariants(lever, lever.snapshot(), last_generation)
+                lever.get_state()
+            elif roll < 0.95:
+                rng.choice(commands)()
+            elif roll < 0.99:
+                lever.set_heat(rng.choice([0, 42, 45, 48, 60]))
+            else:
+                lever.reset()
+            operations += 1
+    except AssertionError as e:
+        failures.append(str(e))
+    counts.append(operations)
+
+
+def tick_worker(lever, stop, counts, failures):
+    ticks = 0
+    try:
+        while not stop.is_set():
+            lever.tick_update()
+            ticks += 1
+            with lever.lock:
+                check_invariants(lever, lever.snapshot(), 0)
+    except AssertionError as e:
+        failures.append(f"tick: {e}")
+    counts.append(ticks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hammer one Lever from many API threads and a fast tick")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    db.configure_pool(FakeDB().connect, size=args.threads + 2)
+    lever = Lever(config_row=CONFIG_ROW, state_row=STATE_ROW)
+
+    api_counts, tick_counts, failures = [], [], []
+    stop = threading.Event()
+    ticker = threading.Thread(target=tick_worker, args=(lever, stop, tick_counts, failures))
+    workers = [
+        threading.Thread(target=api_worker, args=(lever, args.seconds, seed, api_counts, failures))
+        for seed in range(args.threads)
+    ]
+
+    started = time.perf_counter()
+    ticker.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stop.set()
+    ticker.join()
+    elapsed = time.perf_counter() - started
+
+    print({
+        "threads": args.threads,
+        "seconds": round(elapsed, 2),
+        "api_ops_per_sec": round(sum(api_counts) / elapsed),
+        "ticks_per_sec": round(sum(tick_counts) / elapsed),
+        "final_state": lever.get_state(),
+        "violations": len(failures),
+    })
+    for failure in failures[:10]:
+        print("VIOLATION:", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.lever import Lever
+from states import LeverEvent, LeverState
+from storage import MemoryStorage, SQLiteStorage, configure_storage, close_storage
+
+CONFIG_ROW = {"lower_limit": 0, "upper_limit": 10 ** 12, "step": 1, "tick_ms": 100, "sealing_duration": 10}
+STATE_ROW = {"position": 50, "heat": 0, "state": "STOPPED", "sealing_progress": 0}
+
+HISTORY_ACTIONS = ("PULL_UP", "PULL_DOWN", "REACHED_TOP", "REACHED_BOTTOM", "SEALING_COMPLETE", "RESET")
+HISTORY_STATES = ("MOVING_UP", "MOVING_DOWN", "AT_TOP", "AT_BOTTOM", "SEALING", "STOPPED")
+SEED_CHUNK = 20000
+
+MIXED_COMMANDS = (
+    ("POST", "/api/lever/pull-up", None),
+    ("POST", "/api/lever/pull-down", None),
+    ("POST", "/api/lever/set-heat", {"heat": 45}),
+    ("POST", "/api/lever/stop", None),
+)
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_summary(samples, elapsed):
+    ordered = sorted(samples)
+    return {
+        "requests": len(ordered),
+        "requests_per_sec": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def bench_fsm(events):
+    lever = Lever(1, config_row=CONFIG_ROW, state_row=STATE_ROW)
+    fsm = lever.fsm
+    results = {}
+    for name, state, event in (
+        ("noop_tick", LeverState.STOPPED, LeverEvent.TICK),
+        ("move_tick", LeverState.MOVING_UP, LeverEvent.TICK),
+        ("invalid", LeverState.PAUSED, LeverEvent.PULL_UP),
+    ):
+        fsm.current_state = state
+        started = time.perf_counter()
+        for _ in range(events):
+            fsm.trigger(event)
+        results[f"{name}_events_per_sec"] = round(events / (time.perf_counter() - started))
+    lever.writer.close()
+    return results
+
+
+def bench_tick_update(iterations):
+    results = {}
+    for name, state in (("idle", "STOPPED"), ("moving", "MOVING_UP")):
+        lever = Lever(1, config_row=CONFIG_ROW, state_row=dict(STATE_ROW, state=state))
+        started = time.perf_counter()
+        for _ in range(iterations):
+            lever.tick_update()
+        results[f"{name}_ns"] = round((time.perf_counter() - started) / iterations * 1e9, 1)
+        lever.writer.close()
+    return results
+
+
+def bench_status(client, requests):
+    samples = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        sent = time.perf_counter()
+        response = client.get("/api/lever/status")
+        samples.append(time.perf_counter() - sent)
+        if response.status_code != 200:
+            raise AssertionError(f"status returned {response.status_code}")
+    return latency_summary(samples, time.perf_counter() - started)
+
+
+def bench_mixed(app, threads, requests_per_thread, command_ratio):
+    samples = {"poll": [], "command": []}
+    lock = threading.Lock()
+    errors = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        local = {"poll": [], "command": []}
+        for _ in range(requests_per_thread):
+            if rng.random() < command_ratio:
+                method, path, body = rng.choice(MIXED_COMMANDS)
+                kind = "command"
+            else:
+                method, path, body = "GET", "/api/lever/status", None
+                kind = "poll"
+            sent = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            local[kind].append(time.perf_counter() - sent)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        with lock:
+            for kind, values in local.items():
+                samples[kind].extend(values)
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(values) for values in samples.values())
+    return {
+        "threads": threads,
+        "command_ratio": command_ratio,
+        "requests_per_sec": round(total / elapsed, 1),
+        "errors": len(errors),
+        "poll": latency_summary(samples["poll"], elapsed),
+        "command": latency_summary(samples["command"], elapsed),
+    }
+
+
+def seed_history(storage, rows):
+    base = datetime(2024, 1, 1)
+    started = time.perf_counter()
+    for offset in range(0, rows, SEED_CHUNK):
+        storage.insert_history([
+            (
+                1,
+                HISTORY_ACTIONS[index % len(HISTORY_ACTIONS)],
+                float(index % 100),
+                45.0,
+                HISTORY_STATES[index % len(HISTORY_STATES)],
+                "",
+                base + timedelta(milliseconds=index)
+            )
+            for index in range(offset, min(rows, offset + SEED_CHUNK))
+        ])
+    return time.perf_counter() - started
+
+
+def bench_history(client, storage, rows, repeat):
+    seed_seconds = seed_history(storage, rows)
+    middle = datetime(2024, 1, 1) + timedelta(milliseconds=rows // 2)
+
+    cursor = None
+    for _ in range(10):
+        page = client.get("/api/lever/history", query_string={"limit": 500, **({"cursor": cursor} if cursor else {})})
+        cursor = page.get_json()["next_cursor"]
+
+    queries = {
+        "first_page": {"limit": 50},
+        "action_filter": {"limit": 50, "action": "SEALING_COMPLETE"},
+        "state_filter": {"limit": 50, "state": "AT_BOTTOM"},
+        "time_window": {"limit": 50, "until": middle.isoformat()},
+        "deep_cursor": {"limit": 50, "cursor": cursor},
+        "max_page": {"limit": 500},
+    }
+
+    results = {"rows": rows, "seed_seconds": round(seed_seconds, 2)}
+    for name, args in queries.items():
+        samples = []
+        for _ in range(repeat):
+            sent = time.perf_counter()
+            response = client.get("/api/lever/history", query_string=args)
+            response.get_data()
+            samples.append(time.perf_counter() - sent)
+            if response.status_code != 200:
+                raise AssertionError(f"history {name} returned {response.status_code}: {response.get_data()[:200]}")
+        ordered = sorted(samples)
+        results[name] = {
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+            "count": response.get_json()["count"],
+        }
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, f"{name}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(current, baseline):
+    old = dict(flatten(baseline["results"]))
+    for name, value in flatten(current["results"]):
+        if name in old and old[name]:
+            print(f"{name:55s} {old[name]:>14,.3f} -> {value:>14,.3f}  x{value / old[name]:.2f}")
+
+
+def run(args, directory):
+    storage = MemoryStorage() if args.backend == "memory" else SQLiteStorage(os.path.join(directory, "suite.db"))
+    configure_storage(storage)
+
+    import app as lever_app
+
+    application = lever_app.create_app(preload=False)
+    client = application.test_client()
+    client.get("/api/system/health")
+
+    results = {
+        "fsm": bench_fsm(args.events),
+        "tick_update": bench_tick_update(args.events // 10),
+        "status": bench_status(client, args.requests),
+        "mixed": bench_mixed(application, args.threads, args.requests // args.threads, args.command_ratio),
+    }
+    if args.history_rows:
+        results["history"] = bench_history(client, storage, args.history_rows, args.history_repeat)
+
+    lever_app.shutdown()
+    close_storage()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite for the lever API, written as JSON")
+    parser.add_argument("--backend", choices=("sqlite", "memory"), default="sqlite")
+    parser.add_argument("--events", type=int, default=500000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--command-ratio", type=float, default=0.2)
+    parser.add_argument("--history-rows", type=int, default=10 ** 6)
+    parser.add_argument("--history-repeat", type=int, default=50)
+    parser.add_argument("--output", help="write results to this file instead of stdout")
+    parser.add_argument("--compare", help="print ratios against a previous results file")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(args, directory)
+
+    report = {
+        "revision": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": vars(args),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+from storage import get_storage
+import config
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+logger = logging.getLogger(__name__)
+
+FORWARDED_HEADER = "X-Lever-Forwarded"
+ARCHIVE_LEASE = "archive"
+
+
+def lease_name(lever_id):
+    return f"lever:{lever_id}"
+
+
+def advertise_url(port):
+    # Each worker binds its own listener; "{port}" lets one template serve every worker.
+    if not config.CLUSTER_ADVERTISE_URL:
+        return f"http://{config.CLUSTER_BIND_HOST}:{port}"
+    return config.CLUSTER_ADVERTISE_URL.replace("{port}", str(port))
+
+
+class NoOwnerError(Exception):
+    pass
+
+
+class Cluster:
+    def __init__(self, fleet, url, storage=None, ttl=None, refresh_interval=None, forward_timeout=None):
+        self.fleet = fleet
+        self.url = url.rstrip("/")
+        self.storage = storage or get_storage()
+        self.node_id = uuid.uuid4().hex
+        self.ttl = ttl or config.CLUSTER_LEASE_TTL
+        self.refresh_interval = refresh_interval or config.CLUSTER_REFRESH_INTERVAL
+        self.forward_timeout = forward_timeout or config.CLUSTER_FORWARD_TIMEOUT
+
+        self.owned = set()
+        self.archiving = False
+        self.leases = {}
+        self._last_renewal = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.stats = {
+            "polls": 0, "poll_errors": 0, "acquired": 0, "lost": 0,
+            "forwarded": 0, "forward_errors": 0, "last_error": None
+        }
+
+    def start(self):
+        self.fleet.owner = self.is_owner
+        for lever in self.fleet:
+            self.fleet.scheduler.remove(lever.id)
+
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name="cluster", daemon=True)
+        self._thread.start()
+        logger.info(f"Cluster node {self.node_id} at {self.url} owns {len(self.owned)} of {len(self.fleet)} levers")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh_interval + 1)
+            self._thread = None
+
+        with self._lock:
+            owned, self.owned = self.owned, set()
+            self.archiving = False
+        for lever_id in owned:
+            self.fleet.scheduler.remove(lever_id)
+            self.fleet.get(lever_id).writer.flush()
+        if self.fleet.event_log is not None:
+            self.fleet.event_log.flush()
+        try:
+            self.storage.release_leases(
+                [lease_name(lever_id) for lever_id in owned] + [ARCHIVE_LEASE], self.node_id
+            )
+        except Exception as e:
+            logger.error(f"Error releasing leases: {e}")
+
+    def is_owner(self, lever_id):
+        return lever_id in self.owned
+
+    def is_archiver(self):
+        return self.archiving
+
+    def owner_url(self, lever_id):
+        return self._lease_url(lease_name(lever_id))
+
+    def archiver_url(self):
+        return self._lease_url(ARCHIVE_LEASE)
+
+    def poll(self):
+        now = time.time()
+        try:
+            if now - self._last_renewal >= self.ttl / 3:
+                self._renew(now)
+                self._last_renewal = now
+            self._refresh_followers()
+            self.stats["polls"] += 1
+        except Exception as e:
+            self.stats["poll_errors"] += 1
+            self.stats["last_error"] = str(e)
+            logger.error(f"Cluster poll failed: {e}")
+            if time.time() - self._last_renewal >= self.ttl:
+                self._drop_all()
+
+    def forward(self, lever_id, method, path, body, content_type=None, accept=None):
+        return self._forward(self.owner_url(lever_id), f"lever {lever_id}", method, path, body, content_type, accept)
+
+    def forward_archive(self, path, accept=None):
+        # Archive chunks live in the archiving node's ARCHIVE_DIR, so reads go there.
+        return self._forward(self.archiver_url(), "the history archive", "GET", path, None, None, accept)
+
+    def get_stats(self):
+        return {
+            "node_id": self.node_id,
+            "url": self.url,
+            "owned": sorted(self.owned),
+            "archiving": self.archiving,
+            "levers": len(self.fleet),
+            "lease_ttl": self.ttl,
+            **self.stats
+        }
+
+    def _lease_url(self, name):
+        lease = self.leases.get(name)
+        if lease is None or lease[2] < time.time():
+            return None
+        return lease[1]
+
+    def _forward(self, url, target, method, path, body, content_type, accept):
+        if url is None or url == self.url:
+            raise NoOwnerError(f"No live owner for {target}")
+
+        request = urllib.request.Request(
+            url + path,
+            data=body,
+            method=method,
+            headers={"Content-Type": content_type or "application/json", FORWARDED_HEADER: self.node_id}
+        )
+        if accept:
+            request.add_header("Accept", accept)
+        try:
+            with urllib.request.urlopen(request, timeout=self.forward_timeout) as response:
+                result = response.status, response.read(), response.headers.get("Content-Type")
+        except urllib.error.HTTPError as e:
+            result = e.code, e.read(), e.headers.get("Content-Type")
+        except OSError as e:
+            self.stats["forward_errors"] += 1
+            raise NoOwnerError(f"Owner of {target} at {url} unreachable: {e}")
+
+        self.stats["forwarded"] += 1
+        return result
+
+    def _renew(self, now):
+        names = {lease_name(lever.id): lever.id for lever in self.fleet}
+        held = self.storage.acquire_leases(list(names) + [ARCHIVE_LEASE], self.node_id, self.url, self.ttl, now)
+        self.leases = self.storage.get_leases()
+
+        owned = {names[name] for name in held if name in names}
+        for lever_id in owned - self.owned:
+            self._acquire(lever_id)
+        for lever_id in self.owned - owned:
+            self._release(lever_id)
+        with self._lock:
+            self.owned = owned
+            self.archiving = ARCHIVE_LEASE in held
+
+    def _refresh_followers(self):
+        if len(self.owned) == len(self.fleet):
+            return
+        states = self.storage.load_states()
+        for lever in self.fleet:
+            if lever.id not in self.owned and lever.id in states:
+                lever.sync(states[lever.id])
+
+    def _acquire(self, lever_id):
+        lever = self.fleet.get(lever_id)
+        if self.fleet.event_log is not None:
+            self.fleet.event_log.recover(lever)
+        else:
+            row = self.storage.load_state(lever_id)
+            if row:
+                lever.sync(row)
+        self.fleet.scheduler.add(lever.id, lever.tick, lever.tick_update)
+        self.stats["acquired"] += 1
+        logger.info(f"Acquired tick lease for lever {lever_id}")
+
+    def _release(self, lever_id):
+        lever = self.fleet.get(lever_id)
+        self.fleet.scheduler.remove(lever_id)
+        if lever is not None:
+            lever.writer.discard()
+        self.stats["lost"] += 1
+        logger.warning(f"Lost tick lease for lever {lever_id}")
+
+    def _drop_all(self):
+        with self._lock:
+            owned, self.owned = self.owned, set()
+            self.archiving = False
+        for lever_id in owned:
+            self._release(lever_id)
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.poll()
@@ -0,0 +1,156 @@
+from models.lever import COMMAND_EVENTS
+from states import LeverState
+from storage import CONFIG_COLUMNS
+import math
+
+BATCH_COMMANDS = tuple(COMMAND_EVENTS) + ("set-heat", "reset")
+
+
+def parse_commands(payload, max_commands=1000):
+    if not isinstance(payload, dict) or not isinstance(payload.get("commands"), list):
+        raise ValueError("Body must be an object with a commands array")
+
+    items = payload["commands"]
+    if not items:
+        raise ValueError("commands must not be empty")
+    if len(items) > max_commands:
+        raise ValueError(f"At most {max_commands} commands per request")
+
+    commands = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"command": item}
+        if not isinstance(item, dict):
+            raise ValueError(f"Command {index}: expected an object or a command name")
+
+        command = str(item.get("command", "")).lower().replace("_", "-")
+        if command not in BATCH_COMMANDS:
+            raise ValueError(f"Command {index}: unknown command {item.get('command')!r}")
+
+        value = None
+        if command == "set-heat":
+            if item.get("heat") is None:
+                raise ValueError(f"Command {index}: heat required")
+            try:
+                value = float(item["heat"])
+            except (TypeError, ValueError):
+                raise ValueError(f"Command {index}: heat must be a number")
+
+        commands.append((command, value))
+
+    atomic = payload.get("atomic", False)
+    if not isinstance(atomic, bool):
+        raise ValueError("atomic must be a boolean")
+
+    return commands, atomic
+
+
+def parse_config(payload, current):
+    if not isinstance(payload, dict) or not payload:
+        raise ValueError("Body must be an object with at least one config field")
+
+    unknown = set(payload) - set(CONFIG_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown config fields: {', '.join(sorted(unknown))}")
+
+    values = current._asdict()
+    for column in CONFIG_COLUMNS:
+        if column in payload:
+            cast = int if column in ("tick_ms", "sealing_duration") else float
+            try:
+                values[column] = cast(payload[column])
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError(f"{column} must be a finite number")
+            if not math.isfinite(values[column]):
+                raise ValueError(f"{column} must be a finite number")
+
+    if values["lower_limit"] >= values["upper_limit"]:
+        raise ValueError("lower_limit must be below upper_limit")
+    if values["step"] <= 0:
+        raise ValueError("step must be positive")
+    if values["tick_ms"] < 1:
+        raise ValueError("tick_ms must be at least 1")
+    if values["sealing_duration"] < 1:
+        raise ValueError("sealing_duration must be at least 1")
+
+    return tuple(values[column] for column in CONFIG_COLUMNS)
+
+
+def describe_simulation(options, ran, points, final):
+    until = options["until"]
+    return {
+        "success": True,
+        "ticks": ran,
+        "reached": None if until is None else final["state"] == until.value,
+        "dry_run": options["dry_run"],
+        "final": final,
+        "trajectory": points
+    }
+
+
+def describe_results(commands, results):
+    return [
+        {"command": command, "result": result.value}
+        for (command, _), result in zip(commands, results)
+    ]
+
+
+TRAJECTORY_MODES = ("changes", "all", "none")
+
+
+def parse_advance(payload, max_seconds=3600):
+    if payload is None:
+        payload = {}
+    if not isinstance(payload, dict):
+        raise ValueError("Body must be an object")
+
+    try:
+        seconds = float(payload.get("seconds", 0))
+    except (TypeError, ValueError):
+        raise ValueError("seconds must be a number")
+    if not math.isfinite(seconds) or seconds < 0 or seconds > max_seconds:
+        raise ValueError(f"seconds must be between 0 and {max_seconds:g}")
+    return seconds
+
+
+def parse_simulation(payload, max_ticks=10000, max_commands=1000):
+    if payload is None:
+        payload = {}
+    if not isinstance(payload, dict):
+        raise ValueError("Body must be an object")
+
+    until = payload.get("until")
+    if until is not None:
+        try:
+            until = LeverState[str(until).upper()]
+        except KeyError:
+            raise ValueError(f"Unknown state {payload['until']!r}")
+
+    if payload.get("ticks") is None and until is None:
+        raise ValueError("ticks or until required")
+    try:
+        ticks = int(payload.get("ticks", max_ticks))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("ticks must be an integer")
+    if ticks < 0 or ticks > max_ticks:
+        raise ValueError(f"ticks must be between 0 and {max_ticks}")
+
+    trajectory = payload.get("trajectory", "changes")
+    if trajectory not in TRAJECTORY_MODES:
+        raise ValueError(f"trajectory must be one of {', '.join(TRAJECTORY_MODES)}")
+
+    dry_run = payload.get("dry_run", False)
+    if not isinstance(dry_run, bool):
+        raise ValueError("dry_run must be a boolean")
+
+    commands = []
+    if payload.get("commands"):
+        commands, _ = parse_commands(payload, max_commands=max_commands)
+
+    return {
+        "ticks": ticks,
+        "until": until,
+        "commands": commands,
+        "trajectory": trajectory,
+        "dry_run": dry_run,
+    }
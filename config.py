@@ -0,0 +1,68 @@
+import os
+
+DB_CONFIG = {
+    "host": os.environ.get("LEVER_DB_HOST", "localhost"),
+    "database": os.environ.get("LEVER_DB_NAME", "lever_db"),
+    "user": os.environ.get("LEVER_DB_USER", "username"),
+    "password": os.environ.get("LEVER_DB_PASSWORD", "password"),
+}
+
+DB_POOL_SIZE = int(os.environ.get("LEVER_DB_POOL_SIZE", "5"))
+DB_POOL_TIMEOUT = float(os.environ.get("LEVER_DB_POOL_TIMEOUT", "5"))
+DB_POOL_MAX_IDLE = float(os.environ.get("LEVER_DB_POOL_MAX_IDLE", "300"))
+DB_POOL_PING_AFTER = float(os.environ.get("LEVER_DB_POOL_PING_AFTER", "30"))
+
+STARTUP_RETRIES = int(os.environ.get("LEVER_STARTUP_RETRIES", "3"))
+STARTUP_BACKOFF = float(os.environ.get("LEVER_STARTUP_BACKOFF", "0.5"))
+
+STATE_WRITE_MODE = os.environ.get("LEVER_STATE_WRITE_MODE", "batched")
+STATE_FLUSH_INTERVAL = float(os.environ.get("LEVER_STATE_FLUSH_INTERVAL", "1.0"))
+
+HISTORY_QUEUE_SIZE = int(os.environ.get("LEVER_HISTORY_QUEUE_SIZE", "10000"))
+HISTORY_BATCH_SIZE = int(os.environ.get("LEVER_HISTORY_BATCH_SIZE", "100"))
+HISTORY_FLUSH_INTERVAL = float(os.environ.get("LEVER_HISTORY_FLUSH_INTERVAL", "0.5"))
+HISTORY_DROP_POLICY = os.environ.get("LEVER_HISTORY_DROP_POLICY", "drop_oldest")
+
+TICK_POLICY = os.environ.get("LEVER_TICK_POLICY", "catch_up")
+TICK_MAX_CATCH_UP = int(os.environ.get("LEVER_TICK_MAX_CATCH_UP", "10"))
+CLOCK = os.environ.get("LEVER_CLOCK", "wall")
+SIMULATE_MAX_TICKS = int(os.environ.get("LEVER_SIMULATE_MAX_TICKS", "10000"))
+SIMULATE_MAX_ADVANCE = float(os.environ.get("LEVER_SIMULATE_MAX_ADVANCE", "3600"))
+
+STREAM_BUFFER_SIZE = int(os.environ.get("LEVER_STREAM_BUFFER_SIZE", "64"))
+STREAM_HEARTBEAT = float(os.environ.get("LEVER_STREAM_HEARTBEAT", "15"))
+
+HISTORY_MAX_LIMIT = int(os.environ.get("LEVER_HISTORY_MAX_LIMIT", "500"))
+HISTORY_EXPORT_MAX_LIMIT = int(os.environ.get("LEVER_HISTORY_EXPORT_MAX_LIMIT", "100000"))
+
+JSON_ENCODER = os.environ.get("LEVER_JSON_ENCODER", "auto")
+MSGPACK_ENABLED = os.environ.get("LEVER_MSGPACK", "1") == "1"
+
+HISTORY_RETENTION_DAYS = float(os.environ.get("LEVER_HISTORY_RETENTION_DAYS", "0"))
+HISTORY_ARCHIVE_DIR = os.environ.get("LEVER_HISTORY_ARCHIVE_DIR", "archive")
+HISTORY_ARCHIVE_CHUNK_ROWS = int(os.environ.get("LEVER_HISTORY_ARCHIVE_CHUNK_ROWS", "10000"))
+HISTORY_ARCHIVE_INTERVAL = float(os.environ.get("LEVER_HISTORY_ARCHIVE_INTERVAL", "300"))
+
+ROLLUPS_ENABLED = os.environ.get("LEVER_ROLLUPS", "1") == "1"
+ROLLUP_MAX_BUCKETS = int(os.environ.get("LEVER_ROLLUP_MAX_BUCKETS", "1440"))
+
+COMMAND_BATCH_MAX = int(os.environ.get("LEVER_COMMAND_BATCH_MAX", "1000"))
+
+ASYNC_EXECUTOR_WORKERS = int(os.environ.get("LEVER_ASYNC_EXECUTOR_WORKERS", "8"))
+
+STORAGE_BACKEND = os.environ.get("LEVER_STORAGE", "mysql")
+SQLITE_PATH = os.environ.get("LEVER_SQLITE_PATH", "lever.db")
+
+CONFIG_RELOAD_INTERVAL = float(os.environ.get("LEVER_CONFIG_RELOAD_INTERVAL", "5"))
+
+CLUSTER = os.environ.get("LEVER_CLUSTER", "0") == "1"
+CLUSTER_LEASE_TTL = float(os.environ.get("LEVER_CLUSTER_LEASE_TTL", "5"))
+CLUSTER_REFRESH_INTERVAL = float(os.environ.get("LEVER_CLUSTER_REFRESH_INTERVAL", "0.25"))
+CLUSTER_FORWARD_TIMEOUT = float(os.environ.get("LEVER_CLUSTER_FORWARD_TIMEOUT", "5"))
+CLUSTER_ADVERTISE_URL = os.environ.get("LEVER_CLUSTER_ADVERTISE_URL", "")
+CLUSTER_BIND_HOST = os.environ.get("LEVER_CLUSTER_BIND_HOST", "127.0.0.1")
+
+METRICS_ENABLED = os.environ.get("LEVER_METRICS", "1") == "1"
+
+EVENT_LOG = os.environ.get("LEVER_EVENT_LOG", "0") == "1"
+EVENT_SNAPSHOT_INTERVAL = int(os.environ.get("LEVER_EVENT_SNAPSHOT_INTERVAL", "1000"))
@@ -1,24 +1,280 @@
-import mysql.connector
-from mysql.connector import Error
+import config
+import metrics
 import logging
+import sys
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+DB_CONNECT_SECONDS = metrics.histogram(
+    "lever_db_connect_seconds", "Time spent opening new MySQL connections"
+)
+DB_ACQUIRE_SECONDS = metrics.histogram(
+    "lever_db_acquire_seconds", "Time spent checking a connection out of the pool"
+)
+
+
+class PoolError(Exception):
+    pass
+
+
+class PoolTimeoutError(PoolError):
+    pass
+
+
+def database_errors():
+    driver = sys.modules.get("mysql.connector")
+    return (PoolError, driver.Error) if driver is not None else (PoolError,)
+
+
+class PooledConnection:
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise PoolError("Connection already returned to pool")
+        return getattr(self._connection, name)
+
+    def close(self, rollback=False):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection, rollback=rollback)
+
+    def discard(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection, discard=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, database_errors()):
+            self.discard()
+        else:
+            self.close(rollback=exc_type is not None)
+
+
+class ConnectionPool:
+    def __init__(self, connect, size=5, timeout=5.0, max_idle=300.0, ping_after=30.0):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+
+        self._idle = []
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "checkouts": 0,
+            "reused": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "evicted_idle": 0,
+            "failed_health_checks": 0,
+        }
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        evicted = []
+
+        try:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+
+                    now = time.monotonic()
+                    evicted.extend(self._evict_idle(now))
+
+                    if self._idle:
+                        connection, last_used = self._idle.pop()
+                        break
+
+                    if self._in_use < self.size:
+                        connection, last_used = None, now
+                        break
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"No connection available within {self.timeout}s (pool size {self.size})"
+                        )
+
+                    self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+
+                self._in_use += 1
+                self._stats["checkouts"] += 1
+        finally:
+            for stale in evicted:
+                self._close_quietly(stale)
+
+        try:
+            if connection is not None and now - last_used >= self.ping_after:
+                if not self._is_healthy(connection):
+                    self._count("failed_health_checks")
+                    self._close_quietly(connection)
+                    connection = None
+
+            if connection is None:
+                connection = self._connect()
+                if connection is None:
+                    raise PoolError("Driver returned no connection")
+                self._count("created")
+            else:
+                self._count("reused")
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, connection)
+
+    def release(self, connection, discard=False, rollback=False):
+        # Only pay the rollback round trip when something may still be open.
+        if not discard and (rollback or getattr(connection, "in_transaction", True)):
+            try:
+                connection.rollback()
+            except Exception as e:
+                logger.warning(f"Discarding pooled connection after failed rollback: {e}")
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if not discard and not self._closed:
+                self._idle.append((connection, time.monotonic()))
+                connection = None
+            self._cond.notify()
+
+        if connection is not None:
+            self._close_quietly(connection)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+
+        for connection, _ in idle:
+            self._close_quietly(connection)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._in_use
+        return stats
+
+    def _evict_idle(self, now):
+        if not self._idle or now - self._idle[0][1] < self.max_idle:
+            return []
+
+        keep = [(c, t) for c, t in self._idle if now - t < self.max_idle]
+        evicted = [c for c, t in self._idle if now - t >= self.max_idle]
+        self._stats["evicted_idle"] += len(evicted)
+        self._idle = keep
+        return evicted
+
+    def _is_healthy(self, connection):
+        try:
+            return connection.is_connected()
+        except Exception:
+            return False
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self._count("closed")
+
+    def _count(self, key):
+        with self._cond:
+            self._stats[key] += 1
+
+
+@DB_CONNECT_SECONDS.time()
+def _mysql_connect():
+    import mysql.connector
+
+    connection = mysql.connector.connect(**config.DB_CONFIG)
+    if connection.is_connected():
+        return connection
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _pool_settings(**options):
+    settings = {
+        "size": config.DB_POOL_SIZE,
+        "timeout": config.DB_POOL_TIMEOUT,
+        "max_idle": config.DB_POOL_MAX_IDLE,
+        "ping_after": config.DB_POOL_PING_AFTER,
+    }
+    settings.update(options)
+    return settings
+
+
+def configure_pool(connect=None, **options):
+    global _pool
+
+    with _pool_lock:
+        old_pool = _pool
+        _pool = ConnectionPool(connect or _mysql_connect, **_pool_settings(**options))
+
+    if old_pool is not None:
+        old_pool.close()
+    return _pool
+
+
+def get_pool():
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(_mysql_connect, **_pool_settings())
+    return _pool
+
+
+def get_pool_stats():
+    if _pool is None:
+        return None
+    return _pool.stats()
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
 def get_connection():
+    started = time.perf_counter()
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='lever_db',
-            user='username',
-            password='password' 
-        )
-        
-        if connection.is_connected():
-            return connection
-            
-    except Error as e:
+        return get_pool().acquire()
+    except database_errors() as e:
         logger.error(f"Error connecting to MySQL: {e}")
         raise e
+    finally:
+        if metrics.ENABLED:
+            DB_ACQUIRE_SECONDS.observe(time.perf_counter() - started)
 
 def test_connection():
     try:
@@ -32,12 +288,9 @@ def test_connection():
             cursor.close()
             conn.close()
             return True
-    except Error as e:
+    except database_errors() as e:
         print(f"Database connection failed: {e}")
         return False
 
 if __name__ == "__main__":
     test_connection()
-
-
-
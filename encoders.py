@@ -0,0 +1,239 @@
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from history import encode_cursor
+from json.encoder import encode_basestring
+from states import LeverState
+from uuid import UUID
+import config
+import json
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+NDJSON = "application/x-ndjson"
+
+MEDIA_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/jsonl": NDJSON,
+    "application/x-jsonlines": NDJSON,
+}
+WILDCARDS = ("*/*", "application/*")
+
+RESPONSE_OFFERS = (JSON, MSGPACK)
+HISTORY_OFFERS = (JSON, MSGPACK, NDJSON)
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Same bytes as orjson with sorted keys (raw UTF-8 strings) for the get_state() shape.
+STATUS_TEMPLATE = (
+    '{"data":{"at_bottom":%s,"at_top":%s,"heat":%s,"position":%s,"sealing_progress":%s,"state":%s},'
+    '"message":%s,"success":true}'
+)
+BOOLS = {True: "true", False: "false"}
+STATE_NAMES = {state.value: encode_basestring(state.value) for state in LeverState}
+
+NEGOTIATION_CACHE_SIZE = 256
+DATE_CACHE_SIZE = 4096
+
+_date_prefixes = {}
+
+
+def http_date(value):
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time())
+    elif value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+
+    day = value.toordinal()
+    prefix = _date_prefixes.get(day)
+    if prefix is None:
+        if len(_date_prefixes) >= DATE_CACHE_SIZE:
+            _date_prefixes.clear()
+        prefix = _date_prefixes[day] = "%s, %02d %s %04d " % (
+            DAYS[value.weekday()], value.day, MONTHS[value.month - 1], value.year
+        )
+    return "%s%02d:%02d:%02d GMT" % (prefix, value.hour, value.minute, value.second)
+
+
+def _default(value):
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _number(value):
+    if value.__class__ is int:
+        return repr(value)
+    if value.__class__ is float:
+        # orjson writes non-finite floats as null; repr would emit invalid JSON.
+        return repr(value) if math.isfinite(value) else "null"
+    return json.dumps(value, default=_default)
+
+
+class JSONEncoder:
+    name = "json"
+    media_type = JSON
+
+    def dumps(self, value):
+        return json.dumps(value, default=_default, sort_keys=True, separators=(",", ":")).encode()
+
+    def render_status(self, state, message):
+        return (STATUS_TEMPLATE % (
+            BOOLS[state["at_bottom"]],
+            BOOLS[state["at_top"]],
+            _number(state["heat"]),
+            _number(state["position"]),
+            _number(state["sealing_progress"]),
+            STATE_NAMES.get(state["state"]) or encode_basestring(state["state"]),
+            encode_basestring(message)
+        )).encode()
+
+
+class OrjsonEncoder(JSONEncoder):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._dumps = orjson.dumps
+        # Datetimes go through _default so both JSON backends emit the same HTTP dates.
+        self._options = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, value):
+        return self._dumps(value, default=_default, option=self._options)
+
+    def render_status(self, state, message):
+        return self._dumps(
+            {"success": True, "data": state, "message": message}, default=_default, option=self._options
+        )
+
+
+class MsgpackEncoder:
+    name = "msgpack"
+    media_type = MSGPACK
+
+    def __init__(self):
+        import msgpack
+
+        self._packb = msgpack.packb
+
+    def dumps(self, value):
+        return self._packb(value, default=_default)
+
+    def render_status(self, state, message):
+        return self._packb({"success": True, "data": state, "message": message}, default=_default)
+
+
+class NDJSONEncoder:
+    name = "ndjson"
+    media_type = NDJSON
+
+    def __init__(self, json_encoder):
+        self.json = json_encoder
+
+    def dumps(self, value):
+        return self.json.dumps(value) + b"\n"
+
+    def stream_history(self, query, results):
+        count = 0
+        last_row = None
+        try:
+            for row in results:
+                if count == query.limit:
+                    yield self.dumps({"next_cursor": encode_cursor(last_row)})
+                    break
+                yield self.dumps(query.project(row))
+                last_row = row
+                count += 1
+        finally:
+            if hasattr(results, "close"):
+                results.close()
+
+
+def create_json_encoder(backend=None):
+    backend = backend or config.JSON_ENCODER
+    if backend in ("auto", "orjson"):
+        try:
+            return OrjsonEncoder()
+        except ImportError:
+            if backend == "orjson":
+                raise
+            logger.info("orjson is not installed, using the standard library JSON encoder")
+    elif backend != "json":
+        raise ValueError(f"Unknown JSON encoder {backend!r}, expected auto, orjson or json")
+    return JSONEncoder()
+
+
+def create_msgpack_encoder():
+    if not config.MSGPACK_ENABLED:
+        return None
+    try:
+        return MsgpackEncoder()
+    except ImportError:
+        logger.info("msgpack is not installed, application/msgpack responses are disabled")
+        return None
+
+
+class ResponseEncoders:
+    def __init__(self, json_encoder=None, msgpack_encoder=None):
+        self.json = json_encoder or create_json_encoder()
+        self.ndjson = NDJSONEncoder(self.json)
+        self.by_type = {JSON: self.json, NDJSON: self.ndjson}
+
+        msgpack_encoder = msgpack_encoder or create_msgpack_encoder()
+        if msgpack_encoder is not None:
+            self.by_type[MSGPACK] = msgpack_encoder
+
+        self._negotiated = {}
+
+    def negotiate(self, accept, offers=RESPONSE_OFFERS):
+        if not accept:
+            return self.json
+
+        key = (accept, offers)
+        encoder = self._negotiated.get(key)
+        if encoder is None:
+            encoder = self.by_type[self._best_match(accept, offers)]
+            if len(self._negotiated) >= NEGOTIATION_CACHE_SIZE:
+                self._negotiated.clear()
+            self._negotiated[key] = encoder
+        return encoder
+
+    def _best_match(self, accept, offers):
+        best = JSON
+        best_rank = (0.0, 0)
+        for part in accept.split(","):
+            media_type, *params = part.split(";")
+            media_type = media_type.strip().lower()
+            media_type = MEDIA_ALIASES.get(media_type, media_type)
+
+            quality = 1.0
+            for param in params:
+                name, _, value = param.partition("=")
+                if name.strip() == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+
+            if media_type in WILDCARDS:
+                rank = (quality, 0)
+                media_type = offers[0]
+            elif media_type in offers and media_type in self.by_type:
+                rank = (quality, 1)
+            else:
+                continue
+
+            if quality > 0 and rank > best_rank:
+                best, best_rank = media_type, rank
+        return best
+
+    def get_stats(self):
+        return {"json": self.json.name, "media_types": list(self.by_type)}
@@ -0,0 +1,306 @@
+from audit import HistoryWriter
+from db import get_connection
+from storage import get_storage
+import bisect
+import config
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class EventGapError(Exception):
+    pass
+
+
+class MySQLEventStore:
+    def write_batch(self, rows):
+        events = [row[1:] for row in rows if row[0] == "event"]
+        snapshots = [row[1:] for row in rows if row[0] == "snapshot"]
+
+        with get_connection() as conn:
+            cur = conn.cursor()
+            if events:
+                cur.execute(
+                    "INSERT INTO lever_events (lever_id, seq, event, value) VALUES "
+                    + ", ".join(["(%s, %s, %s, %s)"] * len(events)),
+                    [value for row in events for value in row]
+                )
+            if snapshots:
+                cur.execute(
+                    "INSERT INTO lever_snapshots (lever_id, seq, position, heat, state, sealing_progress) VALUES "
+                    + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(snapshots))
+                    + " ON DUPLICATE KEY UPDATE position=VALUES(position), heat=VALUES(heat),"
+                    " state=VALUES(state), sealing_progress=VALUES(sealing_progress)",
+                    [value for row in snapshots for value in row]
+                )
+            conn.commit()
+            cur.close()
+
+    def latest_snapshot(self, lever_id):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT seq, position, heat, state, sealing_progress FROM lever_snapshots"
+                " WHERE lever_id=%s ORDER BY seq DESC LIMIT 1",
+                (lever_id,)
+            )
+            row = cur.fetchone()
+            cur.close()
+        return row
+
+    def last_seq(self, lever_id):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT MAX(seq) FROM lever_events WHERE lever_id=%s", (lever_id,))
+            row = cur.fetchone()
+            cur.close()
+        return row[0] if row and row[0] is not None else 0
+
+    def events_after(self, lever_id, seq, batch_size=10000):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT seq, event, value FROM lever_events WHERE lever_id=%s AND seq > %s ORDER BY seq",
+                (lever_id, seq)
+            )
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            cur.close()
+
+    def compact(self, lever_id, keep_snapshots=1):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT seq FROM lever_snapshots WHERE lever_id=%s ORDER BY seq DESC LIMIT %s",
+                (lever_id, keep_snapshots)
+            )
+            kept = cur.fetchall()
+            if len(kept) == keep_snapshots:
+                oldest = kept[-1][0]
+                cur.execute("DELETE FROM lever_events WHERE lever_id=%s AND seq <= %s", (lever_id, oldest))
+                cur.execute("DELETE FROM lever_snapshots WHERE lever_id=%s AND seq < %s", (lever_id, oldest))
+            conn.commit()
+            cur.close()
+
+
+class SQLiteEventStore:
+    def __init__(self, storage):
+        self.storage = storage
+
+    def write_batch(self, rows):
+        with self.storage.transaction() as cur:
+            cur.executemany(
+                "INSERT INTO lever_events (lever_id, seq, event, value) VALUES (?, ?, ?, ?)",
+                [row[1:] for row in rows if row[0] == "event"]
+            )
+            cur.executemany(
+                "REPLACE INTO lever_snapshots (lever_id, seq, position, heat, state, sealing_progress)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [row[1:] for row in rows if row[0] == "snapshot"]
+            )
+
+    def latest_snapshot(self, lever_id):
+        rows = self.storage.execute(
+            "SELECT seq, position, heat, state, sealing_progress FROM lever_snapshots"
+            " WHERE lever_id=? ORDER BY seq DESC LIMIT 1",
+            (lever_id,)
+        )
+        return tuple(rows[0].values()) if rows else None
+
+    def last_seq(self, lever_id):
+        rows = self.storage.execute("SELECT MAX(seq) AS seq FROM lever_events WHERE lever_id=?", (lever_id,))
+        return rows[0]["seq"] or 0
+
+    def events_after(self, lever_id, seq):
+        rows = self.storage.execute(
+            "SELECT seq, event, value FROM lever_events WHERE lever_id=? AND seq > ? ORDER BY seq",
+            (lever_id, seq)
+        )
+        return (tuple(row.values()) for row in rows)
+
+    def compact(self, lever_id, keep_snapshots=1):
+        with self.storage.transaction() as cur:
+            cur.execute(
+                "SELECT seq FROM lever_snapshots WHERE lever_id=? ORDER BY seq DESC LIMIT ?",
+                (lever_id, keep_snapshots)
+            )
+            kept = cur.fetchall()
+            if len(kept) == keep_snapshots:
+                oldest = kept[-1][0]
+                cur.execute("DELETE FROM lever_events WHERE lever_id=? AND seq <= ?", (lever_id, oldest))
+                cur.execute("DELETE FROM lever_snapshots WHERE lever_id=? AND seq < ?", (lever_id, oldest))
+
+
+class MemoryEventStore:
+    def __init__(self):
+        self.events = {}
+        self.snapshots = {}
+        self._lock = threading.Lock()
+
+    def write_batch(self, rows):
+        with self._lock:
+            for row in rows:
+                if row[0] == "event":
+                    self.events.setdefault(row[1], []).append(row[2:])
+                else:
+                    self.snapshots.setdefault(row[1], []).append(row[2:])
+
+    def latest_snapshot(self, lever_id):
+        snapshots = self.snapshots.get(lever_id)
+        return max(snapshots) if snapshots else None
+
+    def last_seq(self, lever_id):
+        events = self.events.get(lever_id)
+        return events[-1][0] if events else 0
+
+    def events_after(self, lever_id, seq):
+        events = self.events.get(lever_id, [])
+        start = bisect.bisect_right(events, seq, key=lambda event: event[0])
+        return iter(events[start:])
+
+    def compact(self, lever_id, keep_snapshots=1):
+        with self._lock:
+            snapshots = sorted(self.snapshots.get(lever_id, []))
+            if len(snapshots) < keep_snapshots:
+                return
+            oldest = snapshots[-keep_snapshots][0]
+            self.snapshots[lever_id] = snapshots[-keep_snapshots:]
+            self.events[lever_id] = [event for event in self.events.get(lever_id, []) if event[0] > oldest]
+
+
+class EventLog:
+    def __init__(self, store, snapshot_interval=1000, writer=None):
+        self.store = store
+        self.snapshot_interval = snapshot_interval
+        self.writer = writer or HistoryWriter(
+            self._write_batch,
+            max_queue=config.HISTORY_QUEUE_SIZE,
+            batch_size=config.HISTORY_BATCH_SIZE,
+            flush_interval=config.HISTORY_FLUSH_INTERVAL,
+            drop_policy="block"
+        )
+
+        self._lost = set()
+        self._lock = threading.Lock()
+        self.stats = {"lost": 0, "gaps": 0, "compactions": 0, "compaction_errors": 0}
+
+    def append(self, lever_id, seq, event, value=None):
+        if not self.writer.append(("event", lever_id, seq, event, value)):
+            self._mark_lost({lever_id}, 1)
+
+    def snapshot(self, lever_id, seq, row):
+        if not self.writer.append(("snapshot", lever_id, seq) + tuple(row)):
+            self._mark_lost({lever_id}, 0)
+
+    def needs_snapshot(self, lever_id):
+        # A lost event leaves a seq gap; the next snapshot makes it irrelevant for replay.
+        if not self._lost:
+            return False
+        with self._lock:
+            if lever_id in self._lost:
+                self._lost.discard(lever_id)
+                return True
+        return False
+
+    def recover(self, lever):
+        fallback = lever.state_row()
+        snapshot = self.store.latest_snapshot(lever.id)
+
+        if snapshot is None:
+            seq = self.store.last_seq(lever.id)
+            if seq:
+                self.stats["gaps"] += 1
+                logger.error(
+                    f"Lever {lever.id}: {seq} events stored without a base snapshot, keeping lever_state"
+                )
+            lever.event_seq = seq
+            self._write_snapshot(lever, seq)
+            logger.info(f"Lever {lever.id}: no snapshot, recorded genesis snapshot at seq {seq}")
+            return 0
+
+        seq, position, heat, state, sealing_progress = snapshot
+        lever.restore(float(position), float(heat), state, int(sealing_progress), seq)
+        try:
+            replayed = lever.replay(self._contiguous(lever.id, seq, self.store.events_after(lever.id, seq)))
+        except EventGapError as e:
+            last_seq = max(seq, self.store.last_seq(lever.id))
+            self.stats["gaps"] += 1
+            logger.error(f"{e}, falling back to lever_state and re-basing at seq {last_seq}")
+            lever.restore(*fallback, last_seq)
+            self._write_snapshot(lever, last_seq)
+            return 0
+
+        logger.info(f"Lever {lever.id}: recovered from snapshot {seq} + {replayed} events")
+        return replayed
+
+    def _contiguous(self, lever_id, seq, events):
+        for event in events:
+            seq += 1
+            if event[0] != seq:
+                raise EventGapError(f"Lever {lever_id}: event log gap, expected seq {seq} but found {event[0]}")
+            yield event
+
+    def _write_snapshot(self, lever, seq):
+        try:
+            self.store.write_batch([("snapshot", lever.id, seq) + tuple(lever.state_row())])
+        except Exception as e:
+            logger.error(f"Lever {lever.id}: error writing snapshot at seq {seq}: {e}")
+            self._mark_lost({lever.id}, 0)
+            return
+        self._compact(lever.id)
+
+    def _write_batch(self, rows):
+        try:
+            self.store.write_batch(rows)
+        except Exception:
+            self._mark_lost({row[1] for row in rows}, sum(1 for row in rows if row[0] == "event"))
+            raise
+
+        for lever_id in {row[1] for row in rows if row[0] == "snapshot"}:
+            self._compact(lever_id)
+
+    def _compact(self, lever_id):
+        try:
+            self.store.compact(lever_id)
+            self.stats["compactions"] += 1
+        except Exception as e:
+            self.stats["compaction_errors"] += 1
+            logger.error(f"Error compacting event log for lever {lever_id}: {e}")
+
+    def _mark_lost(self, lever_ids, count):
+        with self._lock:
+            self._lost.update(lever_ids)
+            self.stats["lost"] += count
+        logger.error(f"Event log lost {count} events for levers {sorted(lever_ids)}, snapshotting on next event")
+
+    def flush(self, timeout=None):
+        return self.writer.flush(timeout=timeout)
+
+    def close(self):
+        self.writer.close()
+
+    def get_stats(self):
+        stats = self.writer.get_stats()
+        stats["snapshot_interval"] = self.snapshot_interval
+        with self._lock:
+            stats.update(self.stats)
+            stats["pending_snapshots"] = len(self._lost)
+        return stats
+
+
+def create_event_log():
+    if not config.EVENT_LOG:
+        return None
+
+    storage = get_storage()
+    if storage.name == "sqlite":
+        store = SQLiteEventStore(storage)
+    elif storage.name == "memory":
+        store = MemoryEventStore()
+    else:
+        store = MySQLEventStore()
+    return EventLog(store, snapshot_interval=config.EVENT_SNAPSHOT_INTERVAL)
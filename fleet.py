@@ -0,0 +1,148 @@
+from models.lever import DEFAULT_CONFIG_ROW, DEFAULT_STATE_ROW, Lever
+from scheduler import SimulatedClock, TickScheduler
+from states import LeverEvent, LeverState
+from storage import get_storage
+import config
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEVER_ID = 1
+LOAD_BACKOFF_MAX = 5.0
+
+
+class LeverFleet:
+    def __init__(self, scheduler=None, event_log=None):
+        self.levers = {}
+        self.event_log = event_log
+        self.owner = None
+        self.listeners = []
+        self.discard_listeners = []
+        self.scheduler = scheduler or TickScheduler(
+            clock=SimulatedClock() if config.CLOCK == "simulated" else time.monotonic,
+            policy=config.TICK_POLICY,
+            max_catch_up=config.TICK_MAX_CATCH_UP
+        )
+
+    def load(self, retries=None, backoff=None):
+        configs, states = self._load_rows(
+            config.STARTUP_RETRIES if retries is None else retries,
+            config.STARTUP_BACKOFF if backoff is None else backoff
+        )
+
+        if not configs:
+            logger.warning(f"No lever_config rows found, running lever {DEFAULT_LEVER_ID} with defaults")
+            configs = {DEFAULT_LEVER_ID: DEFAULT_CONFIG_ROW}
+
+        for lever_id, cfg in configs.items():
+            self.add(Lever(lever_id, config_row=cfg, state_row=states.get(lever_id, DEFAULT_STATE_ROW)))
+
+        logger.info(f"Fleet loaded {len(self.levers)} levers")
+        return self
+
+    def add(self, lever):
+        if self.event_log is not None and lever.events is None:
+            lever.events = self.event_log
+            self.event_log.recover(lever)
+        for listener in self.listeners:
+            lever.add_listener(listener)
+        self.levers[lever.id] = lever
+        self.scheduler.add(lever.id, lever.tick, lever.tick_update)
+        return lever
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+        for lever in self.levers.values():
+            lever.add_listener(callback)
+
+    def add_discard_listener(self, callback):
+        self.discard_listeners.append(callback)
+
+    def remove(self, lever_id):
+        lever = self.levers.pop(lever_id, None)
+        if lever is not None:
+            self.scheduler.remove(lever_id)
+            lever.writer.close()
+            self._discard(lever_id)
+        return lever
+
+    def reconfigure(self, lever_id, cfg):
+        lever = self.levers[lever_id]
+        previous = lever.reconfigure(cfg, owner=self.owner is None or self.owner(lever_id))
+        if lever.tick != previous.tick:
+            self.scheduler.reschedule(lever_id, lever.tick)
+            logger.info(f"Lever {lever_id} tick rescheduled from {previous.tick_ms}ms to {lever.config.tick_ms}ms")
+        self._discard(lever_id)
+        return previous
+
+    def _discard(self, lever_id):
+        for callback in self.discard_listeners:
+            callback(lever_id)
+
+    def get(self, lever_id):
+        return self.levers.get(lever_id)
+
+    def __len__(self):
+        return len(self.levers)
+
+    def __iter__(self):
+        return iter(self.levers.values())
+
+    @property
+    def simulated(self):
+        return isinstance(self.scheduler.clock, SimulatedClock)
+
+    def start(self):
+        if self.simulated:
+            logger.info("Simulated clock: ticks only advance through /api/system/advance")
+            return
+        self.scheduler.start()
+
+    def stop(self, timeout=None):
+        self.scheduler.stop(timeout=timeout)
+
+    def close(self):
+        self.stop(timeout=1.0)
+        for lever in self.levers.values():
+            lever.writer.close()
+        if self.event_log is not None:
+            self.event_log.close()
+
+    def collect_metrics(self):
+        levers = list(self.levers.values())
+        stats = self.scheduler.get_stats()
+
+        yield "# HELP lever_fleet_levers Levers managed by this process"
+        yield "# TYPE lever_fleet_levers gauge"
+        yield f"lever_fleet_levers {len(levers)}"
+
+        for name in ("ticks", "errors", "overruns", "skipped"):
+            yield f"# HELP lever_scheduler_{name}_total Scheduler {name} since start"
+            yield f"# TYPE lever_scheduler_{name}_total counter"
+            yield f"lever_scheduler_{name}_total {stats[name]}"
+
+        yield "# HELP lever_fsm_transitions_total FSM transitions taken per (state, event)"
+        yield "# TYPE lever_fsm_transitions_total counter"
+        totals = {}
+        for lever in levers:
+            for index, count in list(lever.fsm.transition_counts.items()):
+                totals[index] = totals.get(index, 0) + count
+        states, events = list(LeverState), list(LeverEvent)
+        for index, total in sorted(totals.items()):
+            state, event = states[index // len(events)], events[index % len(events)]
+            yield f'lever_fsm_transitions_total{{state="{state.value}",event="{event.value}"}} {total}'
+
+    def _load_rows(self, retries, backoff):
+        storage = get_storage()
+        for attempt in range(retries + 1):
+            try:
+                return storage.load_configs(), storage.load_states()
+            except Exception as e:
+                if attempt == retries:
+                    logger.error(f"Error loading fleet: {e}")
+                    break
+                delay = min(backoff * 2 ** attempt, LOAD_BACKOFF_MAX)
+                logger.warning(f"Error loading fleet ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+        return {}, {}
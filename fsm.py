@@ -1,84 +1,219 @@
+from collections import defaultdict
 from states import LeverState, LeverEvent, TransitionResult
+from types import MappingProxyType
 from typing import Callable, Dict, Tuple, Optional, List
 import logging
 
 logger = logging.getLogger(__name__)
 
-class StateMachine:    
-    def __init__(self, initial_state: LeverState):
-        self.current_state = initial_state
-        self.previous_state = None
-        
+NO_CONTEXT = MappingProxyType({})
+
+EVENT_COUNT = len(LeverEvent)
+
+_SUCCESS = TransitionResult.SUCCESS
+_INVALID = TransitionResult.INVALID
+_BLOCKED = TransitionResult.BLOCKED
+_IGNORED = TransitionResult.IGNORED
+
+class TransitionTable:
+    # Callbacks are plain functions called with the owning object first:
+    # action(owner, context), guard(owner), on_enter/on_exit(owner, context).
+    # One compiled table is shared by every StateMachine built from it.
+    def __init__(self):
         self.transitions: Dict[Tuple[LeverState, LeverEvent], Tuple[LeverState, Optional[Callable]]] = {}
-        
+
         self.on_enter: Dict[LeverState, List[Callable]] = {}
         self.on_exit: Dict[LeverState, List[Callable]] = {}
-        
+
         self.guards: Dict[Tuple[LeverState, LeverEvent], Callable] = {}
-        
+
+        self._entries: Optional[tuple] = None
+
+    @property
+    def frozen(self) -> bool:
+        return self._entries is not None
+
     def add_transition(
-        self, 
-        from_state: LeverState, 
-        event: LeverEvent, 
-        to_state: LeverState, 
+        self,
+        from_state: LeverState,
+        event: LeverEvent,
+        to_state: LeverState,
         action: Optional[Callable] = None,
         guard: Optional[Callable] = None
     ):
+        self._check_mutable()
         self.transitions[(from_state, event)] = (to_state, action)
         if guard:
             self.guards[(from_state, event)] = guard
-            
+
+    def add_on_enter(self, state: LeverState, callback: Callable):
+        self._check_mutable()
+        self.on_enter.setdefault(state, []).append(callback)
+
+    def add_on_exit(self, state: LeverState, callback: Callable):
+        self._check_mutable()
+        self.on_exit.setdefault(state, []).append(callback)
+
+    def compile(self) -> "TransitionTable":
+        table = [None] * (len(LeverState) * EVENT_COUNT)
+
+        for (from_state, event), (to_state, action) in self.transitions.items():
+            guard = self.guards.get((from_state, event))
+            exit_callbacks = tuple(self.on_exit.get(from_state, ()))
+            enter_callbacks = tuple(self.on_enter.get(to_state, ()))
+            changes_state = to_state is not from_state
+            noop = not (changes_state or action or guard or exit_callbacks or enter_callbacks)
+
+            table[from_state.index * EVENT_COUNT + event.index] = (
+                to_state, guard, exit_callbacks, action, enter_callbacks, changes_state, noop
+            )
+
+        self._entries = tuple(table)
+        return self
+
+    @property
+    def entries(self) -> tuple:
+        return self._entries if self._entries is not None else self.compile()._entries
+
+    def _check_mutable(self):
+        if self._entries is not None:
+            raise RuntimeError("Transition table is compiled and shared; build a new TransitionTable instead")
+
+class StateMachine:
+    __slots__ = (
+        "current_state", "previous_state", "table", "owner", "on_state_change",
+        "transition_counts", "_entries", "_dispatching", "_deferred"
+    )
+
+    def __init__(self, initial_state: LeverState, table: Optional[TransitionTable] = None, owner=None):
+        self.current_state = initial_state
+        self.previous_state = None
+
+        self.table = table if table is not None else TransitionTable()
+        self.owner = owner
+        self.on_state_change: Tuple[Callable, ...] = ()
+
+        self.transition_counts: Dict[int, int] = defaultdict(int)
+        self._entries: Optional[tuple] = None
+        self._dispatching = False
+        self._deferred: List[tuple] = []
+
+    @property
+    def transitions(self):
+        return self.table.transitions
+
+    @property
+    def guards(self):
+        return self.table.guards
+
+    @property
+    def on_enter(self):
+        return self.table.on_enter
+
+    @property
+    def on_exit(self):
+        return self.table.on_exit
+
+    def add_transition(
+        self,
+        from_state: LeverState,
+        event: LeverEvent,
+        to_state: LeverState,
+        action: Optional[Callable] = None,
+        guard: Optional[Callable] = None
+    ):
+        self.table.add_transition(from_state, event, to_state, action, guard)
+
     def add_on_enter(self, state: LeverState, callback: Callable):
-        if state not in self.on_enter:
-            self.on_enter[state] = []
-        self.on_enter[state].append(callback)
-        
+        self.table.add_on_enter(state, callback)
+
     def add_on_exit(self, state: LeverState, callback: Callable):
-        if state not in self.on_exit:
-            self.on_exit[state] = []
-        self.on_exit[state].append(callback)
-    
+        self.table.add_on_exit(state, callback)
+
+    def add_on_state_change(self, callback: Callable):
+        self.on_state_change += (callback,)
+
+    def compile(self) -> "StateMachine":
+        self._entries = self.table.entries
+        return self
+
     def can_transition(self, event: LeverEvent) -> bool:
-        key = (self.current_state, event)
-        
-        if key not in self.transitions:
+        table = self._entries if self._entries is not None else self.compile()._entries
+        entry = table[self.current_state.index * EVENT_COUNT + event.index]
+
+        if entry is None:
             return False
-            
-        if key in self.guards:
-            return self.guards[key]()
-            
+
+        if entry[1] is not None:
+            return entry[1](self.owner)
+
         return True
-    
+
     def trigger(self, event: LeverEvent, context: Optional[dict] = None) -> TransitionResult:
-        context = context or {}
-        key = (self.current_state, event)
-        
-        if key not in self.transitions:
-            return TransitionResult.INVALID
-        
-        if key in self.guards and not self.guards[key]():
-            return TransitionResult.BLOCKED
-        
-        new_state, action = self.transitions[key]
-        
-        if self.current_state in self.on_exit:
-            for callback in self.on_exit[self.current_state]:
-                callback(context)
-        
-        if action:
-            action(context)
-        
-        self.previous_state = self.current_state
+        if self._dispatching:
+            # Events raised from inside a transition (e.g. REACHED_TOP from the
+            # MOVING_UP tick action) run once the current transition has committed.
+            self._deferred.append((event, context))
+            return _IGNORED
+
+        table = self._entries if self._entries is not None else self.compile()._entries
+        state = self.current_state
+        key = state.index * EVENT_COUNT + event.index
+        entry = table[key]
+
+        if entry is None:
+            return _INVALID
+
+        if entry[6]:
+            self.previous_state = state
+            self.transition_counts[key] += 1
+            return _SUCCESS
+
+        self._dispatching = True
+        try:
+            result = self._apply(state, event, entry, NO_CONTEXT if context is None else context)
+
+            deferred = self._deferred
+            while deferred:
+                event, context = deferred.pop(0)
+                state = self.current_state
+                entry = table[state.index * EVENT_COUNT + event.index]
+                if entry is not None:
+                    self._apply(state, event, entry, NO_CONTEXT if context is None else context)
+        finally:
+            self._dispatching = False
+            self._deferred.clear()
+
+        return result
+
+    def _apply(self, state, event, entry, context) -> TransitionResult:
+        new_state, guard, exit_callbacks, action, enter_callbacks, changes_state, _ = entry
+        owner = self.owner
+
+        if guard is not None and not guard(owner):
+            return _BLOCKED
+
+        for callback in exit_callbacks:
+            callback(owner, context)
+
+        if action is not None:
+            action(owner, context)
+
+        self.previous_state = state
         self.current_state = new_state
-        
-        if new_state in self.on_enter:
-            for callback in self.on_enter[new_state]:
-                callback(context)
-        
-        return TransitionResult.SUCCESS
-    
+        self.transition_counts[state.index * EVENT_COUNT + event.index] += 1
+
+        for callback in enter_callbacks:
+            callback(owner, context)
+
+        if changes_state:
+            for callback in self.on_state_change:
+                callback(state, new_state, event)
+
+        return _SUCCESS
+
     def get_state(self) -> LeverState:
         return self.current_state
-    
+
     def get_previous_state(self) -> Optional[LeverState]:
-        return self.previous_state
\ No newline at end of file
+        return self.previous_state
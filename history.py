@@ -0,0 +1,147 @@
+from datetime import datetime
+from itertools import islice
+import base64
+
+HISTORY_FIELDS = ("id", "lever_id", "action", "position", "heat", "state", "details", "timestamp")
+
+
+def encode_cursor(row):
+    raw = f"{row['timestamp'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def paginate(query, results):
+    rows = list(islice(results, query.limit + 1))
+    if hasattr(results, "close"):
+        results.close()
+
+    next_cursor = None
+    if len(rows) > query.limit:
+        rows = rows[:query.limit]
+        next_cursor = encode_cursor(rows[-1])
+    return [query.project(row) for row in rows], next_cursor
+
+
+def parse_time(value, name):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: expected ISO 8601 datetime")
+    if parsed.tzinfo is not None:
+        # Stored timestamps are naive server-local time (datetime.now()).
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+class HistoryQuery:
+    def __init__(
+        self,
+        lever_id,
+        limit=50,
+        cursor=None,
+        action=None,
+        state=None,
+        since=None,
+        until=None,
+        fields=None,
+        max_limit=500
+    ):
+        if limit < 1:
+            raise ValueError("limit must be positive")
+
+        self.lever_id = lever_id
+        self.limit = min(limit, max_limit)
+        self.after = decode_cursor(cursor) if cursor else None
+        self.action = action
+        self.state = state
+        self.since = since
+        self.until = until
+
+        if fields:
+            unknown = [field for field in fields if field not in HISTORY_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            self.fields = tuple(dict.fromkeys(fields))
+        else:
+            self.fields = HISTORY_FIELDS
+
+    @classmethod
+    def from_args(cls, lever_id, args, max_limit=500):
+        since = args.get('since')
+        until = args.get('until')
+        fields = args.get('fields')
+        return cls(
+            lever_id,
+            limit=args.get('limit', 50, type=int),
+            cursor=args.get('cursor'),
+            action=args.get('action'),
+            state=args.get('state'),
+            since=parse_time(since, 'since') if since else None,
+            until=parse_time(until, 'until') if until else None,
+            fields=[field.strip() for field in fields.split(',') if field.strip()] if fields else None,
+            max_limit=max_limit
+        )
+
+    def to_sql(self):
+        columns = list(self.fields)
+        for key in ("timestamp", "id"):
+            if key not in columns:
+                columns.append(key)
+
+        conditions = ["lever_id=%s"]
+        params = [self.lever_id]
+
+        if self.action:
+            conditions.append("action=%s")
+            params.append(self.action)
+        if self.state:
+            conditions.append("state=%s")
+            params.append(self.state)
+        if self.since:
+            conditions.append("timestamp >= %s")
+            params.append(self.since)
+        if self.until:
+            conditions.append("timestamp < %s")
+            params.append(self.until)
+        if self.after:
+            timestamp, row_id = self.after
+            conditions.append("(timestamp < %s OR (timestamp = %s AND id < %s))")
+            params.extend([timestamp, timestamp, row_id])
+
+        sql = (
+            f"SELECT {', '.join(columns)} FROM lever_history"
+            f" WHERE {' AND '.join(conditions)}"
+            " ORDER BY timestamp DESC, id DESC LIMIT %s"
+        )
+        params.append(self.limit + 1)
+        return sql, params
+
+    def matches(self, row):
+        if row["lever_id"] != self.lever_id:
+            return False
+        if self.action and row["action"] != self.action:
+            return False
+        if self.state and row["state"] != self.state:
+            return False
+        if self.since and row["timestamp"] < self.since:
+            return False
+        if self.until and row["timestamp"] >= self.until:
+            return False
+        if self.after:
+            timestamp, row_id = self.after
+            return row["timestamp"] < timestamp or (row["timestamp"] == timestamp and row["id"] < row_id)
+        return True
+
+    def project(self, row):
+        if len(row) == len(self.fields):
+            return row
+        return {field: row[field] for field in self.fields}
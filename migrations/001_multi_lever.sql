@@ -0,0 +1,9 @@
+-- Levers are addressed by id instead of the single hard-coded id=1 row.
+-- lever_config and lever_state already key on id; history rows now record
+-- which lever they belong to. Existing rows are attributed to lever 1.
+
+ALTER TABLE lever_history
+    ADD COLUMN lever_id INT NOT NULL DEFAULT 1 AFTER id;
+
+CREATE INDEX idx_lever_history_lever_timestamp
+    ON lever_history (lever_id, timestamp);
@@ -0,0 +1,18 @@
+-- Indexes behind the keyset-paginated /api/lever/history.
+--
+-- Pages are read with
+--   WHERE lever_id = ? [AND action = ? | AND state = ?] [AND timestamp range]
+--     AND (timestamp < ? OR (timestamp = ? AND id < ?))
+--   ORDER BY timestamp DESC, id DESC LIMIT n
+--
+-- InnoDB appends the primary key to every secondary index, so
+-- idx_lever_history_lever_timestamp from 001 already orders by
+-- (lever_id, timestamp, id) and serves the unfiltered listing and time
+-- windows. The two indexes below let action/state filters seek straight to
+-- their rows instead of scanning the lever's whole history.
+
+CREATE INDEX idx_lever_history_lever_action_timestamp
+    ON lever_history (lever_id, action, timestamp);
+
+CREATE INDEX idx_lever_history_lever_state_timestamp
+    ON lever_history (lever_id, state, timestamp);
@@ -0,0 +1,27 @@
+-- Event-sourced lever state (LEVER_EVENT_LOG=1).
+--
+-- Every state-changing command, heat change, reset and effective tick is
+-- appended to lever_events with a per-lever sequence number. A full state
+-- snapshot is written every LEVER_EVENT_SNAPSHOT_INTERVAL events, so crash
+-- recovery loads the latest snapshot and replays only the events after it.
+-- The (lever_id, seq) primary keys serve both lookups directly.
+
+CREATE TABLE lever_events (
+    lever_id INT NOT NULL,
+    seq BIGINT NOT NULL,
+    event VARCHAR(32) NOT NULL,
+    value DOUBLE NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (lever_id, seq)
+);
+
+CREATE TABLE lever_snapshots (
+    lever_id INT NOT NULL,
+    seq BIGINT NOT NULL,
+    position DOUBLE NOT NULL,
+    heat DOUBLE NOT NULL,
+    state VARCHAR(20) NOT NULL,
+    sealing_progress INT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (lever_id, seq)
+);
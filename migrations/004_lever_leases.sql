@@ -0,0 +1,13 @@
+-- Tick ownership leases for cluster mode (LEVER_CLUSTER=1).
+--
+-- Each lever has one row named "lever:<id>". The owning process renews
+-- expires_at (epoch seconds) every third of the lease TTL; any process may
+-- take over a row whose lease has expired, so hosts need reasonably synced
+-- clocks. url is where the owner accepts forwarded commands.
+
+CREATE TABLE lever_leases (
+    name VARCHAR(64) NOT NULL PRIMARY KEY,
+    owner VARCHAR(64) NOT NULL,
+    url VARCHAR(255) NOT NULL,
+    expires_at DOUBLE NOT NULL
+);
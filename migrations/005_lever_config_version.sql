@@ -0,0 +1,12 @@
+-- Hot-reloadable lever configuration.
+--
+-- Every process polls SELECT id, version FROM lever_config every
+-- LEVER_CONFIG_RELOAD_INTERVAL seconds and reloads only the rows whose
+-- version differs from the one it is running with. The admin endpoint
+-- (POST /api/levers/<id>/config) bumps version itself; manual edits must do
+-- the same, e.g.
+--   UPDATE lever_config SET step = 2, version = version + 1 WHERE id = 1;
+
+ALTER TABLE lever_config
+    ADD COLUMN version INT NOT NULL DEFAULT 1,
+    ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
@@ -0,0 +1,35 @@
+-- Minute and hour rollups of lever_history for /api/lever/history/rollup.
+--
+-- The history writer folds every flushed batch into per-bucket deltas and
+-- upserts them here, so one row per (lever, resolution, bucket) carries the
+-- event count, min/max/sum of position and heat, and the sealing cycles
+-- completed in that bucket with their total duration. Averages are
+-- sum / events. Per-action counts live in lever_rollup_actions. Range
+-- queries read at most LEVER_ROLLUP_MAX_BUCKETS rows by primary key and
+-- never touch lever_history. Buckets only cover history written after this
+-- migration is deployed.
+
+CREATE TABLE lever_rollups (
+    lever_id INT NOT NULL,
+    resolution VARCHAR(8) NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    events INT NOT NULL,
+    position_min DOUBLE NULL,
+    position_max DOUBLE NULL,
+    position_sum DOUBLE NOT NULL,
+    heat_min DOUBLE NULL,
+    heat_max DOUBLE NULL,
+    heat_sum DOUBLE NOT NULL,
+    seal_cycles INT NOT NULL,
+    seal_seconds DOUBLE NOT NULL,
+    PRIMARY KEY (lever_id, resolution, bucket_start)
+);
+
+CREATE TABLE lever_rollup_actions (
+    lever_id INT NOT NULL,
+    resolution VARCHAR(8) NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    action VARCHAR(50) NOT NULL,
+    count INT NOT NULL,
+    PRIMARY KEY (lever_id, resolution, bucket_start, action)
+);
@@ -0,0 +1,14 @@
+-- Retention for lever_history (LEVER_HISTORY_RETENTION_DAYS > 0).
+--
+-- The archiver repeatedly reads the oldest expired rows with
+--   WHERE timestamp < ? ORDER BY timestamp, id LIMIT n
+-- writes them to a gzip JSONL file under LEVER_HISTORY_ARCHIVE_DIR, records
+-- the file in manifest.jsonl and deletes the rows by id. This index lets that
+-- read seek straight to the oldest rows across all levers (InnoDB appends id)
+-- instead of scanning the table.
+--
+-- Range partitioning by timestamp was not used: it would require timestamp in
+-- the primary key of every existing deployment.
+
+CREATE INDEX idx_lever_history_timestamp
+    ON lever_history (timestamp);
@@ -1,158 +1,268 @@
-from db import get_connection
-from fsm import StateMachine
+from audit import get_history_writer
+from collections import namedtuple
+from datetime import datetime
+from fsm import StateMachine, TransitionTable
+from persistence import StateWriter
+from storage import CONFIG_COLUMNS, get_storage
+import config
+import metrics
+import threading
+import time
 from states import LeverState, LeverEvent, TransitionResult
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SEAL_HEAT_MIN = 40
+SEAL_HEAT_MAX = 50
+
+DEFAULT_CONFIG_ROW = {"lower_limit": 0, "upper_limit": 100, "step": 1, "tick_ms": 100, "sealing_duration": 10}
+DEFAULT_STATE_ROW = {"position": 50, "heat": 0, "state": "STOPPED", "sealing_progress": 0}
+
+COMMAND_EVENTS = {
+    "pull-up": LeverEvent.PULL_UP,
+    "pull-down": LeverEvent.PULL_DOWN,
+    "pause": LeverEvent.PAUSE,
+    "resume": LeverEvent.RESUME,
+    "stop": LeverEvent.STOP,
+}
+
+TRIGGER_SECONDS = metrics.histogram(
+    "lever_fsm_trigger_seconds", "Time spent dispatching an event through the lever FSM", ("event",)
+)
+TRIGGER_TIMERS = {event: TRIGGER_SECONDS.labels(event.value) for event in LeverEvent}
+SAVE_STATE_SECONDS = metrics.histogram(
+    "lever_save_state_seconds", "Time spent in Lever.save_state including the state flush"
+)
+LOG_SECONDS = metrics.histogram(
+    "lever_log_seconds", "Time spent queueing a lever history row"
+)
+
+class LeverConfig(namedtuple("LeverConfig", CONFIG_COLUMNS + ("version",))):
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*(row[column] for column in CONFIG_COLUMNS), row.get("version", 0))
+
+    @property
+    def tick(self):
+        return self.tick_ms / 1000
+
+
 class Lever:
-    def __init__(self):
-        self.position = 50
-        self.heat = 0
-        self.sealing_progress = 0
+    __slots__ = (
+        "id", "lock", "generation", "listeners", "_notified_generation", "events", "event_seq",
+        "_replaying", "_staged", "_position", "_heat", "_sealing_progress", "db_state", "config",
+        "storage", "fsm", "history", "writer", "_snapshot"
+    )
+
+    def __init__(self, lever_id=1, config_row=None, state_row=None):
+        self.id = lever_id
+        self.lock = threading.RLock()
+        self.generation = 0
+        self.listeners = []
+        self._notified_generation = 0
+        self.events = None
+        self.event_seq = 0
+        self._replaying = False
+        self._staged = None
+        self._position = 50
+        self._heat = 0
+        self._sealing_progress = 0
         self.db_state = "STOPPED"
         
-        self.lower = 0
-        self.upper = 100
-        self.step = 1
-        self.tick = 0.1
-        self.sealing_duration = 10
+        self.config = LeverConfig.from_row(DEFAULT_CONFIG_ROW)
         
-        self.load_config()
-        self.load_state()
+        self.storage = get_storage()
+
+        if config_row is None:
+            self.load_config()
+        else:
+            self.apply_config(config_row)
+
+        if state_row is None:
+            self.load_state()
+        else:
+            self.apply_state(state_row)
         
         initial_state = self._db_state_to_enum(self.db_state)
-        self.fsm = StateMachine(initial_state)
+        self.fsm = StateMachine(initial_state, LEVER_TRANSITIONS, owner=self)
+        self.fsm.add_on_state_change(self._on_state_change)
         
-        self._setup_fsm()
+        self.history = get_history_writer()
+        self.writer = StateWriter(
+            self._write_state,
+            mode=config.STATE_WRITE_MODE,
+            flush_interval=config.STATE_FLUSH_INTERVAL
+        )
         
-        logger.info(f"Lever initialized: position={self.position}, state={initial_state.value}")
+        self._publish_snapshot()
+
+        logger.info(f"Lever {self.id} initialized: position={self.position}, state={initial_state.value}")
+
+    @property
+    def lower(self):
+        return self.config.lower_limit
+
+    @property
+    def upper(self):
+        return self.config.upper_limit
+
+    @property
+    def step(self):
+        return self.config.step
+
+    @property
+    def tick(self):
+        return self.config.tick
+
+    @property
+    def sealing_duration(self):
+        return self.config.sealing_duration
+
+    @property
+    def position(self):
+        return self._position
+
+    @position.setter
+    def position(self, value):
+        if value != self._position:
+            self._position = value
+            self.generation += 1
+
+    @property
+    def heat(self):
+        return self._heat
+
+    @heat.setter
+    def heat(self, value):
+        if value != self._heat:
+            self._heat = value
+            self.generation += 1
+
+    @property
+    def sealing_progress(self):
+        return self._sealing_progress
+
+    @sealing_progress.setter
+    def sealing_progress(self, value):
+        if value != self._sealing_progress:
+            self._sealing_progress = value
+            self.generation += 1
+
+    def _on_state_change(self, previous_state, new_state, event):
+        self.generation += 1
+
+    def mark_dirty(self):
+        self.generation += 1
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def _notify(self):
+        if self.generation != self._notified_generation:
+            self._notified_generation = self.generation
+            for listener in self.listeners:
+                listener(self)
 
     def load_config(self):
         try:
-            conn = get_connection()
-            cur = conn.cursor(dictionary=True)
-            cur.execute("SELECT * FROM lever_config WHERE id=1")
-            cfg = cur.fetchone()
-
+            cfg = self.storage.load_config(self.id)
             if cfg:
-                self.lower = cfg["lower_limit"]
-                self.upper = cfg["upper_limit"]
-                self.step = cfg["step"]
-                self.tick = cfg["tick_ms"] / 1000
-                self.sealing_duration = cfg["sealing_duration"]
-
-            cur.close()
-            conn.close()
+                self.apply_config(cfg)
         except Exception as e:
             logger.error(f"Error loading config: {e}")
 
+    def apply_config(self, cfg):
+        self.config = LeverConfig.from_row(cfg)
+        self.mark_dirty()
+
+    def reconfigure(self, cfg, owner=True):
+        with self.lock:
+            previous = self.config
+            self.apply_config(cfg)
+            if self.config[:-1] == previous[:-1]:
+                return previous
+            if not owner:
+                self._publish_snapshot()
+                return previous
+            self.log("CONFIG", f"version {previous.version} -> {self.config.version}")
+            if self.events is not None:
+                # Snapshot at the change so replay never runs earlier events under the new config.
+                self._record("CONFIG", self.config.version, snapshot=True)
+            self.persist()
+            return previous
+
     def load_state(self):
         try:
-            conn = get_connection()
-            cur = conn.cursor(dictionary=True)
-            cur.execute("SELECT * FROM lever_state WHERE id=1")
-            row = cur.fetchone()
-
+            row = self.storage.load_state(self.id)
             if row:
-                self.position = float(row["position"])
-                self.heat = float(row["heat"])
-                self.db_state = str(row["state"])
-                self.sealing_progress = int(row["sealing_progress"])
-
-            cur.close()
-            conn.close()
+                self.apply_state(row)
         except Exception as e:
             logger.error(f"Error loading state: {e}")
 
+    def apply_state(self, row):
+        self.position = float(row["position"])
+        self.heat = float(row["heat"])
+        self.db_state = str(row["state"])
+        self.sealing_progress = int(row["sealing_progress"])
+
+    def sync(self, row):
+        with self.lock:
+            generation = self.generation
+            self.apply_state(row)
+            state = self._db_state_to_enum(self.db_state)
+            if state is not self.fsm.current_state:
+                self.fsm.current_state = state
+                self.mark_dirty()
+            if self.generation != generation:
+                self._publish_snapshot()
+                if self.listeners:
+                    self._notify()
+
+    def _publish_snapshot(self):
+        self._snapshot = (
+            self.generation, self.position, self.heat, self.fsm.get_state(), self.sealing_progress
+        )
+
+    def snapshot(self):
+        return self._snapshot
+
+    def state_row(self):
+        return (self.position, self.heat, self.fsm.get_state().value, self.sealing_progress)
+
+    def persist(self):
+        if self._snapshot[0] != self.generation:
+            self._publish_snapshot()
+        self.writer.submit(self.generation, self.state_row())
+        if self.listeners:
+            self._notify()
+
+    @SAVE_STATE_SECONDS.time()
     def save_state(self):
-        try:
-            conn = get_connection()
-            cur = conn.cursor()
-            
-            cur.execute("""
-                UPDATE lever_state
-                SET position=%s, heat=%s, state=%s, sealing_progress=%s
-                WHERE id=1
-            """, (self.position, self.heat, self.fsm.get_state().value, self.sealing_progress))
-
-            conn.commit()
-            cur.close()
-            conn.close()
-        except Exception as e:
-            logger.error(f"Error saving state: {e}")
+        self.persist()
+        self.writer.flush()
+
+    def _write_state(self, row):
+        self.storage.save_state(self.id, row)
 
+    @LOG_SECONDS.time()
     def log(self, action, details=""):
-        try:
-            conn = get_connection()
-            cur = conn.cursor()
-            
-            cur.execute("""
-                INSERT INTO lever_history (action, position, heat, state, details)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (action, self.position, self.heat, self.fsm.get_state().value, details))
-
-            conn.commit()
-            cur.close()
-            conn.close()
-        except Exception as e:
-            logger.error(f"Error logging: {e}")
+        if self._replaying:
+            return
+        self._emit(
+            self.history.append,
+            (self.id, action, self.position, self.heat, self.fsm.get_state().value, details, datetime.now())
+        )
 
-    def _setup_fsm(self):
-        fsm = self.fsm
-    
-        fsm.add_transition(LeverState.STOPPED, LeverEvent.PULL_UP, LeverState.STARTING_UP, self._start_moving_up)
-        fsm.add_transition(LeverState.STOPPED, LeverEvent.PULL_DOWN, LeverState.STARTING_DOWN, self._start_moving_down)
-        fsm.add_transition(LeverState.STOPPED, LeverEvent.PAUSE, LeverState.PAUSED)
-        fsm.add_transition(LeverState.STOPPED, LeverEvent.TICK, LeverState.STOPPED)
-        
-        fsm.add_transition(LeverState.STARTING_UP, LeverEvent.TICK, LeverState.MOVING_UP, self._accelerate_up)
-        fsm.add_transition(LeverState.STARTING_UP, LeverEvent.PULL_DOWN, LeverState.SLOWING_UP, self._begin_deceleration)
-        fsm.add_transition(LeverState.STARTING_UP, LeverEvent.PAUSE, LeverState.PAUSED)
-        fsm.add_transition(LeverState.STARTING_UP, LeverEvent.STOP, LeverState.STOPPED)
-        
-        fsm.add_transition(LeverState.MOVING_UP, LeverEvent.TICK, LeverState.MOVING_UP, self._move_up)
-        fsm.add_transition(LeverState.MOVING_UP, LeverEvent.REACHED_TOP, LeverState.AT_TOP, self._handle_reached_top)
-        fsm.add_transition(LeverState.MOVING_UP, LeverEvent.PULL_DOWN, LeverState.SLOWING_UP, self._begin_deceleration)
-        fsm.add_transition(LeverState.MOVING_UP, LeverEvent.PAUSE, LeverState.PAUSED)
-        fsm.add_transition(LeverState.MOVING_UP, LeverEvent.STOP, LeverState.STOPPED)
-        
-        fsm.add_transition(LeverState.SLOWING_UP, LeverEvent.TICK, LeverState.STOPPED, self._decelerate_up)
-        fsm.add_transition(LeverState.SLOWING_UP, LeverEvent.PAUSE, LeverState.PAUSED)
-        fsm.add_transition(LeverState.SLOWING_UP, LeverEvent.STOP, LeverState.STOPPED)
-        
-        fsm.add_transition(LeverState.STARTING_DOWN, LeverEvent.TICK, LeverState.MOVING_DOWN, self._accelerate_down)
-        fsm.add_transition(LeverState.STARTING_DOWN, LeverEvent.PULL_UP, LeverState.SLOWING_DOWN, self._begin_deceleration)
-        fsm.add_transition(LeverState.STARTING_DOWN, LeverEvent.PAUSE, LeverState.PAUSED)
-        fsm.add_transition(LeverState.STARTING_DOWN, LeverEvent.STOP, LeverState.STOPPED)
-        
-        fsm.add_transition(LeverState.MOVING_DOWN, LeverEvent.TICK, LeverState.MOVING_DOWN, self._move_down)
-        fsm.add_transition(LeverState.MOVING_DOWN, LeverEvent.REACHED_BOTTOM, LeverState.AT_BOTTOM, self._handle_reached_bottom)
-        fsm.add_transition(LeverState.MOVING_DOWN, LeverEvent.PULL_UP, LeverState.SLOWING_DOWN, self._begin_deceleration)
-        fsm.add_transition(LeverState.MOVING_DOWN, LeverEvent.PAUSE, LeverState.PAUSED)
-        fsm.add_transition(LeverState.MOVING_DOWN, LeverEvent.STOP, LeverState.STOPPED)
-        
-        fsm.add_transition(LeverState.SLOWING_DOWN, LeverEvent.TICK, LeverState.STOPPED, self._decelerate_down)
-        fsm.add_transition(LeverState.SLOWING_DOWN, LeverEvent.PAUSE, LeverState.PAUSED)
-        fsm.add_transition(LeverState.SLOWING_DOWN, LeverEvent.STOP, LeverState.STOPPED)
-        
-        fsm.add_transition(LeverState.AT_TOP, LeverEvent.PULL_DOWN, LeverState.STARTING_DOWN, self._start_moving_down)
-        fsm.add_transition(LeverState.AT_TOP, LeverEvent.PAUSE, LeverState.PAUSED)
-        fsm.add_transition(LeverState.AT_TOP, LeverEvent.TICK, LeverState.AT_TOP)
-        
-        fsm.add_transition(LeverState.AT_BOTTOM, LeverEvent.PULL_UP, LeverState.STARTING_UP, self._start_moving_up)
-        fsm.add_transition(LeverState.AT_BOTTOM, LeverEvent.SEAL_CONDITIONS_MET, LeverState.SEALING, self._start_sealing)
-        fsm.add_transition(LeverState.AT_BOTTOM, LeverEvent.PAUSE, LeverState.PAUSED)
-        fsm.add_transition(LeverState.AT_BOTTOM, LeverEvent.TICK, LeverState.AT_BOTTOM, self._check_sealing_conditions)
-        
-        fsm.add_transition(LeverState.SEALING, LeverEvent.TICK, LeverState.SEALING, self._progress_sealing)
-        fsm.add_transition(LeverState.SEALING, LeverEvent.SEAL_COMPLETE, LeverState.AT_BOTTOM, self._complete_sealing)
-        
-        fsm.add_transition(LeverState.PAUSED, LeverEvent.RESUME, LeverState.STOPPED, self._resume_from_pause)
-        fsm.add_transition(LeverState.PAUSED, LeverEvent.TICK, LeverState.PAUSED)
+    def _emit(self, append, *args):
+        if self._staged is None:
+            append(*args)
+        else:
+            self._staged.append((append, args))
 
-    
     def _start_moving_up(self, context):
         self.log("START_MOVING_UP")
         
@@ -194,7 +304,7 @@ class Lever:
         self._check_sealing_conditions(context)
     
     def _check_sealing_conditions(self, context):
-        if 40 <= self.heat <= 50:
+        if SEAL_HEAT_MIN <= self.heat <= SEAL_HEAT_MAX:
             self.fsm.trigger(LeverEvent.SEAL_CONDITIONS_MET)
     
     def _start_sealing(self, context):
@@ -213,63 +323,242 @@ class Lever:
     def _resume_from_pause(self, context):
         self.log("RESUMED", f"Position: {self.position}")
    
+    def _trigger(self, event):
+        generation = self.generation
+        if metrics.ENABLED:
+            started = time.perf_counter()
+            result = self.fsm.trigger(event)
+            TRIGGER_TIMERS[event].observe(time.perf_counter() - started)
+        else:
+            result = self.fsm.trigger(event)
+        if self.events is not None and self.generation != generation:
+            self._record(event.value)
+        return result
+
+    def _record(self, event, value=None, snapshot=False):
+        self.event_seq += 1
+        self._emit(self.events.append, self.id, self.event_seq, event, value)
+        if snapshot or self.event_seq % self.events.snapshot_interval == 0 or self.events.needs_snapshot(self.id):
+            self._emit(self.events.snapshot, self.id, self.event_seq, self.state_row())
+
+    def restore(self, position, heat, state, sealing_progress, event_seq):
+        with self.lock:
+            self.position = position
+            self.heat = heat
+            self.sealing_progress = sealing_progress
+            self.fsm.current_state = self._db_state_to_enum(state)
+            self.event_seq = event_seq
+            self.mark_dirty()
+            self._publish_snapshot()
+
+    def replay(self, events):
+        count = 0
+        with self.lock:
+            self._replaying = True
+            try:
+                for seq, event, value in events:
+                    if event == "SET_HEAT":
+                        self.heat = float(value)
+                    elif event == "RESET":
+                        self._reset_fields()
+                    elif event == "CONFIG":
+                        pass
+                    else:
+                        self.fsm.trigger(LeverEvent[event])
+                    self.event_seq = seq
+                    count += 1
+            finally:
+                self._replaying = False
+            self.persist()
+        return count
+
     def pull_up(self):
-        result = self.fsm.trigger(LeverEvent.PULL_UP)
-        self.save_state()
-        if result == TransitionResult.SUCCESS:
-            return "Moving UP"
-        return f"Cannot move UP from {self.fsm.get_state().value}"
+        with self.lock:
+            result = self._trigger(LeverEvent.PULL_UP)
+            self.save_state()
+            if result == TransitionResult.SUCCESS:
+                return "Moving UP"
+            return f"Cannot move UP from {self.fsm.get_state().value}"
     
     def pull_down(self):
-        result = self.fsm.trigger(LeverEvent.PULL_DOWN)
-        self.save_state()
-        if result == TransitionResult.SUCCESS:
-            return "Moving DOWN"
-        return f"Cannot move DOWN from {self.fsm.get_state().value}"
+        with self.lock:
+            result = self._trigger(LeverEvent.PULL_DOWN)
+            self.save_state()
+            if result == TransitionResult.SUCCESS:
+                return "Moving DOWN"
+            return f"Cannot move DOWN from {self.fsm.get_state().value}"
     
     def pause(self):
-        self.fsm.trigger(LeverEvent.PAUSE)
-        self.save_state()
-        return f"Paused at {self.position}"
+        with self.lock:
+            self._trigger(LeverEvent.PAUSE)
+            self.save_state()
+            return f"Paused at {self.position}"
     
     def resume(self):
-        self.fsm.trigger(LeverEvent.RESUME)
-        self.save_state()
-        return f"Resumed at {self.position}"
+        with self.lock:
+            self._trigger(LeverEvent.RESUME)
+            self.save_state()
+            return f"Resumed at {self.position}"
     
     def stop(self):
-        self.fsm.trigger(LeverEvent.STOP)
-        self.save_state()
-        return f"Stopped at {self.position}"
+        with self.lock:
+            self._trigger(LeverEvent.STOP)
+            self.save_state()
+            return f"Stopped at {self.position}"
     
+    def set_heat(self, heat):
+        with self.lock:
+            self._apply_command("set-heat", heat)
+            self.save_state()
+            return f"Heat set to {heat}"
+
     def tick_update(self):
-        self.fsm.trigger(LeverEvent.TICK)
-        self.save_state()
+        with self.lock:
+            self._trigger(LeverEvent.TICK)
+            self.persist()
+
+    def reset(self):
+        with self.lock:
+            self._apply_command("reset")
+            self.save_state()
+
+    def apply_commands(self, commands, atomic=False):
+        with self.lock:
+            saved = self._capture_fields()
+            self._staged = []
+            try:
+                results = [self._apply_command(command, value) for command, value in commands]
+            except Exception:
+                self._restore_fields(saved)
+                raise
+            finally:
+                staged, self._staged = self._staged, None
+
+            committed = not atomic or all(result is TransitionResult.SUCCESS for result in results)
+            if committed:
+                for append, args in staged:
+                    append(*args)
+            else:
+                self._restore_fields(saved)
+
+            self.save_state()
+            return results, committed
+
+    def _apply_command(self, command, value=None):
+        if command == "set-heat":
+            self.heat = value
+            if self.events is not None:
+                self._record("SET_HEAT", value)
+            return TransitionResult.SUCCESS
+
+        if command == "reset":
+            self._reset_fields()
+            if self.events is not None:
+                self._record("RESET")
+            self.log("RESET")
+            return TransitionResult.SUCCESS
+
+        return self._trigger(COMMAND_EVENTS[command])
+
+    def simulate(self, ticks, until=None, commands=(), trajectory="changes", dry_run=False):
+        with self.lock:
+            saved = self._capture_fields()
+            self._staged = []
+            points = []
+            try:
+                for command, value in commands:
+                    self._apply_command(command, value)
+
+                state = self.fsm.current_state
+                if trajectory != "none":
+                    points.append(self._trajectory_point(0))
+
+                ran = 0
+                while ran < ticks and state is not until:
+                    self._trigger(LeverEvent.TICK)
+                    ran += 1
+                    new_state = self.fsm.current_state
+                    if trajectory == "all" or (trajectory == "changes" and new_state is not state):
+                        points.append(self._trajectory_point(ran))
+                    state = new_state
+
+                if trajectory == "changes" and points[-1]["tick"] != ran:
+                    points.append(self._trajectory_point(ran))
+            except Exception:
+                self._restore_fields(saved)
+                raise
+            finally:
+                staged, self._staged = self._staged, None
+
+            if dry_run:
+                final = self._trajectory_point(ran)
+                self._restore_fields(saved)
+                self.persist()
+            else:
+                for append, args in staged:
+                    append(*args)
+                self.save_state()
+                final = self._trajectory_point(ran)
+
+            return ran, points, final
+
+    def _trajectory_point(self, tick):
+        return {
+            "tick": tick,
+            "position": self.position,
+            "heat": self.heat,
+            "state": self.fsm.current_state.value,
+            "sealing_progress": self.sealing_progress
+        }
+
+    def _capture_fields(self):
+        return (
+            self.position, self.heat, self.sealing_progress,
+            self.fsm.current_state, self.fsm.previous_state, self.event_seq
+        )
+
+    def _restore_fields(self, saved):
+        position, heat, sealing_progress, state, previous_state, event_seq = saved
+        self.position = position
+        self.heat = heat
+        self.sealing_progress = sealing_progress
+        self.fsm.current_state = state
+        self.fsm.previous_state = previous_state
+        self.event_seq = event_seq
+        self.mark_dirty()
+
+    def _reset_fields(self):
+        self.position = 50
+        self.heat = 0
+        self.sealing_progress = 0
+        self.fsm.current_state = LeverState.STOPPED
+        self.mark_dirty()
 
     def get_state(self):
+        _, position, heat, state, sealing_progress = self._snapshot
         return {
-            "position": round(self.position, 2),
-            "heat": round(self.heat, 2),
-            "state": self.fsm.get_state().value,
-            "sealing_progress": self.sealing_progress,
-            "at_top": self.position >= self.upper,
-            "at_bottom": self.position <= self.lower
+            "position": round(position, 2),
+            "heat": round(heat, 2),
+            "state": state.value,
+            "sealing_progress": sealing_progress,
+            "at_top": position >= self.upper,
+            "at_bottom": position <= self.lower
         }
     
     def get_status_message(self):
-        state = self.fsm.get_state()
+        _, position, _, state, sealing_progress = self._snapshot
         messages = {
-            LeverState.STOPPED: f"STOPPED at {self.position:.1f}",
-            LeverState.MOVING_UP: f"Moving UP ({self.position:.1f})",
-            LeverState.MOVING_DOWN: f"Moving DOWN ({self.position:.1f})",
-            LeverState.SLOWING_UP: f"Slowing from UP ({self.position:.1f})",
-            LeverState.SLOWING_DOWN: f"Slowing from DOWN ({self.position:.1f})",
-            LeverState.STARTING_UP: f"Starting UP ({self.position:.1f})",
-            LeverState.STARTING_DOWN: f"Starting DOWN ({self.position:.1f})",
-            LeverState.SEALING: f"SEALING {self.sealing_progress}/{self.sealing_duration}",
-            LeverState.PAUSED: f"⏸PAUSED at {self.position:.1f}",
-            LeverState.AT_TOP: f"At TOP ({self.position:.1f})",
-            LeverState.AT_BOTTOM: f"At BOTTOM ({self.position:.1f})"
+            LeverState.STOPPED: f"STOPPED at {position:.1f}",
+            LeverState.MOVING_UP: f"Moving UP ({position:.1f})",
+            LeverState.MOVING_DOWN: f"Moving DOWN ({position:.1f})",
+            LeverState.SLOWING_UP: f"Slowing from UP ({position:.1f})",
+            LeverState.SLOWING_DOWN: f"Slowing from DOWN ({position:.1f})",
+            LeverState.STARTING_UP: f"Starting UP ({position:.1f})",
+            LeverState.STARTING_DOWN: f"Starting DOWN ({position:.1f})",
+            LeverState.SEALING: f"SEALING {sealing_progress}/{self.sealing_duration}",
+            LeverState.PAUSED: f"⏸PAUSED at {position:.1f}",
+            LeverState.AT_TOP: f"At TOP ({position:.1f})",
+            LeverState.AT_BOTTOM: f"At BOTTOM ({position:.1f})"
         }
         return messages.get(state, f"Unknown: {state.value}")
     
@@ -277,4 +566,63 @@ class Lever:
         try:
             return LeverState[db_state]
         except KeyError:
-            return LeverState.STOPPED
\ No newline at end of file
+            return LeverState.STOPPED
+
+
+def _build_transitions():
+    table = TransitionTable()
+
+    table.add_transition(LeverState.STOPPED, LeverEvent.PULL_UP, LeverState.STARTING_UP, Lever._start_moving_up)
+    table.add_transition(LeverState.STOPPED, LeverEvent.PULL_DOWN, LeverState.STARTING_DOWN, Lever._start_moving_down)
+    table.add_transition(LeverState.STOPPED, LeverEvent.PAUSE, LeverState.PAUSED)
+    table.add_transition(LeverState.STOPPED, LeverEvent.TICK, LeverState.STOPPED)
+
+    table.add_transition(LeverState.STARTING_UP, LeverEvent.TICK, LeverState.MOVING_UP, Lever._accelerate_up)
+    table.add_transition(LeverState.STARTING_UP, LeverEvent.PULL_DOWN, LeverState.SLOWING_UP, Lever._begin_deceleration)
+    table.add_transition(LeverState.STARTING_UP, LeverEvent.PAUSE, LeverState.PAUSED)
+    table.add_transition(LeverState.STARTING_UP, LeverEvent.STOP, LeverState.STOPPED)
+
+    table.add_transition(LeverState.MOVING_UP, LeverEvent.TICK, LeverState.MOVING_UP, Lever._move_up)
+    table.add_transition(LeverState.MOVING_UP, LeverEvent.REACHED_TOP, LeverState.AT_TOP, Lever._handle_reached_top)
+    table.add_transition(LeverState.MOVING_UP, LeverEvent.PULL_DOWN, LeverState.SLOWING_UP, Lever._begin_deceleration)
+    table.add_transition(LeverState.MOVING_UP, LeverEvent.PAUSE, LeverState.PAUSED)
+    table.add_transition(LeverState.MOVING_UP, LeverEvent.STOP, LeverState.STOPPED)
+
+    table.add_transition(LeverState.SLOWING_UP, LeverEvent.TICK, LeverState.STOPPED, Lever._decelerate_up)
+    table.add_transition(LeverState.SLOWING_UP, LeverEvent.PAUSE, LeverState.PAUSED)
+    table.add_transition(LeverState.SLOWING_UP, LeverEvent.STOP, LeverState.STOPPED)
+
+    table.add_transition(LeverState.STARTING_DOWN, LeverEvent.TICK, LeverState.MOVING_DOWN, Lever._accelerate_down)
+    table.add_transition(LeverState.STARTING_DOWN, LeverEvent.PULL_UP, LeverState.SLOWING_DOWN, Lever._begin_deceleration)
+    table.add_transition(LeverState.STARTING_DOWN, LeverEvent.PAUSE, LeverState.PAUSED)
+    table.add_transition(LeverState.STARTING_DOWN, LeverEvent.STOP, LeverState.STOPPED)
+
+    table.add_transition(LeverState.MOVING_DOWN, LeverEvent.TICK, LeverState.MOVING_DOWN, Lever._move_down)
+    table.add_transition(LeverState.MOVING_DOWN, LeverEvent.REACHED_BOTTOM, LeverState.AT_BOTTOM, Lever._handle_reached_bottom)
+    table.add_transition(LeverState.MOVING_DOWN, LeverEvent.PULL_UP, LeverState.SLOWING_DOWN, Lever._begin_deceleration)
+    table.add_transition(LeverState.MOVING_DOWN, LeverEvent.PAUSE, LeverState.PAUSED)
+    table.add_transition(LeverState.MOVING_DOWN, LeverEvent.STOP, LeverState.STOPPED)
+
+    table.add_transition(LeverState.SLOWING_DOWN, LeverEvent.TICK, LeverState.STOPPED, Lever._decelerate_down)
+    table.add_transition(LeverState.SLOWING_DOWN, LeverEvent.PAUSE, LeverState.PAUSED)
+    table.add_transition(LeverState.SLOWING_DOWN, LeverEvent.STOP, LeverState.STOPPED)
+
+    table.add_transition(LeverState.AT_TOP, LeverEvent.PULL_DOWN, LeverState.STARTING_DOWN, Lever._start_moving_down)
+    table.add_transition(LeverState.AT_TOP, LeverEvent.PAUSE, LeverState.PAUSED)
+    table.add_transition(LeverState.AT_TOP, LeverEvent.TICK, LeverState.AT_TOP)
+
+    table.add_transition(LeverState.AT_BOTTOM, LeverEvent.PULL_UP, LeverState.STARTING_UP, Lever._start_moving_up)
+    table.add_transition(LeverState.AT_BOTTOM, LeverEvent.SEAL_CONDITIONS_MET, LeverState.SEALING, Lever._start_sealing)
+    table.add_transition(LeverState.AT_BOTTOM, LeverEvent.PAUSE, LeverState.PAUSED)
+    table.add_transition(LeverState.AT_BOTTOM, LeverEvent.TICK, LeverState.AT_BOTTOM, Lever._check_sealing_conditions)
+
+    table.add_transition(LeverState.SEALING, LeverEvent.TICK, LeverState.SEALING, Lever._progress_sealing)
+    table.add_transition(LeverState.SEALING, LeverEvent.SEAL_COMPLETE, LeverState.AT_BOTTOM, Lever._complete_sealing)
+
+    table.add_transition(LeverState.PAUSED, LeverEvent.RESUME, LeverState.STOPPED, Lever._resume_from_pause)
+    table.add_transition(LeverState.PAUSED, LeverEvent.TICK, LeverState.PAUSED)
+
+    return table.compile()
+
+
+LEVER_TRANSITIONS = _build_transitions()
@@ -0,0 +1,156 @@
+from models.lever import LEVER_TRANSITIONS, SEAL_HEAT_MIN, SEAL_HEAT_MAX
+from states import LeverState, LeverEvent
+import numpy as np
+
+STOPPED = LeverState.STOPPED.index
+MOVING_UP = LeverState.MOVING_UP.index
+MOVING_DOWN = LeverState.MOVING_DOWN.index
+SLOWING_UP = LeverState.SLOWING_UP.index
+SLOWING_DOWN = LeverState.SLOWING_DOWN.index
+STARTING_UP = LeverState.STARTING_UP.index
+STARTING_DOWN = LeverState.STARTING_DOWN.index
+SEALING = LeverState.SEALING.index
+AT_TOP = LeverState.AT_TOP.index
+AT_BOTTOM = LeverState.AT_BOTTOM.index
+
+STATES = tuple(LeverState)
+
+COMMAND_EVENTS = (
+    LeverEvent.PULL_UP,
+    LeverEvent.PULL_DOWN,
+    LeverEvent.PAUSE,
+    LeverEvent.RESUME,
+    LeverEvent.STOP,
+)
+
+_command_table = None
+
+
+def command_table():
+    global _command_table
+
+    if _command_table is None:
+        table = np.arange(len(STATES), dtype=np.int8)[:, None].repeat(len(LeverEvent), axis=1)
+        valid = np.zeros(table.shape, dtype=bool)
+        for (from_state, event), (to_state, _) in LEVER_TRANSITIONS.transitions.items():
+            table[from_state.index, event.index] = to_state.index
+            valid[from_state.index, event.index] = True
+        _command_table = (table, valid)
+
+    return _command_table
+
+
+class LeverBatch:
+    def __init__(
+        self,
+        size,
+        lower=0,
+        upper=100,
+        step=1,
+        sealing_duration=10,
+        position=50,
+        heat=0,
+        state=LeverState.STOPPED,
+        sealing_progress=0
+    ):
+        self.size = size
+
+        self.lower = np.array(np.broadcast_to(lower, size), dtype=np.float64)
+        self.upper = np.array(np.broadcast_to(upper, size), dtype=np.float64)
+        self.step = np.array(np.broadcast_to(step, size), dtype=np.float64)
+        self.sealing_duration = np.array(np.broadcast_to(sealing_duration, size), dtype=np.int32)
+
+        if isinstance(state, LeverState):
+            state = state.index
+        self.position = np.array(np.broadcast_to(position, size), dtype=np.float64)
+        self.heat = np.array(np.broadcast_to(heat, size), dtype=np.float64)
+        self.state = np.array(np.broadcast_to(state, size), dtype=np.int8)
+        self.sealing_progress = np.array(np.broadcast_to(sealing_progress, size), dtype=np.int32)
+
+    @classmethod
+    def from_levers(cls, levers):
+        levers = list(levers)
+        return cls(
+            len(levers),
+            lower=[lever.lower for lever in levers],
+            upper=[lever.upper for lever in levers],
+            step=[lever.step for lever in levers],
+            sealing_duration=[lever.sealing_duration for lever in levers],
+            position=[lever.position for lever in levers],
+            heat=[lever.heat for lever in levers],
+            state=[lever.fsm.get_state().index for lever in levers],
+            sealing_progress=[lever.sealing_progress for lever in levers]
+        )
+
+    def tick(self, count=1):
+        for _ in range(count):
+            self._tick()
+
+    def _tick(self):
+        state = self.state
+        position = self.position
+        progress = self.sealing_progress
+
+        starting_up = state == STARTING_UP
+        starting_down = state == STARTING_DOWN
+        slowing = (state == SLOWING_UP) | (state == SLOWING_DOWN)
+        moving_up = state == MOVING_UP
+        moving_down = state == MOVING_DOWN
+        sealing = state == SEALING
+        in_window = (self.heat >= SEAL_HEAT_MIN) & (self.heat <= SEAL_HEAT_MAX)
+        seal_start = (state == AT_BOTTOM) & in_window
+
+        np.add(position, self.step, out=position, where=moving_up)
+        reached_top = moving_up & (position >= self.upper)
+        np.copyto(position, self.upper, where=reached_top)
+
+        np.subtract(position, self.step, out=position, where=moving_down)
+        reached_bottom = moving_down & (position <= self.lower)
+        np.copyto(position, self.lower, where=reached_bottom)
+        seal_start |= reached_bottom & in_window
+
+        np.add(progress, 1, out=progress, where=sealing)
+        seal_complete = sealing & (progress >= self.sealing_duration)
+
+        state[starting_up] = MOVING_UP
+        state[starting_down] = MOVING_DOWN
+        state[slowing] = STOPPED
+        state[reached_top] = AT_TOP
+        state[reached_bottom] = AT_BOTTOM
+        state[seal_complete] = AT_BOTTOM
+        progress[seal_complete] = 0
+        state[seal_start] = SEALING
+        progress[seal_start] = 0
+
+    def apply(self, event, mask=None):
+        if event not in COMMAND_EVENTS:
+            raise ValueError(f"{event.value} cannot be applied to a batch, use tick() for TICK")
+
+        table, valid = command_table()
+        column = event.index
+        accepted = valid[self.state, column]
+        if mask is not None:
+            accepted &= mask
+        self.state[accepted] = table[self.state[accepted], column]
+        return accepted
+
+    def set_heat(self, heat, mask=None):
+        if mask is None:
+            self.heat[:] = heat
+        else:
+            self.heat[mask] = heat
+
+    def state_counts(self):
+        counts = np.bincount(self.state, minlength=len(STATES))
+        return {state.value: int(counts[state.index]) for state in STATES if counts[state.index]}
+
+    def get_state(self, index):
+        position = float(self.position[index])
+        return {
+            "position": round(position, 2),
+            "heat": round(float(self.heat[index]), 2),
+            "state": STATES[self.state[index]].value,
+            "sealing_progress": int(self.sealing_progress[index]),
+            "at_top": bool(position >= self.upper[index]),
+            "at_bottom": bool(position <= self.lower[index])
+        }
@@ -0,0 +1,183 @@
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WRITE_MODES = ("sync", "batched", "async")
+MAX_SCHEDULER_WAIT = 60.0
+
+
+class FlushScheduler:
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def schedule(self, deadline, writer):
+        if not math.isfinite(deadline):
+            raise ValueError(f"Flush deadline must be finite, got {deadline}")
+
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), writer))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="state-flush", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    self._cond.wait(min(self._heap[0][0] - now, MAX_SCHEDULER_WAIT) if self._heap else None)
+
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap)[2])
+
+            for writer in due:
+                try:
+                    writer._deadline_flush()
+                except Exception as e:
+                    logger.error(f"Error in deadline state flush: {e}")
+
+
+_flush_scheduler = FlushScheduler()
+
+
+class StateWriter:
+    __slots__ = (
+        "_write", "mode", "flush_interval", "_pending", "_persisted_generation", "_last_flush",
+        "_lock", "_flush_lock", "_stop", "_thread", "_armed", "stats"
+    )
+
+    def __init__(self, write, mode="batched", flush_interval=1.0):
+        if mode not in WRITE_MODES:
+            raise ValueError(f"Unknown write mode {mode!r}, expected one of {WRITE_MODES}")
+
+        self._write = write
+        self.mode = mode
+        self.flush_interval = flush_interval
+
+        self._pending = None
+        self._persisted_generation = None
+        self._last_flush = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = None
+        self._thread = None
+        self._armed = False
+
+        self.stats = {"submitted": 0, "coalesced": 0, "writes": 0, "errors": 0}
+
+    def submit(self, generation, row):
+        deadline = None
+        with self._lock:
+            if self._pending is not None:
+                if self._pending[0] != generation:
+                    self._pending = (generation, row)
+                    self.stats["coalesced"] += 1
+                    self.stats["submitted"] += 1
+            elif generation == self._persisted_generation:
+                return
+            else:
+                self._pending = (generation, row)
+                self.stats["submitted"] += 1
+
+            # A lever that stops changing never submits again, so a pending
+            # row must not wait for the next submit to be written. A non-finite
+            # interval means rows are only written by explicit flushes.
+            if self.mode == "batched" and not self._armed and 0 < self.flush_interval < math.inf:
+                self._armed = True
+                deadline = self._last_flush + self.flush_interval
+
+        if self.mode == "sync":
+            self.flush()
+        elif self.mode == "batched":
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+            if deadline is not None:
+                _flush_scheduler.schedule(deadline, self)
+        elif self._thread is None:
+            self._start()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, None
+
+            if pending is None:
+                return True
+
+            generation, row = pending
+            self._last_flush = time.monotonic()
+
+            try:
+                self._write(row)
+            except Exception as e:
+                logger.error(f"Error saving state: {e}")
+                with self._lock:
+                    self.stats["errors"] += 1
+                    if self._pending is None:
+                        self._pending = pending
+                return False
+
+            with self._lock:
+                self._persisted_generation = generation
+                self.stats["writes"] += 1
+            return True
+
+    def _deadline_flush(self):
+        with self._lock:
+            self._armed = False
+        if not self.flush():
+            with self._lock:
+                if self._armed or self._pending is None:
+                    return
+                self._armed = True
+            _flush_scheduler.schedule(time.monotonic() + self.flush_interval, self)
+
+    def discard(self):
+        with self._lock:
+            pending, self._pending = self._pending, None
+        return pending is not None
+
+    def is_dirty(self):
+        with self._lock:
+            return self._pending is not None
+
+    def close(self):
+        if self._stop is not None:
+            self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 1)
+            self._thread = None
+        return self.flush()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["mode"] = self.mode
+        stats["flush_interval"] = self.flush_interval
+        stats["dirty"] = self._pending is not None
+        return stats
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="state-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
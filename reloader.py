@@ -0,0 +1,61 @@
+from storage import get_storage
+import config
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigReloader:
+    def __init__(self, fleet, storage=None, interval=None):
+        self.fleet = fleet
+        self.storage = storage or get_storage()
+        self.interval = config.CONFIG_RELOAD_INTERVAL if interval is None else interval
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.stats = {"polls": 0, "reloads": 0, "errors": 0, "last_error": None}
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="config-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def poll(self):
+        with self._lock:
+            try:
+                versions = self.storage.load_config_versions()
+                changed = [
+                    lever.id for lever in self.fleet
+                    if lever.id in versions and versions[lever.id] != lever.config.version
+                ]
+                for lever_id in changed:
+                    cfg = self.storage.load_config(lever_id)
+                    if cfg:
+                        self.fleet.reconfigure(lever_id, cfg)
+                        self.stats["reloads"] += 1
+                        logger.info(f"Reloaded config for lever {lever_id} at version {cfg['version']}")
+                self.stats["polls"] += 1
+                return changed
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+                logger.error(f"Error reloading lever config: {e}")
+                return []
+
+    def get_stats(self):
+        return {"interval": self.interval, "running": self._thread is not None, **self.stats}
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
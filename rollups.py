@@ -0,0 +1,195 @@
+from datetime import datetime, timedelta
+from history import parse_time
+from storage import ROLLUP_COLUMNS, get_storage
+import config
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_RESOLUTIONS = {"minute": 60, "hour": 3600}
+
+SEAL_STARTED = "SEALING_STARTED"
+SEAL_COMPLETED = "SEALING_COMPLETED"
+
+EVENTS, POSITION_MIN, POSITION_MAX, POSITION_SUM, HEAT_MIN, HEAT_MAX, HEAT_SUM, SEAL_CYCLES, SEAL_SECONDS = range(
+    len(ROLLUP_COLUMNS)
+)
+
+
+def bucket_start(timestamp, resolution):
+    if resolution == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
+
+class RollupAggregator:
+    def __init__(self, storage=None, resolutions=None):
+        self.storage = storage
+        self.resolutions = tuple(resolutions or ROLLUP_RESOLUTIONS)
+        self._seal_started = {}
+        self._lock = threading.Lock()
+        self.stats = {"batches": 0, "rows": 0, "buckets": 0, "errors": 0, "last_error": None}
+
+    def add(self, rows):
+        with self._lock:
+            buckets, actions = self.aggregate(rows)
+            try:
+                (self.storage or get_storage()).upsert_rollups(buckets, actions)
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+                logger.error(f"Error updating rollups: {e}")
+                return False
+
+            self.stats["batches"] += 1
+            self.stats["rows"] += len(rows)
+            self.stats["buckets"] += len(buckets)
+            return True
+
+    def aggregate(self, rows):
+        buckets = {}
+        actions = {}
+        for lever_id, action, position, heat, _, _, timestamp in rows:
+            seal_seconds = None
+            if action == SEAL_STARTED:
+                self._seal_started[lever_id] = timestamp
+            elif action == SEAL_COMPLETED and lever_id in self._seal_started:
+                seal_seconds = (timestamp - self._seal_started.pop(lever_id)).total_seconds()
+
+            for resolution in self.resolutions:
+                key = (lever_id, resolution, bucket_start(timestamp, resolution))
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = [0, position, position, 0.0, heat, heat, 0.0, 0, 0.0]
+
+                bucket[EVENTS] += 1
+                bucket[POSITION_SUM] += position
+                bucket[HEAT_SUM] += heat
+                if position < bucket[POSITION_MIN]:
+                    bucket[POSITION_MIN] = position
+                if position > bucket[POSITION_MAX]:
+                    bucket[POSITION_MAX] = position
+                if heat < bucket[HEAT_MIN]:
+                    bucket[HEAT_MIN] = heat
+                if heat > bucket[HEAT_MAX]:
+                    bucket[HEAT_MAX] = heat
+                if seal_seconds is not None:
+                    bucket[SEAL_CYCLES] += 1
+                    bucket[SEAL_SECONDS] += seal_seconds
+
+                action_key = key + (action,)
+                actions[action_key] = actions.get(action_key, 0) + 1
+        return buckets, actions
+
+    def get_stats(self):
+        with self._lock:
+            return {"resolutions": list(self.resolutions), "open_seals": len(self._seal_started), **self.stats}
+
+
+class RollupQuery:
+    def __init__(self, lever_id, resolution="minute", since=None, until=None, max_buckets=1440):
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {', '.join(ROLLUP_RESOLUTIONS)}")
+
+        step = timedelta(seconds=ROLLUP_RESOLUTIONS[resolution])
+        until = until or bucket_start(datetime.now(), resolution) + step
+        since = since or until - step * 60
+        if since >= until:
+            raise ValueError("since must be before until")
+
+        self.lever_id = lever_id
+        self.resolution = resolution
+        self.since = bucket_start(since, resolution)
+        self.until = until
+        self.max_buckets = max_buckets
+
+    @classmethod
+    def from_args(cls, lever_id, args, max_buckets=1440):
+        since = args.get('since')
+        until = args.get('until')
+        return cls(
+            lever_id,
+            resolution=args.get('resolution', 'minute'),
+            since=parse_time(since, 'since') if since else None,
+            until=parse_time(until, 'until') if until else None,
+            max_buckets=max_buckets
+        )
+
+    def run(self, storage=None):
+        return (storage or get_storage()).query_rollups(
+            self.lever_id, self.resolution, self.since, self.until, self.max_buckets + 1
+        )
+
+
+def describe_bucket(row):
+    events = row["events"]
+    cycles = row["seal_cycles"]
+    return {
+        "bucket_start": row["bucket_start"].isoformat(),
+        "events": events,
+        "position": {"min": row["position_min"], "max": row["position_max"], "avg": row["position_sum"] / events},
+        "heat": {"min": row["heat_min"], "max": row["heat_max"], "avg": row["heat_sum"] / events},
+        "sealing": {
+            "cycles": cycles,
+            "total_seconds": row["seal_seconds"],
+            "avg_seconds": row["seal_seconds"] / cycles if cycles else None
+        },
+        "actions": row["actions"]
+    }
+
+
+def describe_rollups(query, rows):
+    truncated = len(rows) > query.max_buckets
+    rows = rows[:query.max_buckets]
+    return {
+        "success": True,
+        "resolution": query.resolution,
+        "since": query.since.isoformat(),
+        "until": query.until.isoformat(),
+        "data": [describe_bucket(row) for row in rows],
+        "count": len(rows),
+        "truncated": truncated,
+        "summary": summarize(rows)
+    }
+
+
+def summarize(rows):
+    if not rows:
+        return None
+
+    total = {column: 0 for column in ROLLUP_COLUMNS}
+    actions = {}
+    for row in rows:
+        for column in ROLLUP_COLUMNS:
+            if column.endswith("_min"):
+                total[column] = row[column] if total["events"] == 0 else min(total[column], row[column])
+            elif column.endswith("_max"):
+                total[column] = row[column] if total["events"] == 0 else max(total[column], row[column])
+        for column in ("events", "position_sum", "heat_sum", "seal_cycles", "seal_seconds"):
+            total[column] += row[column]
+        for action, count in row["actions"].items():
+            actions[action] = actions.get(action, 0) + count
+
+    summary = describe_bucket(dict(total, bucket_start=rows[0]["bucket_start"], actions=actions))
+    del summary["bucket_start"]
+    return summary
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_rollup_aggregator():
+    global _aggregator
+
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = RollupAggregator()
+    return _aggregator
+
+
+def record_rollups(rows):
+    if config.ROLLUPS_ENABLED:
+        get_rollup_aggregator().add(rows)
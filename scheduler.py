@@ -0,0 +1,248 @@
+from collections import deque
+import heapq
+import itertools
+import logging
+import math
+import metrics
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TICK_POLICIES = ("catch_up", "skip")
+
+TICK_DURATION_SECONDS = metrics.histogram(
+    "lever_tick_duration_seconds", "Time spent running one scheduled tick callback"
+)
+TICK_LATENESS_SECONDS = metrics.histogram(
+    "lever_tick_lateness_seconds", "Delay between a tick's deadline and its start"
+)
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class SimulatedClock:
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def set(self, now):
+        if now > self.now:
+            self.now = now
+        return self.now
+
+
+class TickScheduler:
+    def __init__(self, clock=time.monotonic, policy="catch_up", max_catch_up=10, sample_size=1024):
+        if policy not in TICK_POLICIES:
+            raise ValueError(f"Unknown tick policy {policy!r}, expected one of {TICK_POLICIES}")
+
+        self.clock = clock
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.running = False
+
+        self._heap = []
+        self._entries = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self.ticks = 0
+        self.errors = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+        self.max_duration = 0.0
+        self.last_error = None
+
+        self._lateness = deque(maxlen=sample_size)
+        self._durations = deque(maxlen=sample_size)
+
+    def add(self, key, period, callback):
+        with self._cond:
+            self._cancel(key)
+            entry = [self.clock() + period, next(self._seq), key, period, callback, True]
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            self._cond.notify()
+
+    def remove(self, key):
+        with self._cond:
+            self._cancel(key)
+
+    def reschedule(self, key, period):
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is not None and entry[3] != period:
+                self.add(key, period, entry[4])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            now = self.clock()
+            overdue = [entry for entry in self._heap if entry[0] < now]
+            for index, entry in enumerate(overdue):
+                entry[0] = now + entry[3] * (index + 1) / len(overdue)
+            heapq.heapify(self._heap)
+
+            self.running = True
+            self._thread = threading.Thread(target=self._run, name="tick-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Tick scheduler started with {len(self._entries)} entries")
+
+    def stop(self, timeout=None):
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout=timeout)
+            logger.info("Tick scheduler stopped")
+
+    def get_stats(self):
+        with self._cond:
+            lateness = sorted(self._lateness)
+            durations = sorted(self._durations)
+            stats = {
+                "running": self.running,
+                "policy": self.policy,
+                "entries": len(self._entries),
+                "ticks": self.ticks,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "overruns": self.overruns,
+                "skipped": self.skipped,
+                "max_lateness_ms": round(self.max_lateness * 1000, 3),
+                "max_duration_ms": round(self.max_duration * 1000, 3),
+            }
+
+        for name, samples in (("lateness", lateness), ("duration", durations)):
+            for label, fraction in (("p50", 0.5), ("p99", 0.99)):
+                value = _percentile(samples, fraction)
+                stats[f"{name}_{label}_ms"] = None if value is None else round(value * 1000, 3)
+        return stats
+
+    def next_deadline(self):
+        with self._cond:
+            heap = self._heap
+            while heap and not heap[0][5]:
+                heapq.heappop(heap)
+            return heap[0][0] if heap else None
+
+    def advance(self, seconds):
+        if not isinstance(self.clock, SimulatedClock):
+            raise RuntimeError("advance() requires a SimulatedClock")
+        if not math.isfinite(seconds) or seconds < 0:
+            raise ValueError("seconds must be finite and non-negative")
+
+        target = self.clock() + seconds
+        ran = 0
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > target:
+                break
+            self.clock.set(deadline)
+            ran += self.run_pending()
+        self.clock.set(target)
+        return ran
+
+    def run_pending(self):
+        due = self._pop_due(self.clock())
+        self._run_entries(due)
+        return len(due)
+
+    def _cancel(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[5] = False
+
+    def _pop_due(self, now):
+        due = []
+        with self._cond:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                entry = heapq.heappop(heap)
+                if entry[5]:
+                    due.append(entry)
+        return due
+
+    def _run_entries(self, due):
+        clock = self.clock
+        timings = []
+
+        for entry in due:
+            started = clock()
+            try:
+                entry[4]()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"{entry[2]}: {e}"
+                logger.exception(f"Tick error for {entry[2]}: {e}")
+            finished = clock()
+            timings.append((started - entry[0], finished - started))
+
+        if metrics.ENABLED:
+            for lateness, duration in timings:
+                TICK_LATENESS_SECONDS.observe(max(lateness, 0.0))
+                TICK_DURATION_SECONDS.observe(duration)
+
+        now = clock()
+        with self._cond:
+            for entry, (lateness, duration) in zip(due, timings):
+                period = entry[3]
+                self._record(lateness, duration, period)
+
+                if entry[5]:
+                    entry[0] = self._next_deadline(entry[0] + period, period, now)
+                    heapq.heappush(self._heap, entry)
+            self.ticks += len(due)
+
+    def _record(self, lateness, duration, period):
+        self._lateness.append(lateness)
+        self._durations.append(duration)
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+        if duration > self.max_duration:
+            self.max_duration = duration
+        if lateness >= period:
+            self.overruns += 1
+
+    def _next_deadline(self, deadline, period, now):
+        missed = int((now - deadline) // period)
+        if missed <= 0:
+            return deadline
+
+        if self.policy == "skip":
+            skip = missed
+        else:
+            skip = missed - self.max_catch_up
+            if skip <= 0:
+                return deadline
+
+        self.skipped += skip
+        return deadline + skip * period
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self.running:
+                    timeout = self._heap[0][0] - self.clock() if self._heap else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if not self.running:
+                    return
+
+            self._run_entries(self._pop_due(self.clock()))
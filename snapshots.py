@@ -0,0 +1,40 @@
+import os
+import threading
+
+BOOT_ID = os.urandom(4).hex()
+
+
+class SnapshotCache:
+    def __init__(self, render):
+        self._render = render
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, lever, encoder):
+        generation = lever.snapshot()[0]
+        key = (lever.id, encoder.name)
+        entry = self._entries.get(key)
+
+        if entry is not None and entry[0] == generation:
+            self.hits += 1
+            return entry
+
+        body = self._render(lever, encoder)
+        entry = (generation, body, f"{BOOT_ID}-{lever.id}-{generation}-{encoder.name}")
+        with self._lock:
+            current = self._entries.get(key)
+            if current is None or current[0] < generation:
+                self._entries[key] = entry
+            self.misses += 1
+        return entry
+
+    def discard(self, lever_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == lever_id]:
+                del self._entries[key]
+
+    def get_stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -14,6 +14,9 @@ class LeverState(Enum):
     AT_BOTTOM = "AT_BOTTOM"
     ERROR = "ERROR"
 
+for _index, _state in enumerate(LeverState):
+    _state.index = _index
+
 class LeverEvent(Enum):
     PULL_UP = "PULL_UP"
     PULL_DOWN = "PULL_DOWN"
@@ -28,6 +31,9 @@ class LeverEvent(Enum):
     REVERSED = "REVERSED"
     ERROR_OCCURRED = "ERROR_OCCURRED"
 
+for _index, _event in enumerate(LeverEvent):
+    _event.index = _index
+
 class TransitionResult(Enum):
     SUCCESS = "SUCCESS"
     IGNORED = "IGNORED"
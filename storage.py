@@ -0,0 +1,685 @@
+from contextlib import contextmanager
+from datetime import datetime
+from db import get_connection
+import config
+import itertools
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKENDS = ("mysql", "sqlite", "memory")
+
+HISTORY_COLUMNS = ("lever_id", "action", "position", "heat", "state", "details", "timestamp")
+
+STATE_COLUMNS = ("position", "heat", "state", "sealing_progress")
+
+CONFIG_COLUMNS = ("lower_limit", "upper_limit", "step", "tick_ms", "sealing_duration")
+
+ROLLUP_COLUMNS = (
+    "events", "position_min", "position_max", "position_sum",
+    "heat_min", "heat_max", "heat_sum", "seal_cycles", "seal_seconds"
+)
+
+ROLLUP_KEY = ("lever_id", "resolution", "bucket_start")
+
+
+def _rollup_merge(least, greatest, new):
+    merged = []
+    for column in ROLLUP_COLUMNS:
+        if column.endswith("_min"):
+            merged.append(f"{column}={least}({column}, {new.format(column)})")
+        elif column.endswith("_max"):
+            merged.append(f"{column}={greatest}({column}, {new.format(column)})")
+        else:
+            merged.append(f"{column}={column}+{new.format(column)}")
+    return ", ".join(merged)
+
+
+def _rollup_upsert_sql(least, greatest, new, conflict):
+    columns = ROLLUP_KEY + ROLLUP_COLUMNS
+    return (
+        f"INSERT INTO lever_rollups ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"{conflict.format(', '.join(ROLLUP_KEY))} {_rollup_merge(least, greatest, new)}"
+    ), (
+        "INSERT INTO lever_rollup_actions (lever_id, resolution, bucket_start, action, count) "
+        f"VALUES (%s, %s, %s, %s, %s) {conflict.format(', '.join(ROLLUP_KEY + ('action',)))} "
+        f"count=count+{new.format('count')}"
+    )
+
+
+ROLLUP_RANGE_SQL = (
+    "WHERE lever_id=%s AND resolution=%s AND bucket_start >= %s AND bucket_start < %s ORDER BY bucket_start"
+)
+
+
+def _assemble_rollups(buckets, actions):
+    by_start = {}
+    for row in buckets:
+        row["actions"] = {}
+        by_start[row["bucket_start"]] = row
+    for row in actions:
+        bucket = by_start.get(row["bucket_start"])
+        if bucket is not None:
+            bucket["actions"][row["action"]] = row["count"]
+    return buckets
+
+
+class MySQLStorage:
+    name = "mysql"
+
+    def load_configs(self):
+        return {row["id"]: row for row in self._fetch_all("SELECT * FROM lever_config ORDER BY id")}
+
+    def load_states(self):
+        return {row["id"]: row for row in self._fetch_all("SELECT * FROM lever_state")}
+
+    def load_config(self, lever_id):
+        rows = self._fetch_all("SELECT * FROM lever_config WHERE id=%s", (lever_id,))
+        return rows[0] if rows else None
+
+    def load_state(self, lever_id):
+        rows = self._fetch_all("SELECT * FROM lever_state WHERE id=%s", (lever_id,))
+        return rows[0] if rows else None
+
+    def load_config_versions(self):
+        return {row["id"]: row["version"] for row in self._fetch_all("SELECT id, version FROM lever_config")}
+
+    def save_config(self, lever_id, row):
+        with get_connection() as conn:
+            cur = conn.cursor()
+
+            cur.execute(f"""
+                INSERT INTO lever_config (id, {", ".join(CONFIG_COLUMNS)}, version)
+                VALUES (%s, {", ".join(["%s"] * len(CONFIG_COLUMNS))}, 1)
+                ON DUPLICATE KEY UPDATE
+                    {", ".join(f"{column}=VALUES({column})" for column in CONFIG_COLUMNS)},
+                    version=version+1
+            """, (lever_id,) + tuple(row))
+
+            conn.commit()
+            cur.close()
+        return self.load_config(lever_id)
+
+    def save_state(self, lever_id, row):
+        with get_connection() as conn:
+            cur = conn.cursor()
+
+            cur.execute("""
+                INSERT INTO lever_state (id, position, heat, state, sealing_progress)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE position=VALUES(position), heat=VALUES(heat),
+                    state=VALUES(state), sealing_progress=VALUES(sealing_progress)
+            """, (lever_id,) + tuple(row))
+
+            conn.commit()
+            cur.close()
+
+    def insert_history(self, rows):
+        placeholders = "(" + ", ".join(["%s"] * len(HISTORY_COLUMNS)) + ")"
+        sql = (
+            f"INSERT INTO lever_history ({', '.join(HISTORY_COLUMNS)}) VALUES "
+            + ", ".join([placeholders] * len(rows))
+        )
+        params = [value for row in rows for value in row]
+
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            conn.commit()
+            cur.close()
+
+    def acquire_leases(self, names, owner, url, ttl, now):
+        if not names:
+            return set()
+        placeholders = ", ".join(["%s"] * len(names))
+
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                f"UPDATE lever_leases SET owner=%s, url=%s, expires_at=%s"
+                f" WHERE name IN ({placeholders}) AND (owner=%s OR expires_at < %s)",
+                [owner, url, now + ttl] + list(names) + [owner, now]
+            )
+            cur.execute(
+                "INSERT IGNORE INTO lever_leases (name, owner, url, expires_at) VALUES "
+                + ", ".join(["(%s, %s, %s, %s)"] * len(names)),
+                [value for name in names for value in (name, owner, url, now + ttl)]
+            )
+            cur.execute(
+                f"SELECT name FROM lever_leases WHERE name IN ({placeholders}) AND owner=%s",
+                list(names) + [owner]
+            )
+            held = {row[0] for row in cur.fetchall()}
+            conn.commit()
+            cur.close()
+        return held
+
+    def release_leases(self, names, owner):
+        if not names:
+            return
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                f"DELETE FROM lever_leases WHERE name IN ({', '.join(['%s'] * len(names))}) AND owner=%s",
+                list(names) + [owner]
+            )
+            conn.commit()
+            cur.close()
+
+    def get_leases(self):
+        rows = self._fetch_all("SELECT name, owner, url, expires_at FROM lever_leases")
+        return {row["name"]: (row["owner"], row["url"], row["expires_at"]) for row in rows}
+
+    def upsert_rollups(self, buckets, actions):
+        bucket_sql, action_sql = _rollup_upsert_sql("LEAST", "GREATEST", "VALUES({})", "ON DUPLICATE KEY UPDATE")
+        with get_connection() as conn:
+            cur = conn.cursor()
+            if buckets:
+                cur.executemany(bucket_sql, [key + tuple(values) for key, values in buckets.items()])
+            if actions:
+                cur.executemany(action_sql, [key + (count,) for key, count in actions.items()])
+            conn.commit()
+            cur.close()
+
+    def query_rollups(self, lever_id, resolution, since, until, limit):
+        params = (lever_id, resolution, since, until)
+        buckets = self._fetch_all(
+            f"SELECT bucket_start, {', '.join(ROLLUP_COLUMNS)} FROM lever_rollups {ROLLUP_RANGE_SQL} LIMIT %s",
+            params + (limit,)
+        )
+        actions = self._fetch_all(f"SELECT bucket_start, action, count FROM lever_rollup_actions {ROLLUP_RANGE_SQL}", params)
+        return _assemble_rollups(buckets, actions)
+
+    def expired_history(self, before, limit):
+        return self._fetch_all(
+            f"SELECT id, {', '.join(HISTORY_COLUMNS)} FROM lever_history"
+            " WHERE timestamp < %s ORDER BY timestamp, id LIMIT %s",
+            (before, limit)
+        )
+
+    def delete_history(self, ids):
+        if not ids:
+            return 0
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"DELETE FROM lever_history WHERE id IN ({', '.join(['%s'] * len(ids))})", list(ids))
+            deleted = cur.rowcount
+            conn.commit()
+            cur.close()
+        return deleted
+
+    def query_history(self, query):
+        # Pages are bounded to limit + 1 rows, so fetch eagerly and return the connection now.
+        return (row for row in self._fetch_all(*query.to_sql()))
+
+    def get_stats(self):
+        return {"backend": self.name}
+
+    def close(self):
+        pass
+
+    def _fetch_all(self, sql, params=()):
+        with get_connection() as conn:
+            cur = conn.cursor(dictionary=True)
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+            cur.close()
+        return rows
+
+
+SQLITE_MAX_PARAMS = 900
+
+
+def _sqlite_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="microseconds")
+    return value
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lever_config (
+    id INTEGER PRIMARY KEY,
+    lower_limit REAL NOT NULL DEFAULT 0,
+    upper_limit REAL NOT NULL DEFAULT 100,
+    step REAL NOT NULL DEFAULT 1,
+    tick_ms INTEGER NOT NULL DEFAULT 100,
+    sealing_duration INTEGER NOT NULL DEFAULT 10,
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS lever_state (
+    id INTEGER PRIMARY KEY,
+    position REAL NOT NULL,
+    heat REAL NOT NULL,
+    state TEXT NOT NULL,
+    sealing_progress INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lever_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    lever_id INTEGER NOT NULL DEFAULT 1,
+    action TEXT NOT NULL,
+    position REAL,
+    heat REAL,
+    state TEXT,
+    details TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lever_history_lever_timestamp ON lever_history (lever_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_lever_history_lever_action_timestamp ON lever_history (lever_id, action, timestamp);
+CREATE INDEX IF NOT EXISTS idx_lever_history_lever_state_timestamp ON lever_history (lever_id, state, timestamp);
+CREATE INDEX IF NOT EXISTS idx_lever_history_timestamp ON lever_history (timestamp);
+CREATE TABLE IF NOT EXISTS lever_events (
+    lever_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (lever_id, seq)
+);
+CREATE TABLE IF NOT EXISTS lever_rollups (
+    lever_id INTEGER NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket_start TEXT NOT NULL,
+    events INTEGER NOT NULL,
+    position_min REAL,
+    position_max REAL,
+    position_sum REAL NOT NULL,
+    heat_min REAL,
+    heat_max REAL,
+    heat_sum REAL NOT NULL,
+    seal_cycles INTEGER NOT NULL,
+    seal_seconds REAL NOT NULL,
+    PRIMARY KEY (lever_id, resolution, bucket_start)
+);
+CREATE TABLE IF NOT EXISTS lever_rollup_actions (
+    lever_id INTEGER NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket_start TEXT NOT NULL,
+    action TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (lever_id, resolution, bucket_start, action)
+);
+CREATE TABLE IF NOT EXISTS lever_leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    url TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lever_snapshots (
+    lever_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    position REAL NOT NULL,
+    heat REAL NOT NULL,
+    state TEXT NOT NULL,
+    sealing_progress INTEGER NOT NULL,
+    PRIMARY KEY (lever_id, seq)
+);
+"""
+
+
+class SQLiteStorage:
+    name = "sqlite"
+
+    def __init__(self, path=None):
+        self.path = path or config.SQLITE_PATH
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self.stats = {"transactions": 0, "statements": 0}
+
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript(SQLITE_SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(lever_config)")}
+            if "version" not in columns:
+                self._conn.execute("ALTER TABLE lever_config ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+                self._conn.execute("ALTER TABLE lever_config ADD COLUMN updated_at TEXT")
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                yield cur
+            except Exception:
+                self._conn.rollback()
+                raise
+            else:
+                self._conn.commit()
+                self.stats["transactions"] += 1
+            finally:
+                cur.close()
+
+    def execute(self, sql, params=()):
+        with self._lock:
+            self.stats["statements"] += 1
+            cur = self._conn.execute(sql.replace("%s", "?"), [_sqlite_value(value) for value in params])
+            rows = [dict(row) for row in cur.fetchall()]
+            cur.close()
+        return rows
+
+    def load_configs(self):
+        return {row["id"]: row for row in self.execute("SELECT * FROM lever_config ORDER BY id")}
+
+    def load_states(self):
+        return {row["id"]: row for row in self.execute("SELECT * FROM lever_state")}
+
+    def load_config(self, lever_id):
+        rows = self.execute("SELECT * FROM lever_config WHERE id=?", (lever_id,))
+        return rows[0] if rows else None
+
+    def load_state(self, lever_id):
+        rows = self.execute("SELECT * FROM lever_state WHERE id=?", (lever_id,))
+        return rows[0] if rows else None
+
+    def load_config_versions(self):
+        return {row["id"]: row["version"] for row in self.execute("SELECT id, version FROM lever_config")}
+
+    def save_config(self, lever_id, row):
+        with self.transaction() as cur:
+            cur.execute(
+                f"INSERT INTO lever_config (id, {', '.join(CONFIG_COLUMNS)}, version, updated_at)"
+                f" VALUES (?, {', '.join(['?'] * len(CONFIG_COLUMNS))}, 1, CURRENT_TIMESTAMP)"
+                f" ON CONFLICT(id) DO UPDATE SET {', '.join(f'{column}=excluded.{column}' for column in CONFIG_COLUMNS)},"
+                " version=lever_config.version+1, updated_at=CURRENT_TIMESTAMP",
+                (lever_id,) + tuple(row)
+            )
+            self.stats["statements"] += 1
+        return self.load_config(lever_id)
+
+    def save_state(self, lever_id, row):
+        with self.transaction() as cur:
+            cur.execute(
+                "INSERT INTO lever_state (id, position, heat, state, sealing_progress) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET position=excluded.position, heat=excluded.heat,"
+                " state=excluded.state, sealing_progress=excluded.sealing_progress",
+                (lever_id,) + tuple(row)
+            )
+            self.stats["statements"] += 1
+
+    def insert_history(self, rows):
+        with self.transaction() as cur:
+            cur.executemany(
+                f"INSERT INTO lever_history ({', '.join(HISTORY_COLUMNS)}) VALUES "
+                f"({', '.join(['?'] * len(HISTORY_COLUMNS))})",
+                [[_sqlite_value(value) for value in row] for row in rows]
+            )
+            self.stats["statements"] += 1
+
+    def acquire_leases(self, names, owner, url, ttl, now):
+        if not names:
+            return set()
+        placeholders = ", ".join(["?"] * len(names))
+
+        with self.transaction() as cur:
+            cur.execute(
+                f"UPDATE lever_leases SET owner=?, url=?, expires_at=?"
+                f" WHERE name IN ({placeholders}) AND (owner=? OR expires_at < ?)",
+                [owner, url, now + ttl] + list(names) + [owner, now]
+            )
+            cur.executemany(
+                "INSERT OR IGNORE INTO lever_leases (name, owner, url, expires_at) VALUES (?, ?, ?, ?)",
+                [(name, owner, url, now + ttl) for name in names]
+            )
+            cur.execute(
+                f"SELECT name FROM lever_leases WHERE name IN ({placeholders}) AND owner=?",
+                list(names) + [owner]
+            )
+            return {row[0] for row in cur.fetchall()}
+
+    def release_leases(self, names, owner):
+        if not names:
+            return
+        with self.transaction() as cur:
+            cur.execute(
+                f"DELETE FROM lever_leases WHERE name IN ({', '.join(['?'] * len(names))}) AND owner=?",
+                list(names) + [owner]
+            )
+
+    def get_leases(self):
+        rows = self.execute("SELECT name, owner, url, expires_at FROM lever_leases")
+        return {row["name"]: (row["owner"], row["url"], row["expires_at"]) for row in rows}
+
+    def upsert_rollups(self, buckets, actions):
+        bucket_sql, action_sql = _rollup_upsert_sql("MIN", "MAX", "excluded.{}", "ON CONFLICT({}) DO UPDATE SET")
+        with self.transaction() as cur:
+            if buckets:
+                cur.executemany(
+                    bucket_sql.replace("%s", "?"),
+                    [[_sqlite_value(value) for value in key + tuple(values)] for key, values in buckets.items()]
+                )
+            if actions:
+                cur.executemany(
+                    action_sql.replace("%s", "?"),
+                    [[_sqlite_value(value) for value in key + (count,)] for key, count in actions.items()]
+                )
+            self.stats["statements"] += 2
+
+    def query_rollups(self, lever_id, resolution, since, until, limit):
+        params = (lever_id, resolution, since, until)
+        buckets = self.execute(
+            f"SELECT bucket_start, {', '.join(ROLLUP_COLUMNS)} FROM lever_rollups {ROLLUP_RANGE_SQL} LIMIT %s",
+            params + (limit,)
+        )
+        actions = self.execute(f"SELECT bucket_start, action, count FROM lever_rollup_actions {ROLLUP_RANGE_SQL}", params)
+        for row in buckets + actions:
+            row["bucket_start"] = datetime.fromisoformat(row["bucket_start"])
+        return _assemble_rollups(buckets, actions)
+
+    def expired_history(self, before, limit):
+        rows = self.execute(
+            f"SELECT id, {', '.join(HISTORY_COLUMNS)} FROM lever_history"
+            " WHERE timestamp < %s ORDER BY timestamp, id LIMIT %s",
+            (before, limit)
+        )
+        for row in rows:
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+        return rows
+
+    def delete_history(self, ids):
+        if not ids:
+            return 0
+        ids = list(ids)
+        deleted = 0
+        with self.transaction() as cur:
+            for offset in range(0, len(ids), SQLITE_MAX_PARAMS):
+                chunk = ids[offset:offset + SQLITE_MAX_PARAMS]
+                cur.execute(f"DELETE FROM lever_history WHERE id IN ({', '.join(['?'] * len(chunk))})", chunk)
+                deleted += cur.rowcount
+                self.stats["statements"] += 1
+        return deleted
+
+    def query_history(self, query):
+        rows = self.execute(*query.to_sql())
+        for row in rows:
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+        return (row for row in rows)
+
+    def get_stats(self):
+        with self._lock:
+            return {"backend": self.name, "path": self.path, **self.stats}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MemoryStorage:
+    name = "memory"
+
+    def __init__(self):
+        self.configs = {}
+        self.states = {}
+        self.history = []
+        self.leases = {}
+        self.rollups = {}
+        self.rollup_actions = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def load_configs(self):
+        with self._lock:
+            return {lever_id: dict(row) for lever_id, row in sorted(self.configs.items())}
+
+    def load_states(self):
+        with self._lock:
+            return {lever_id: dict(row) for lever_id, row in self.states.items()}
+
+    def load_config(self, lever_id):
+        row = self.configs.get(lever_id)
+        return dict(row) if row else None
+
+    def load_state(self, lever_id):
+        row = self.states.get(lever_id)
+        return dict(row) if row else None
+
+    def load_config_versions(self):
+        with self._lock:
+            return {lever_id: row.get("version", 1) for lever_id, row in self.configs.items()}
+
+    def save_config(self, lever_id, row):
+        with self._lock:
+            current = self.configs.get(lever_id)
+            version = current.get("version", 1) + 1 if current else 1
+            self.configs[lever_id] = dict(
+                zip(CONFIG_COLUMNS, row), id=lever_id, version=version, updated_at=datetime.now()
+            )
+            return dict(self.configs[lever_id])
+
+    def save_state(self, lever_id, row):
+        self.states[lever_id] = dict(zip(STATE_COLUMNS, row), id=lever_id)
+
+    def insert_history(self, rows):
+        with self._lock:
+            for row in rows:
+                self.history.append(dict(zip(HISTORY_COLUMNS, row), id=next(self._ids)))
+
+    def acquire_leases(self, names, owner, url, ttl, now):
+        held = set()
+        with self._lock:
+            for name in names:
+                lease = self.leases.get(name)
+                if lease is None or lease[0] == owner or lease[2] < now:
+                    self.leases[name] = (owner, url, now + ttl)
+                    held.add(name)
+        return held
+
+    def release_leases(self, names, owner):
+        with self._lock:
+            for name in names:
+                if self.leases.get(name, (None,))[0] == owner:
+                    del self.leases[name]
+
+    def get_leases(self):
+        with self._lock:
+            return dict(self.leases)
+
+    def upsert_rollups(self, buckets, actions):
+        with self._lock:
+            for key, values in buckets.items():
+                current = self.rollups.get(key)
+                if current is None:
+                    self.rollups[key] = list(values)
+                    continue
+                for index, column in enumerate(ROLLUP_COLUMNS):
+                    if column.endswith("_min"):
+                        current[index] = min(current[index], values[index])
+                    elif column.endswith("_max"):
+                        current[index] = max(current[index], values[index])
+                    else:
+                        current[index] += values[index]
+            for key, count in actions.items():
+                self.rollup_actions[key] = self.rollup_actions.get(key, 0) + count
+
+    def query_rollups(self, lever_id, resolution, since, until, limit):
+        with self._lock:
+            buckets = [
+                dict(zip(ROLLUP_COLUMNS, values), bucket_start=key[2])
+                for key, values in sorted(self.rollups.items())
+                if key[:2] == (lever_id, resolution) and since <= key[2] < until
+            ][:limit]
+            actions = [
+                {"bucket_start": key[2], "action": key[3], "count": count}
+                for key, count in self.rollup_actions.items()
+                if key[:2] == (lever_id, resolution) and since <= key[2] < until
+            ]
+        return _assemble_rollups(buckets, actions)
+
+    def expired_history(self, before, limit):
+        with self._lock:
+            rows = [dict(row) for row in self.history if row["timestamp"] < before]
+        rows.sort(key=lambda row: (row["timestamp"], row["id"]))
+        return rows[:limit]
+
+    def delete_history(self, ids):
+        ids = set(ids)
+        with self._lock:
+            kept = [row for row in self.history if row["id"] not in ids]
+            deleted, self.history = len(self.history) - len(kept), kept
+        return deleted
+
+    def query_history(self, query):
+        with self._lock:
+            rows = [row for row in self.history if query.matches(row)]
+
+        rows.sort(key=lambda row: (row["timestamp"], row["id"]), reverse=True)
+        return (row for row in rows[:query.limit + 1])
+
+    def get_stats(self):
+        return {"backend": self.name, "levers": len(self.states), "history_rows": len(self.history)}
+
+    def close(self):
+        pass
+
+
+
+def create_storage(backend=None):
+    backend = backend or config.STORAGE_BACKEND
+    if backend == "mysql":
+        return MySQLStorage()
+    if backend == "sqlite":
+        return SQLiteStorage()
+    if backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"Unknown storage backend {backend!r}, expected one of {STORAGE_BACKENDS}")
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def configure_storage(storage):
+    global _storage
+
+    if isinstance(storage, str):
+        storage = create_storage(storage)
+
+    with _storage_lock:
+        old_storage, _storage = _storage, storage
+
+    if old_storage is not None and old_storage is not storage:
+        old_storage.close()
+    return storage
+
+
+def get_storage():
+    global _storage
+
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+                logger.info(f"Using {_storage.name} storage backend")
+    return _storage
+
+
+def close_storage():
+    global _storage
+    with _storage_lock:
+        storage, _storage = _storage, None
+    if storage is not None:
+        storage.close()
@@ -0,0 +1,133 @@
+from collections import deque
+import asyncio
+import threading
+
+
+class Subscription:
+    def __init__(self, lever_id, buffer_size):
+        self.lever_id = lever_id
+        self.buffer_size = buffer_size
+        self.coalesced = 0
+
+        self._buffer = deque()
+        self._cond = threading.Condition()
+
+    def push(self, generation, delta):
+        with self._cond:
+            if len(self._buffer) >= self.buffer_size:
+                _, pending = self._buffer[-1]
+                self._buffer[-1] = (generation, {**pending, **delta})
+                self.coalesced += 1
+            else:
+                self._buffer.append((generation, delta))
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._buffer:
+                self._cond.wait(timeout)
+            messages = list(self._buffer)
+            self._buffer.clear()
+        return messages
+
+
+class AsyncSubscription:
+    def __init__(self, lever_id, buffer_size, loop):
+        self.lever_id = lever_id
+        self.buffer_size = buffer_size
+        self.coalesced = 0
+
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def push(self, generation, delta):
+        with self._lock:
+            if len(self._buffer) >= self.buffer_size:
+                _, pending = self._buffer[-1]
+                self._buffer[-1] = (generation, {**pending, **delta})
+                self.coalesced += 1
+                return
+            self._buffer.append((generation, delta))
+        self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def get(self, timeout=None):
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        with self._lock:
+            self._ready.clear()
+            messages = list(self._buffer)
+            self._buffer.clear()
+        return messages
+
+
+class StateBroadcaster:
+    def __init__(self, buffer_size=64):
+        self.buffer_size = buffer_size
+
+        self._subscribers = {}
+        self._last = {}
+        self._lock = threading.Lock()
+
+        self.published = 0
+
+    def subscribe(self, lever, loop=None):
+        if loop is None:
+            subscription = Subscription(lever.id, self.buffer_size)
+        else:
+            subscription = AsyncSubscription(lever.id, self.buffer_size, loop)
+        generation = lever.snapshot()[0]
+        snapshot = lever.get_state()
+
+        with self._lock:
+            subscribers = self._subscribers.setdefault(lever.id, [])
+            if not subscribers:
+                self._last[lever.id] = snapshot
+            subscribers.append(subscription)
+
+        return subscription, generation, snapshot
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.lever_id)
+            if subscribers and subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.lever_id, None)
+                self._last.pop(subscription.lever_id, None)
+
+    def publish(self, lever):
+        if lever.id not in self._subscribers:
+            return
+
+        state = lever.get_state()
+        generation = lever.generation
+
+        with self._lock:
+            subscribers = self._subscribers.get(lever.id)
+            if not subscribers:
+                return
+
+            last = self._last.get(lever.id, {})
+            delta = {key: value for key, value in state.items() if last.get(key) != value}
+            if not delta:
+                return
+
+            self._last[lever.id] = state
+            self.published += 1
+            for subscription in subscribers:
+                subscription.push(generation, delta)
+
+    def get_stats(self):
+        with self._lock:
+            subscriptions = [s for subscribers in self._subscribers.values() for s in subscribers]
+        return {
+            "subscribers": len(subscriptions),
+            "published": self.published,
+            "coalesced": sum(s.coalesced for s in subscriptions),
+            "buffer_size": self.buffer_size,
+        }